@@ -0,0 +1,56 @@
+import math
+
+from fastapi import HTTPException, Request
+
+from app.services.media_ai_service import MediaAIService
+from app.services.spotify_service import SpotifyService
+from app.services.tmdb_service import TMDbService
+from app.services.google_books_service import GoogleBooksService
+from app.services.podcast_service import PodcastService
+from app.services.rate_limit import CLIENT_API_KEYS, client_limiter
+
+
+# App-scoped services are created once in the lifespan and stored on
+# app.state. Tests can swap them via app.dependency_overrides.
+
+async def get_media_ai_service(request: Request) -> MediaAIService:
+    return request.app.state.media_ai_service
+
+
+async def get_spotify_service(request: Request) -> SpotifyService:
+    return request.app.state.spotify_service
+
+
+async def get_tmdb_service(request: Request) -> TMDbService:
+    return request.app.state.tmdb_service
+
+
+async def get_google_books_service(request: Request) -> GoogleBooksService:
+    return request.app.state.google_books_service
+
+
+async def get_podcast_service(request: Request) -> PodcastService:
+    return request.app.state.podcast_service
+
+
+def client_key(request: Request) -> str:
+    """The key a client is rate limited by: its issued API key, or its address"""
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in CLIENT_API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def enforce_rate_limit(request: Request, cost: float = 1.0) -> None:
+    """Reject the request with a 429 when its client is over its rate limit"""
+    retry_after = client_limiter.acquire(client_key(request), cost)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+
+async def rate_limited(request: Request) -> None:
+    enforce_rate_limit(request)
@@ -1,17 +1,73 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
 
-from app.routes.media import router as media_router
-
-# Load environment variables
+# Load environment variables before the app modules read their settings
 load_dotenv()
 
+from app.metrics import MetricsMiddleware, render_metrics
+from app.routes.media import router as media_router, resolve_media, SUPPORTED_MEDIA_TYPES
+from app.services.http_client import start_http_client, close_http_client
+from app.services.media_ai_service import MediaAIService
+from app.services.spotify_service import SpotifyService
+from app.services.tmdb_service import TMDbService
+from app.services.google_books_service import GoogleBooksService
+from app.services.podcast_service import PodcastService
+from app.services.prewarm import PrewarmScheduler
+from app.services.recommendation_store import recommendation_store
+from app.services.response_cache import response_cache
+from app.services.shared_cache import close_shared_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled HTTP client for upstream APIs
+    await start_http_client()
+
+    # App-scoped service singletons, injected via app.dependencies
+    app.state.media_ai_service = MediaAIService()
+    app.state.spotify_service = SpotifyService()
+    app.state.tmdb_service = TMDbService()
+    app.state.google_books_service = GoogleBooksService()
+    app.state.podcast_service = PodcastService()
+    await app.state.podcast_service.start()
+
+    # Serve the moods resolved before the last restart straight away
+    response_cache.preload(await recommendation_store.start())
+
+    # Keep the most requested moods' responses warm in the background
+    services = {
+        name: getattr(app.state, name)
+        for name in (
+            "media_ai_service", "spotify_service", "tmdb_service",
+            "google_books_service", "podcast_service"
+        )
+    }
+    app.state.prewarm_scheduler = PrewarmScheduler(
+        lambda mood, media_type, limit: resolve_media(mood, media_type, limit, **services)
+    )
+    # Without an LLM client every recomputation would cache the fallback list
+    if app.state.media_ai_service.client is not None:
+        await app.state.prewarm_scheduler.start()
+
+    yield
+
+    await app.state.prewarm_scheduler.close()
+    await app.state.podcast_service.close()
+    await app.state.media_ai_service.close()
+    await recommendation_store.close()
+    await close_shared_cache()
+    await close_http_client()
+
+
 app = FastAPI(
     title="Universal Media Recommendation API",
     description="Get music, movie, book, and podcast recommendations based on your mood",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -23,6 +79,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency histograms, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Include unified media router
 app.include_router(media_router, prefix="/api", tags=["media"])
 
@@ -31,13 +90,38 @@ app.include_router(media_router, prefix="/api", tags=["media"])
 async def root():
     return {
         "message": "Universal Media Recommendation API is running!",
-        "supported_media": ["music", "movies"],
-        "coming_soon": ["books", "podcasts"],
+        "supported_media": list(SUPPORTED_MEDIA_TYPES),
+        "coming_soon": [],
         "version": "2.0.0"
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return render_metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
+
+    # "development": one auto-reloading process
+    # "production": WEB_CONCURRENCY workers, no reload, graceful shutdown
+    if os.getenv("SERVER_MODE", "development") == "production":
+        workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+        # Workers split the rate limits and call budgets between them
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        if workers > 1 and not (os.getenv("SHARED_CACHE_URL") or os.getenv("QUERY_CACHE_DB")):
+            print("Warning: running several workers without SHARED_CACHE_URL, caches are per worker")
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            reload=False,
+            timeout_graceful_shutdown=float(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", 30)),
+            proxy_headers=True,
+            forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        )
+    else:
+        uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=True)
\ No newline at end of file
@@ -0,0 +1,251 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple, TypeVar
+
+from app.services.cache import cache_stats
+from app.services.rate_limit import client_limiter
+from app.services.resilience import breakers
+from app.services.single_flight import single_flight_stats
+from app.services.upstream_budget import upstream_budget
+
+# Latency buckets in seconds, from cache hits up to slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+R = TypeVar("R")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_metrics: List["_Metric"] = []
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        _metrics.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the with-block, even when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, series in self._values.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bucket_labels = _format_labels(key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            bucket_labels = _format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """Add a function producing exposition lines at scrape time"""
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "moodify_stage_duration_seconds",
+    "Time spent per stage (route handlers, LLM and upstream calls)"
+)
+UPSTREAM_ERRORS = Counter(
+    "moodify_upstream_errors_total",
+    "Failed upstream calls by upstream"
+)
+FALLBACKS = Counter(
+    "moodify_fallbacks_total",
+    "Recommendations served from the local index instead of the LLM"
+)
+
+
+def timed(stage: str) -> Callable[[Callable[..., Awaitable[R]]], Callable[..., Awaitable[R]]]:
+    """Decorator recording an async function's duration under stage"""
+    def decorator(func: Callable[..., Awaitable[R]]) -> Callable[..., Awaitable[R]]:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> R:
+            with STAGE_SECONDS.time(stage=stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _collect_caches() -> List[str]:
+    # Read from the caches' own counters so lookups pay nothing extra
+    stats = cache_stats()
+    lines = [
+        "# HELP moodify_cache_lookups_total Cache lookups by cache and result",
+        "# TYPE moodify_cache_lookups_total counter",
+    ]
+    for name, values in stats.items():
+        lines.append(f'moodify_cache_lookups_total{{cache="{name}",result="hit"}} {values["hits"]}')
+        lines.append(f'moodify_cache_lookups_total{{cache="{name}",result="miss"}} {values["misses"]}')
+    lines += [
+        "# HELP moodify_cache_entries Entries currently held by each cache",
+        "# TYPE moodify_cache_entries gauge",
+    ]
+    for name, values in stats.items():
+        lines.append(f'moodify_cache_entries{{cache="{name}"}} {values["size"]}')
+    return lines
+
+
+def _collect_single_flight() -> List[str]:
+    lines = [
+        "# HELP moodify_coalesced_calls_total Calls that started or joined shared in-flight work",
+        "# TYPE moodify_coalesced_calls_total counter",
+    ]
+    for name, values in single_flight_stats().items():
+        lines.append(f'moodify_coalesced_calls_total{{group="{name}",result="started"}} {values["started"]}')
+        lines.append(f'moodify_coalesced_calls_total{{group="{name}",result="joined"}} {values["joined"]}')
+    return lines
+
+
+def _collect_breakers() -> List[str]:
+    lines = [
+        "# HELP moodify_circuit_open Whether each upstream's circuit breaker is open (1) or closed (0)",
+        "# TYPE moodify_circuit_open gauge",
+    ]
+    for name, breaker in breakers.items():
+        lines.append(f'moodify_circuit_open{{upstream="{name}"}} {int(breaker.state != "closed")}')
+    return lines
+
+
+def _collect_rate_limits() -> List[str]:
+    lines = [
+        "# HELP moodify_rate_limited_total Requests rejected by the per-client rate limiter",
+        "# TYPE moodify_rate_limited_total counter",
+        f"moodify_rate_limited_total {client_limiter.rejected}",
+        "# HELP moodify_upstream_budget_rejected_total Upstream calls not made for lack of budget",
+        "# TYPE moodify_upstream_budget_rejected_total counter",
+    ]
+    for (upstream, priority), count in upstream_budget.rejected.items():
+        lines.append(
+            f'moodify_upstream_budget_rejected_total{{upstream="{upstream}",priority="{priority}"}} {count}'
+        )
+    lines += [
+        "# HELP moodify_upstream_budget_tokens Calls each upstream's budget allows right now",
+        "# TYPE moodify_upstream_budget_tokens gauge",
+    ]
+    for upstream, tokens, _ in upstream_budget.stats():
+        lines.append(f'moodify_upstream_budget_tokens{{upstream="{upstream}"}} {tokens:.2f}')
+    lines += [
+        "# HELP moodify_upstream_budget_waiting Upstream calls queued for budget",
+        "# TYPE moodify_upstream_budget_waiting gauge",
+    ]
+    for upstream, _, waiting in upstream_budget.stats():
+        lines.append(f'moodify_upstream_budget_waiting{{upstream="{upstream}"}} {waiting}')
+    return lines
+
+
+register_collector(_collect_caches)
+register_collector(_collect_single_flight)
+register_collector(_collect_breakers)
+register_collector(_collect_rate_limits)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every route handler, including the time spent
+    streaming its response body
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            STAGE_SECONDS.observe(
+                time.perf_counter() - start,
+                stage="route",
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"])
+            )
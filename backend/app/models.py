@@ -1,12 +1,15 @@
-from pydantic import BaseModel
-from typing import List, Optional, Union, Any
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Union
 
 
 # Unified request model for all media types
 class MediaRequest(BaseModel):
     mood: str
     media_type: str  # "music", "movies", "books", "podcasts"
-    limit: Optional[int] = 10
+    # Items to return
+    limit: int = Field(default=10, ge=1, le=50)
+    # Answer with whatever has resolved after this many milliseconds
+    deadline_ms: Optional[int] = Field(default=None, ge=1)
 
 
 # Individual media item models
@@ -19,7 +22,7 @@ class Track(BaseModel):
     image_url: Optional[str]
     popularity: Optional[int]
     duration_ms: Optional[int]
-    media_type: str = "music"
+    media_type: Literal["music"] = "music"
 
 
 class Movie(BaseModel):
@@ -32,7 +35,7 @@ class Movie(BaseModel):
     rating: Optional[float]
     synopsis: Optional[str]
     runtime: Optional[int]
-    media_type: str = "movie"
+    media_type: Literal["movie"] = "movie"
 
 
 class Book(BaseModel):
@@ -46,7 +49,7 @@ class Book(BaseModel):
     rating: Optional[float]
     description: Optional[str]
     page_count: Optional[int]
-    media_type: str = "book"
+    media_type: Literal["book"] = "book"
 
 
 class Podcast(BaseModel):
@@ -57,21 +60,48 @@ class Podcast(BaseModel):
     cover_url: Optional[str]
     description: Optional[str]
     total_episodes: Optional[int]
-    media_type: str = "podcast"
+    media_type: Literal["podcast"] = "podcast"
+
+
+# Any resolved item, told apart by its media_type
+MediaItem = Annotated[Union[Track, Movie, Book, Podcast], Field(discriminator="media_type")]
 
 
 # Unified response model
 class MediaRecommendationResponse(BaseModel):
     mood: str
     media_type: str
-    results: List[Any]  # Will contain Track, Movie, Book, or Podcast objects
+    results: List[MediaItem]
     total_found: int
+    degraded: bool = False  # True when served without completing the lookup
+    partial: bool = False  # True when deadline_ms passed before every title resolved
+    pending: List[str] = []  # Titles still resolving in the background
+    # Items the complete list may still add, including ones whose titles the
+    # LLM hasn't returned yet
+    pending_count: int = 0
+
+
+# Batch models for several moods/media types in one call
+class BatchMediaRequest(BaseModel):
+    requests: List[MediaRequest] = Field(min_length=1, max_length=20)
+
+
+class BatchMediaResult(BaseModel):
+    mood: str
+    media_type: str
+    results: List[MediaItem]
+    total_found: int
+    error: Optional[str] = None
+
+
+class BatchMediaResponse(BaseModel):
+    results: List[BatchMediaResult]
 
 
 # Legacy models for backward compatibility
 class MoodRequest(BaseModel):
     mood: str
-    limit: Optional[int] = 10
+    limit: int = Field(default=10, ge=1, le=50)
 
 
 class RecommendationResponse(BaseModel):
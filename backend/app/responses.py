@@ -0,0 +1,35 @@
+from typing import Any, Dict, Optional, Set, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class ModelResponse(JSONResponse):
+    """
+    JSON response encoded straight from a pydantic model by pydantic-core.
+    Returning it from a route skips FastAPI's response_model re-validation
+    and the intermediate dict, so results are built and encoded once.
+    """
+
+    def __init__(self, content: Any, include: Optional[Dict[str, Any]] = None, **kwargs):
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, include=self.include)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """Item fields requested as fields=a,b,c, or None for all of them"""
+    if not fields:
+        return None
+    # media_type is always kept so clients can tell the item types apart
+    return {name.strip() for name in fields.split(",") if name.strip()} | {"media_type"}
+
+
+def results_include(model: Type[BaseModel], item_fields: Optional[Set[str]]) -> Optional[Dict[str, Any]]:
+    """include= spec keeping every field of model but only item_fields of each result"""
+    if item_fields is None:
+        return None
+    return {**{name: True for name in model.model_fields}, "results": {"__all__": item_fields}}
@@ -1,92 +1,691 @@
-from fastapi import APIRouter, HTTPException
-from app.models import MediaRequest, MediaRecommendationResponse, MoodRequest, RecommendationResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from app.models import (
+    MediaRequest, MediaRecommendationResponse, MoodRequest, RecommendationResponse,
+    BatchMediaRequest, BatchMediaResult, BatchMediaResponse
+)
+from app.responses import ModelResponse, parse_fields, results_include
 from app.services.media_ai_service import MediaAIService
 from app.services.spotify_service import SpotifyService
 from app.services.tmdb_service import TMDbService
-from typing import List, Any
+from app.services.google_books_service import GoogleBooksService
+from app.services.podcast_service import PodcastService
+from app.dependencies import (
+    get_media_ai_service, get_spotify_service, get_tmdb_service, get_google_books_service,
+    get_podcast_service, enforce_rate_limit, rate_limited
+)
+from app.services.cache import cache_stats
+from app.services.response_cache import response_cache
+from app.services.concurrency import gather_limited, request_semaphore, run_limited
+from app.services.query_cache import normalize_query
+from app.services.recommendation_store import item_id, recommendation_store
+from app.services.prewarm import mood_traffic
+from app.services.resilience import REQUEST_DEADLINE, request_deadline
+from app.services.result_assembly import backfill, candidate_count, unique_items, unique_queries
+from app.services.semantic_index import semantic_index
+from app.services.single_flight import SingleFlight, single_flight_stats
+from app.services.suggestions import title_key
+from app.services.upstream_budget import BATCH, request_priority
+from typing import Awaitable, Callable, List, Any, AsyncIterator, Optional, Set, Tuple
+import asyncio
 
 router = APIRouter()
 
+# Lookups still running after a deadline-bounded response was sent
+_background_lookups: Set[asyncio.Task] = set()
 
-@router.post("/media-recommendations", response_model=MediaRecommendationResponse)
-async def get_media_recommendations(request: MediaRequest):
+
+# Identical deadline-bounded requests share one LLM call
+_title_flights = SingleFlight("deadline_titles")
+
+
+def _run_in_background(coro: Awaitable[Any]) -> asyncio.Task:
+    task = asyncio.ensure_future(coro)
+    _background_lookups.add(task)
+    task.add_done_callback(_background_lookups.discard)
+    return task
+
+
+async def resolve_media(
+    mood: str,
+    media_type: str,
+    limit: int,
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> List[Any]:
+    """
+    Ask the LLM for titles and resolve them against the media type's
+    catalog into limit distinct items
+    """
+    check_media_type(media_type)
+
+    # Get AI recommendations, with spares for duplicates and misses
+    queries = await media_ai_service.get_media_recommendations(
+        mood=mood,
+        media_type=media_type,
+        limit=candidate_count(limit)
+    )
+
+    if not queries:
+        raise HTTPException(status_code=404, detail="No recommendations found")
+
+    search = catalog_search(
+        media_type, spotify_service, tmdb_service, google_books_service, podcast_service
+    )
+    results = await resolve_titles(unique_queries(queries), limit, search)
+    return backfill(results, mood, media_type, limit)
+
+
+async def resolve_titles(
+    queries: List[str],
+    limit: int,
+    search: Callable[[List[str]], Awaitable[List[Any]]]
+) -> List[Any]:
     """
-    Get recommendations for any media type based on mood
+    Look up the best limit titles; spares only replace the ones that fail
+    or turn out to be duplicates
     """
+    results = unique_items(await search(queries[:limit]), limit)
+    spares = queries[limit:]
+    while len(results) < limit and spares:
+        missing = limit - len(results)
+        results = unique_items(results + await search(spares[:missing]), limit)
+        spares = spares[missing:]
+    return results
+
+
+def catalog_search(
+    media_type: str,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> Callable[[List[str]], Awaitable[List[Any]]]:
+    """The media type's multi-title catalog search"""
+    searches = {
+        "music": spotify_service.search_tracks,
+        "movies": tmdb_service.search_movies,
+        "books": google_books_service.search_books,
+        "podcasts": podcast_service.search_podcasts,
+    }
+    return searches[media_type]
+
+
+def title_lookup(
+    media_type: str,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> Callable[[str], Awaitable[Any]]:
+    """The media type's single-title catalog lookup"""
+    lookups = {
+        "music": spotify_service.search_track,
+        "movies": tmdb_service.search_movie,
+        "books": google_books_service.search_book,
+        "podcasts": podcast_service.search_podcast,
+    }
+    return lookups[media_type]
+
+
+def lookup_key(query: str) -> Tuple[str, Optional[int]]:
+    """
+    Key of a distinct catalog lookup: the normalized query and suggested
+    year, so remakes sharing a title are looked up separately
+    """
+    return normalize_query(query), getattr(query, "year", None)
+
+
+async def _lookup_or_none(
+    lookup: Callable[[str], Awaitable[Any]],
+    query: str,
+    semaphore: asyncio.Semaphore
+) -> Any:
+    """A capped single-title lookup; a failing title resolves to None"""
     try:
-        # Get AI recommendations
-        media_ai_service = MediaAIService()
-        queries = await media_ai_service.get_media_recommendations(
-            mood=request.mood,
-            media_type=request.media_type,
-            limit=request.limit
+        return await run_limited(lookup, query, semaphore)
+    except Exception as e:
+        print(f"Error resolving '{query}': {e}")
+        return None
+
+
+async def resolve_media_by_deadline(
+    mood: str,
+    media_type: str,
+    limit: int,
+    deadline: float,
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> Tuple[List[Any], List[str], bool]:
+    """
+    Like resolve_media, but return after deadline seconds with the items
+    resolved so far, the titles still pending and whether the lookup
+    finished. Unfinished lookups keep running and the complete list is
+    stored in the response cache.
+    """
+    check_media_type(media_type)
+    lookup = title_lookup(
+        media_type, spotify_service, tmdb_service, google_books_service, podcast_service
+    )
+    semaphore = request_semaphore()
+    # Every title lookup started so far, in rank order with spares last
+    started: List[Tuple[str, asyncio.Task]] = []
+
+    async def ask_llm() -> List[str]:
+        # The call outlives a short deadline, but is bounded like any other request
+        with request_deadline(REQUEST_DEADLINE):
+            async with asyncio.timeout(REQUEST_DEADLINE):
+                return await media_ai_service.get_media_recommendations(
+                    mood=mood,
+                    media_type=media_type,
+                    limit=candidate_count(limit)
+                )
+
+    async def search(queries: List[str]) -> List[Any]:
+        tasks = [asyncio.ensure_future(_lookup_or_none(lookup, query, semaphore)) for query in queries]
+        started.extend(zip(queries, tasks))
+        return await asyncio.gather(*tasks)
+
+    async def resolve() -> List[Any]:
+        with request_deadline(REQUEST_DEADLINE):
+            async with asyncio.timeout(REQUEST_DEADLINE):
+                queries = unique_queries(await titles)
+                if not queries:
+                    raise HTTPException(status_code=404, detail="No recommendations found")
+                results = await resolve_titles(queries, limit, search)
+        return backfill(results, mood, media_type, limit)
+
+    key = response_cache.make_key(mood, media_type, limit)
+    titles = _run_in_background(_title_flights.do(key, ask_llm))
+    resolution = _run_in_background(resolve())
+    await asyncio.wait({resolution}, timeout=deadline)
+
+    if resolution.done():
+        results = resolution.result()
+        if response_cache.age(mood, media_type, limit) is None:
+            # Concurrent identical requests don't each add the same variant
+            response_cache.put(mood, media_type, limit, results)
+        return results, [], True
+
+    # Finish the whole request for the next caller
+    _run_in_background(_finish_resolving(mood, media_type, limit, resolution))
+    results = unique_items((task.result() for _, task in started if task.done()), limit)
+    pending = [query for query, task in started if not task.done()]
+    return results, pending, False
+
+
+async def _finish_resolving(
+    mood: str,
+    media_type: str,
+    limit: int,
+    resolution: asyncio.Task
+) -> None:
+    """
+    Wait for the work a deadline-bounded response left behind and cache the
+    full list. Concurrent requests for the same key share one finish.
+    """
+    try:
+        await response_cache.refresh(mood, media_type, limit, lambda: resolution)
+    except Exception as e:
+        print(f"Background resolution failed for '{mood}' ({media_type}): {e}")
+
+
+def check_media_type(media_type: str) -> None:
+    """
+    Raise the matching HTTP error for unsupported media types
+    """
+    if media_type not in ("music", "movies", "books", "podcasts"):
+        raise HTTPException(status_code=400, detail="Invalid media type. Use: music, movies, books, podcasts")
+
+
+async def stream_media(
+    mood: str,
+    media_type: str,
+    limit: int,
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (rank, item) pairs as soon as each title resolves. Titles are
+    looked up while the LLM is still streaming the rest of the list;
+    duplicate titles and items are skipped.
+    """
+    lookup = title_lookup(
+        media_type, spotify_service, tmdb_service, google_books_service, podcast_service
+    )
+    semaphore = request_semaphore()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def resolve(rank: int, query: str):
+        await queue.put((rank, await _lookup_or_none(lookup, query, semaphore)))
+
+    async def produce():
+        tasks = []
+        titles = set()
+        try:
+            async for query in media_ai_service.stream_media_recommendations(mood, media_type, limit):
+                if title_key(query) in titles:
+                    continue
+                titles.add(title_key(query))
+                tasks.append(asyncio.create_task(resolve(len(tasks), query)))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    sent = set()
+    try:
+        while (message := await queue.get()) is not done:
+            rank, item = message
+            if item is not None and item_id(item) not in sent:
+                sent.add(item_id(item))
+                yield rank, item
+        await producer
+    finally:
+        # Client went away: stop the LLM stream and pending lookups
+        producer.cancel()
+
+
+@router.post(
+    "/media-recommendations",
+    response_model=MediaRecommendationResponse,
+    dependencies=[Depends(rate_limited)]
+)
+async def get_media_recommendations(
+    request: MediaRequest,
+    fields: Optional[str] = None,
+    media_ai_service: MediaAIService = Depends(get_media_ai_service),
+    spotify_service: SpotifyService = Depends(get_spotify_service),
+    tmdb_service: TMDbService = Depends(get_tmdb_service),
+    google_books_service: GoogleBooksService = Depends(get_google_books_service),
+    podcast_service: PodcastService = Depends(get_podcast_service)
+):
+    """
+    Get recommendations for any media type based on mood. fields=a,b,c
+    limits each result to those fields.
+    """
+    check_media_type(request.media_type)
+    mood_traffic.record(request.mood, request.media_type, request.limit)
+
+    if request.deadline_ms is not None:
+        response = await get_media_recommendations_by_deadline(
+            request,
+            media_ai_service=media_ai_service,
+            spotify_service=spotify_service,
+            tmdb_service=tmdb_service,
+            google_books_service=google_books_service,
+            podcast_service=podcast_service
         )
-        
-        if not queries:
-            raise HTTPException(status_code=404, detail="No recommendations found")
-        
-        results = []
-        
-        # Route to appropriate service based on media type
-        if request.media_type == "music":
-            spotify_service = SpotifyService()
-            results = await spotify_service.search_tracks(queries)
-        
-        elif request.media_type == "movies":
-            tmdb_service = TMDbService()
-            results = await tmdb_service.search_movies(queries)
-        
-        elif request.media_type == "books":
-            # TODO: Implement Google Books service
-            # google_books_service = GoogleBooksService()
-            # results = await google_books_service.search_books(queries)
-            raise HTTPException(status_code=501, detail="Books not implemented yet")
-        
-        elif request.media_type == "podcasts":
-            # TODO: Implement podcast service
-            # podcast_service = PodcastService()
-            # results = await podcast_service.search_podcasts(queries)
-            raise HTTPException(status_code=501, detail="Podcasts not implemented yet")
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid media type. Use: music, movies, books, podcasts")
-        
-        return MediaRecommendationResponse(
+    else:
+        results, degraded = await recommend(
+            request.mood,
+            request.media_type,
+            request.limit,
+            media_ai_service=media_ai_service,
+            spotify_service=spotify_service,
+            tmdb_service=tmdb_service,
+            google_books_service=google_books_service,
+            podcast_service=podcast_service
+        )
+        response = MediaRecommendationResponse(
             mood=request.mood,
             media_type=request.media_type,
             results=results,
-            total_found=len(results)
+            total_found=len(results),
+            degraded=degraded
         )
-        
+
+    return ModelResponse(response, include=results_include(MediaRecommendationResponse, parse_fields(fields)))
+
+
+async def recommend(
+    mood: str,
+    media_type: str,
+    limit: int,
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> Tuple[List[Any], bool]:
+    """
+    Resolve a mood within REQUEST_DEADLINE, through the response cache.
+    Returns the results and whether they are a degraded fallback.
+    """
+    try:
+        # Every upstream call made for this request shares one time budget
+        with request_deadline(REQUEST_DEADLINE):
+            async with asyncio.timeout(REQUEST_DEADLINE):
+                # Served from the mood-level cache when a similar mood was seen before
+                results = await response_cache.get_or_compute(
+                    mood=mood,
+                    media_type=media_type,
+                    limit=limit,
+                    compute=lambda: resolve_media(
+                        mood,
+                        media_type,
+                        limit,
+                        media_ai_service=media_ai_service,
+                        spotify_service=spotify_service,
+                        tmdb_service=tmdb_service,
+                        google_books_service=google_books_service,
+                        podcast_service=podcast_service
+                    )
+                )
+        if results:
+            return results, False
+
+        # Nothing resolved, e.g. the catalogs are unreachable: serve the
+        # list stored before, if any
+        stored = await recommendation_store.get(response_cache.make_key(mood, media_type, limit))
+        return stored or [], stored is not None
+
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in get_media_recommendations: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        # Answer with whatever is cached or stored rather than failing the request
+        print(f"Error in get_media_recommendations, serving degraded response: {e!r}")
+        results = response_cache.get(mood, media_type, limit)
+        if results is None:
+            results = await recommendation_store.get(response_cache.make_key(mood, media_type, limit))
+        return results or [], True
 
 
-# Legacy endpoint for backward compatibility
-@router.post("/recommendations", response_model=RecommendationResponse)
-async def get_music_recommendations(request: MoodRequest):
+async def get_media_recommendations_by_deadline(
+    request: MediaRequest,
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> MediaRecommendationResponse:
     """
-    Legacy music recommendations endpoint (backward compatibility)
+    Answer within request.deadline_ms, flagging titles that haven't resolved
+    yet as pending
     """
-    # Convert to MediaRequest
-    media_request = MediaRequest(
+    results = response_cache.get(request.mood, request.media_type, request.limit)
+    pending: List[str] = []
+    complete = True
+    degraded = False
+
+    if results is None:
+        try:
+            results, pending, complete = await resolve_media_by_deadline(
+                request.mood,
+                request.media_type,
+                request.limit,
+                request.deadline_ms / 1000,
+                media_ai_service=media_ai_service,
+                spotify_service=spotify_service,
+                tmdb_service=tmdb_service,
+                google_books_service=google_books_service,
+                podcast_service=podcast_service
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error in get_media_recommendations, serving degraded response: {e!r}")
+            results = []
+            degraded = True
+
+    return MediaRecommendationResponse(
         mood=request.mood,
-        media_type="music",
-        limit=request.limit
+        media_type=request.media_type,
+        results=results,
+        total_found=len(results),
+        degraded=degraded,
+        partial=not complete,
+        pending=pending,
+        pending_count=0 if complete else max(request.limit - len(results), 0)
+    )
+
+
+@router.post("/media-recommendations/stream", dependencies=[Depends(rate_limited)])
+async def stream_media_recommendations(
+    request: MediaRequest,
+    fields: Optional[str] = None,
+    accept: Optional[str] = Header(default=None),
+    media_ai_service: MediaAIService = Depends(get_media_ai_service),
+    spotify_service: SpotifyService = Depends(get_spotify_service),
+    tmdb_service: TMDbService = Depends(get_tmdb_service),
+    google_books_service: GoogleBooksService = Depends(get_google_books_service),
+    podcast_service: PodcastService = Depends(get_podcast_service)
+):
+    """
+    Stream recommendations as NDJSON (or server-sent events when the client
+    accepts text/event-stream). Each resolved item is sent as an "item"
+    frame, followed by a "summary" frame with total_found, and partial when
+    REQUEST_DEADLINE cut the stream short. fields=a,b,c limits each item to
+    those fields.
+    """
+    check_media_type(request.media_type)
+    mood_traffic.record(request.mood, request.media_type, request.limit)
+    use_sse = accept is not None and "text/event-stream" in accept
+    item_fields = parse_fields(fields)
+
+    def frame(payload: dict) -> str:
+        include = None if item_fields is None or "item" not in payload else {
+            **{key: True for key in payload}, "item": item_fields
+        }
+        data = to_json(payload, include=include).decode()
+        return f"data: {data}\n\n" if use_sse else f"{data}\n"
+
+    async def frames() -> AsyncIterator[str]:
+        # Cached lists are sent straight away
+        results = response_cache.get(request.mood, request.media_type, request.limit)
+        partial = False
+        try:
+            if results is not None:
+                for rank, item in enumerate(results):
+                    yield frame({"type": "item", "rank": rank, "item": item})
+            else:
+                ranked = []
+                loop = asyncio.get_running_loop()
+                deadline_at = loop.time() + REQUEST_DEADLINE
+                # Bounded like any other request; upstream calls share the budget
+                with request_deadline(REQUEST_DEADLINE):
+                    items = stream_media(
+                        request.mood,
+                        request.media_type,
+                        request.limit,
+                        media_ai_service=media_ai_service,
+                        spotify_service=spotify_service,
+                        tmdb_service=tmdb_service,
+                        google_books_service=google_books_service,
+                        podcast_service=podcast_service
+                    )
+                    try:
+                        while True:
+                            rank, item = await asyncio.wait_for(
+                                anext(items), timeout=max(deadline_at - loop.time(), 0)
+                            )
+                            ranked.append((rank, item))
+                            yield frame({"type": "item", "rank": rank, "item": item})
+                    except StopAsyncIteration:
+                        pass
+                    except TimeoutError:
+                        partial = True
+                    finally:
+                        await items.aclose()
+
+                results = [item for _, item in sorted(ranked, key=lambda pair: pair[0])]
+                # Only complete lists are cached; a short one would be served as is
+                if not partial and len(results) >= request.limit:
+                    response_cache.put(request.mood, request.media_type, request.limit, results)
+
+            yield frame({
+                "type": "summary",
+                "mood": request.mood,
+                "media_type": request.media_type,
+                "total_found": len(results),
+                "partial": partial
+            })
+
+        except Exception as e:
+            print(f"Error in stream_media_recommendations: {e}")
+            yield frame({"type": "error", "detail": "Internal server error"})
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson"
+    )
+
+
+@router.post("/media-recommendations/batch", response_model=BatchMediaResponse)
+async def get_batch_media_recommendations(
+    request: BatchMediaRequest,
+    http_request: Request,
+    fields: Optional[str] = None,
+    media_ai_service: MediaAIService = Depends(get_media_ai_service),
+    spotify_service: SpotifyService = Depends(get_spotify_service),
+    tmdb_service: TMDbService = Depends(get_tmdb_service),
+    google_books_service: GoogleBooksService = Depends(get_google_books_service),
+    podcast_service: PodcastService = Depends(get_podcast_service)
+):
+    """
+    Get recommendations for several (mood, media_type, limit) requests in one
+    call. Prompts share LLM completions and catalog lookups are deduplicated
+    across the whole batch. Errors are reported per item. fields=a,b,c
+    limits each result to those fields. Each item counts towards the
+    client's rate limit, and upstream calls run at batch priority.
+    """
+    enforce_rate_limit(http_request, cost=len(request.requests))
+    with request_priority(BATCH):
+        response = await resolve_batch(
+            request.requests,
+            media_ai_service=media_ai_service,
+            spotify_service=spotify_service,
+            tmdb_service=tmdb_service,
+            google_books_service=google_books_service,
+            podcast_service=podcast_service
+        )
+    item_include = results_include(BatchMediaResult, parse_fields(fields))
+    return ModelResponse(response, include=item_include and {"results": {"__all__": item_include}})
+
+
+async def resolve_batch(
+    items: List[MediaRequest],
+    media_ai_service: MediaAIService,
+    spotify_service: SpotifyService,
+    tmdb_service: TMDbService,
+    google_books_service: GoogleBooksService,
+    podcast_service: PodcastService
+) -> BatchMediaResponse:
+    """Resolve batch items, sharing LLM completions and catalog lookups"""
+    results: List[Optional[List[Any]]] = [None] * len(items)
+    errors: List[Optional[str]] = [None] * len(items)
+
+    # Serve cached items and group identical uncached prompts
+    pending = {}
+    for index, item in enumerate(items):
+        try:
+            check_media_type(item.media_type)
+        except HTTPException as e:
+            errors[index] = e.detail
+            continue
+
+        mood_traffic.record(item.mood, item.media_type, item.limit)
+        cached = response_cache.get(item.mood, item.media_type, item.limit)
+        if cached is not None:
+            results[index] = cached
+        else:
+            key = response_cache.make_key(item.mood, item.media_type, item.limit)
+            pending.setdefault(key, []).append(index)
+
+    if pending:
+        prompts = [
+            (items[indexes[0]].mood, items[indexes[0]].media_type, items[indexes[0]].limit)
+            for indexes in pending.values()
+        ]
+        # Spares are resolved in the same round, so duplicates and misses
+        # are replaced without a second one
+        query_lists = await media_ai_service.get_batch_recommendations([
+            (mood, media_type, candidate_count(limit)) for mood, media_type, limit in prompts
+        ])
+        query_lists = [unique_queries(queries) for queries in query_lists]
+
+        # Resolve each distinct title once per media type
+        lookups = {
+            media_type: title_lookup(
+                media_type, spotify_service, tmdb_service, google_books_service, podcast_service
+            )
+            for media_type in ("music", "movies", "books", "podcasts")
+        }
+        distinct_titles = {media_type: {} for media_type in lookups}
+        for (_, media_type, _), queries in zip(prompts, query_lists):
+            for query in queries:
+                distinct_titles[media_type].setdefault(lookup_key(query), query)
+
+        resolved_lists = await asyncio.gather(*(
+            gather_limited(list(queries.values()), lookups[media_type])
+            for media_type, queries in distinct_titles.items()
+        ))
+        resolved = {
+            media_type: dict(zip(queries.keys(), items_found))
+            for (media_type, queries), items_found in zip(distinct_titles.items(), resolved_lists)
+        }
+
+        for ((mood, media_type, limit), queries), indexes in zip(zip(prompts, query_lists), pending.values()):
+            found = unique_items((resolved[media_type].get(lookup_key(query)) for query in queries), limit)
+            found = backfill(found, mood, media_type, limit)
+            response_cache.put(mood, media_type, limit, found)
+            for index in indexes:
+                results[index] = found
+
+    return BatchMediaResponse(
+        results=[
+            BatchMediaResult(
+                mood=item.mood,
+                media_type=item.media_type,
+                results=results[index] or [],
+                total_found=len(results[index] or []),
+                error=errors[index]
+            )
+            for index, item in enumerate(items)
+        ]
     )
-    
-    # Call the unified endpoint
-    media_response = await get_media_recommendations(media_request)
-    
-    # Convert back to legacy format
-    return RecommendationResponse(
-        mood=media_response.mood,
-        tracks=media_response.results,
-        total_found=media_response.total_found
+
+
+# Legacy endpoint for backward compatibility
+@router.post("/recommendations", response_model=RecommendationResponse, dependencies=[Depends(rate_limited)])
+async def get_music_recommendations(
+    request: MoodRequest,
+    media_ai_service: MediaAIService = Depends(get_media_ai_service),
+    spotify_service: SpotifyService = Depends(get_spotify_service),
+    tmdb_service: TMDbService = Depends(get_tmdb_service),
+    google_books_service: GoogleBooksService = Depends(get_google_books_service),
+    podcast_service: PodcastService = Depends(get_podcast_service)
+):
+    """
+    Legacy music recommendations endpoint (backward compatibility)
+    """
+    mood_traffic.record(request.mood, "music", request.limit)
+
+    # Same lookup as the unified endpoint, built straight into the legacy format
+    tracks, _ = await recommend(
+        request.mood,
+        "music",
+        request.limit,
+        media_ai_service=media_ai_service,
+        spotify_service=spotify_service,
+        tmdb_service=tmdb_service,
+        google_books_service=google_books_service,
+        podcast_service=podcast_service
     )
+    return ModelResponse(RecommendationResponse(mood=request.mood, tracks=tracks, total_found=len(tracks)))
 
 
 @router.get("/health")
@@ -94,18 +693,34 @@ async def health_check():
     return {"status": "healthy", "service": "unified-media-recommendation-api"}
 
 
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters for the in-process caches and request coalescing
+    """
+    return {
+        **cache_stats(),
+        "semantic_moods": semantic_index.stats(),
+        "single_flight": single_flight_stats()
+    }
+
+
+# Every media type the API serves, with where its items come from
+SUPPORTED_MEDIA_TYPES = {
+    "music": "Songs and tracks from Spotify",
+    "movies": "Movies from The Movie Database (TMDb)",
+    "books": "Books from Google Books API",
+    "podcasts": "Podcasts from a locally indexed catalog snapshot"
+}
+
+
 @router.get("/supported-media-types")
 async def get_supported_media_types():
     """
     Get list of supported media types
     """
     return {
-        "supported_types": ["music", "movies"],
-        "coming_soon": ["books", "podcasts"],
-        "description": {
-            "music": "Songs and tracks from Spotify",
-            "movies": "Movies from The Movie Database (TMDb)",
-            "books": "Books from Google Books API (coming soon)",
-            "podcasts": "Podcasts from Spotify/Listen Notes (coming soon)"
-        }
+        "supported_types": list(SUPPORTED_MEDIA_TYPES),
+        "coming_soon": [],
+        "description": SUPPORTED_MEDIA_TYPES
     }
\ No newline at end of file
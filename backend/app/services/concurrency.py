@@ -0,0 +1,53 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Max per-title lookups in flight for a single request
+PER_REQUEST_CONCURRENCY = int(os.getenv("PER_REQUEST_CONCURRENCY", 8))
+
+# Max per-title lookups in flight across the whole process
+GLOBAL_CONCURRENCY = int(os.getenv("GLOBAL_CONCURRENCY", 64))
+
+_global_semaphore = asyncio.Semaphore(GLOBAL_CONCURRENCY)
+
+
+def request_semaphore(limit: Optional[int] = None) -> asyncio.Semaphore:
+    """Semaphore capping the lookups of a single request"""
+    return asyncio.Semaphore(limit or PER_REQUEST_CONCURRENCY)
+
+
+async def run_limited(
+    func: Callable[[T], Awaitable[R]],
+    item: T,
+    semaphore: asyncio.Semaphore,
+) -> R:
+    """Run func(item) under the request's semaphore and the global one"""
+    async with semaphore:
+        async with _global_semaphore:
+            return await func(item)
+
+
+async def gather_limited(
+    items: Iterable[T],
+    func: Callable[[T], Awaitable[R]],
+    limit: Optional[int] = None,
+) -> List[Optional[R]]:
+    """
+    Run func over items concurrently, capped per call and globally.
+
+    Results keep the order of items. A failing item yields None instead of
+    cancelling the others.
+    """
+    items = list(items)
+    semaphore = request_semaphore(limit)
+    results: List[Any] = await asyncio.gather(
+        *(run_limited(func, item, semaphore) for item in items),
+        return_exceptions=True
+    )
+    for item, result in zip(items, results):
+        if isinstance(result, BaseException):
+            print(f"Lookup failed for '{item}': {result}")
+    return [None if isinstance(r, BaseException) else r for r in results]
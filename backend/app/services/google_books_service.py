@@ -0,0 +1,170 @@
+import os
+import re
+from typing import List, Optional
+from app.metrics import STAGE_SECONDS, UPSTREAM_ERRORS
+from app.models import Book
+from app.services.cache import TTLCache
+from app.services.concurrency import gather_limited
+from app.services.http_client import get_http_client
+from app.services.query_cache import QueryCache, normalize_query
+from app.services.resilience import resilient_get
+from app.services.single_flight import SingleFlight
+from app.services.suggestions import Suggestion, same_title
+
+# Only the volume fields Book needs, so responses stay small
+VOLUME_FIELDS = (
+    "id,volumeInfo(title,authors,publishedDate,categories,industryIdentifiers,"
+    "imageLinks/thumbnail,averageRating,description,pageCount,infoLink)"
+)
+
+# Resolved books keyed by normalized LLM query
+_book_query_cache = QueryCache("google_books", Book)
+
+# Resolved books keyed by Google Books volume id and by ISBN, so a book
+# reached through different titles or identifiers is only fetched once
+_volume_cache = TTLCache(
+    name="google_books_volumes",
+    maxsize=int(os.getenv("GOOGLE_BOOKS_VOLUME_CACHE_SIZE", 20000)),
+    ttl=float(os.getenv("GOOGLE_BOOKS_VOLUME_CACHE_TTL", 7 * 86400))
+)
+
+_ISBN_RE = re.compile(r"^(97[89])?\d{9}[\dX]$")
+
+# In-flight upstream lookups keyed by normalized query or ISBN
+_book_lookups = SingleFlight("google_books_searches")
+
+
+class GoogleBooksService:
+    def __init__(self):
+        self.api_key = os.getenv("GOOGLE_BOOKS_API_KEY")
+        self.base_url = os.getenv("GOOGLE_BOOKS_BASE_URL", "https://www.googleapis.com/books/v1")
+
+    @property
+    def client(self):
+        # Resolved per call so the service can outlive a client restart
+        return get_http_client()
+
+    async def search_books(self, book_queries: List[str]) -> List[Book]:
+        """
+        Search for books on Google Books based on book queries
+        """
+        # Look up all titles concurrently, keeping the LLM's ranking order
+        results = await gather_limited(book_queries, self.search_book)
+        return [book for book in results if book is not None]
+
+    async def search_book(self, query: str) -> Optional[Book]:
+        """Search for a single 'Title by Author' book"""
+        found, book = await _book_query_cache.get(query)
+        if found:
+            return book
+
+        # Identical titles requested concurrently share one upstream search
+        return await _book_lookups.do(
+            ("query", normalize_query(query)), lambda: self._search_book_upstream(query)
+        )
+
+    async def get_book_by_isbn(self, isbn: str) -> Optional[Book]:
+        """Look up a book by ISBN-10 or ISBN-13"""
+        isbn = isbn.replace("-", "").strip()
+        book = _volume_cache.get(("isbn", isbn))
+        if book is not None:
+            return book
+
+        return await _book_lookups.do(("isbn", isbn), lambda: self._search_isbn_upstream(isbn))
+
+    async def _search_book_upstream(self, query: str) -> Optional[Book]:
+        try:
+            if isinstance(query, Suggestion):
+                title, author = query.title, query.creator
+            else:
+                # "Title by Author" narrows the search to both fields
+                title, _, author = query.rpartition(" by ")
+
+            # A suggested ISBN is an exact lookup, if it is the suggested book
+            isbn = (getattr(query, "external_id", None) or "").replace("-", "")
+            if _ISBN_RE.match(isbn):
+                book = await self.get_book_by_isbn(isbn)
+                if book is not None and same_title(book.title, title or query):
+                    _book_query_cache.set(query, book)
+                    return book
+
+            if title and author:
+                q = f'intitle:"{title}" inauthor:"{author}"'
+            else:
+                q = f'intitle:"{title}"' if title else query
+            book = await self._search_volumes(q)
+            _book_query_cache.set(query, book)
+            return book
+
+        except Exception as e:
+            print(f"Error searching for book '{query}': {e}")
+            UPSTREAM_ERRORS.inc(upstream="google_books")
+            return None
+
+    async def _search_isbn_upstream(self, isbn: str) -> Optional[Book]:
+        try:
+            return await self._search_volumes(f"isbn:{isbn}")
+        except Exception as e:
+            print(f"Error searching for ISBN '{isbn}': {e}")
+            UPSTREAM_ERRORS.inc(upstream="google_books")
+            return None
+
+    async def _search_volumes(self, q: str) -> Optional[Book]:
+        """Return the best volume matching a Google Books query, if any"""
+        params = {
+            'q': q,
+            'maxResults': 1,
+            'printType': 'books',
+            'fields': f"items({VOLUME_FIELDS})"
+        }
+        if self.api_key:
+            params['key'] = self.api_key
+
+        with STAGE_SECONDS.time(stage="google_books_search"):
+            response = await resilient_get(self.client, "google_books", f"{self.base_url}/volumes", params=params)
+        response.raise_for_status()
+
+        items = response.json().get('items') or []
+        if not items:
+            return None
+
+        volume = items[0]
+        # A volume reached before under another title is reused as is
+        cached = _volume_cache.get(("volume", volume['id']))
+        return cached if cached is not None else self._store_volume(volume)
+
+    def _store_volume(self, volume: dict) -> Book:
+        """Build a Book and cache it under its volume id and ISBNs"""
+        book = self._build_book(volume)
+        _volume_cache.set(("volume", volume['id']), book)
+        for identifier in volume.get('volumeInfo', {}).get('industryIdentifiers', []):
+            if identifier.get('type') in ('ISBN_13', 'ISBN_10'):
+                _volume_cache.set(("isbn", identifier['identifier']), book)
+        return book
+
+    def _build_book(self, volume: dict) -> Book:
+        info = volume.get('volumeInfo', {})
+
+        isbn = None
+        for identifier in info.get('industryIdentifiers', []):
+            if identifier.get('type') == 'ISBN_13':
+                isbn = identifier['identifier']
+                break
+            if identifier.get('type') == 'ISBN_10':
+                isbn = identifier['identifier']
+
+        published = info.get('publishedDate') or ''
+        cover_url = info.get('imageLinks', {}).get('thumbnail')
+
+        return Book(
+            title=info.get('title', ''),
+            author=", ".join(info.get('authors', [])) or "Unknown",
+            isbn=isbn,
+            year=int(published[:4]) if published[:4].isdigit() else None,
+            genres=info.get('categories', []),
+            google_books_url=info.get('infoLink') or f"https://books.google.com/books?id={volume['id']}",
+            cover_url=cover_url.replace('http://', 'https://') if cover_url else None,
+            rating=info.get('averageRating'),
+            description=info.get('description'),
+            page_count=info.get('pageCount')
+        )
@@ -0,0 +1,47 @@
+import os
+from typing import Optional
+
+import httpx
+
+# Shared app-lifetime client, created at startup and closed at shutdown
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30.0)),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("HTTP_TIMEOUT", 10.0)),
+        connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", 5.0)),
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Create the shared HTTP client (called on app startup)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client, creating it lazily when used outside the app
+    lifecycle (scripts, tests)
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
@@ -1,141 +1,351 @@
+import asyncio
 import os
-from openai import OpenAI
-from typing import List
+from openai import AsyncOpenAI
+from typing import Any, AsyncIterator, List, Optional, Tuple
 import json
-import re
-import random
+from app.metrics import FALLBACKS, STAGE_SECONDS, UPSTREAM_ERRORS, timed
+from app.services import mood_index
+from app.services.resilience import UPSTREAM_TIMEOUTS, CircuitOpenError, breakers, with_llm_resilience
+from app.services.response_cache import normalize_mood, revalidating
+from app.services.semantic_index import semantic_index
+from app.services.shared_cache import get_shared_cache, write_behind
+from app.services.upstream_budget import BudgetExceeded
+from app.services.suggestions import (
+    MEDIA_FIELDS, RESPONSE_FORMAT, parse_suggestions, suggestion_from_item, suggestion_to_item,
+    suggestions_from_items
+)
+
+# Customize prompt based on media type
+MEDIA_PROMPTS = {
+    "music": "songs that would match this mood",
+    "movies": "movies that would match this mood",
+    "books": "books that would match this mood",
+    "podcasts": "podcasts that would match this mood"
+}
+
+# "llm": ask the LLM, use the local index only when it fails
+# "local_first": answer from the local index when the mood matches a category
+# "local": never call the LLM
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "llm")
+
+# Max (mood, media_type) prompts combined into one batch completion
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", 8))
+
+# Client-side retries; the request deadline still bounds the whole call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 1))
+
+# Seconds an LLM answer stays in the shared cache, reused by every worker
+LLM_SHARED_CACHE_TTL = float(os.getenv("LLM_SHARED_CACHE_TTL", 3600))
 
 
 class MediaAIService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client: Optional[AsyncOpenAI] = None
+        try:
+            self.client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                timeout=UPSTREAM_TIMEOUTS["openai"],
+                max_retries=LLM_MAX_RETRIES
+            )
+        except Exception as e:
+            # Without credentials every request is served from the fallback
+            print(f"OpenAI client unavailable, using fallback recommendations: {e}")
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+    async def _get_shared(self, mood: str, media_type: str, limit: int) -> Optional[List[str]]:
+        """An LLM answer for the same prompt stored by any worker"""
+        backend = get_shared_cache()
+        if backend is None:
+            return None
+        found, raw, _ = await backend.get("llm_recommendations", f"{media_type}|{limit}|{normalize_mood(mood)}")
+        if not found or raw is None:
+            return None
+        return suggestions_from_items(json.loads(raw), media_type, limit) or None
+
+    def _set_shared(self, mood: str, media_type: str, limit: int, recommendations: List[str]) -> None:
+        if get_shared_cache() is not None:
+            raw = json.dumps([suggestion_to_item(suggestion) for suggestion in recommendations])
+            write_behind(
+                "llm_recommendations", f"{media_type}|{limit}|{normalize_mood(mood)}", raw, LLM_SHARED_CACHE_TTL
+            )
 
     def get_fallback_recommendations(self, mood: str, media_type: str, limit: int = 10) -> List[str]:
         """
         Smart fallback recommendations based on mood keywords and media type
         """
-        mood_lower = mood.lower()
-        
-        fallback_data = {
-            "music": {
-                "happy": ["Pharrell Williams - Happy", "The Beatles - Here Comes the Sun", "Queen - Don't Stop Me Now"],
-                "sad": ["Johnny Cash - Hurt", "Mad World - Gary Jules", "Tears in Heaven - Eric Clapton"],
-                "energetic": ["The Killers - Mr. Brightside", "Queen - We Will Rock You", "AC/DC - Thunderstruck"],
-                "chill": ["Norah Jones - Come Away With Me", "Jack Johnson - Better Together", "Zero 7 - In the Waiting Line"],
-                "romantic": ["Ed Sheeran - Perfect", "John Legend - All of Me", "Etta James - At Last"]
-            },
-            "movies": {
-                "happy": ["The Grand Budapest Hotel", "Paddington", "The Princess Bride", "About Time"],
-                "sad": ["Her", "Manchester by the Sea", "The Pursuit of Happyness", "Inside Out"],
-                "action": ["Mad Max: Fury Road", "John Wick", "The Dark Knight", "Mission: Impossible - Fallout"],
-                "thriller": ["Gone Girl", "Zodiac", "No Country for Old Men", "Prisoners"],
-                "comedy": ["Superbad", "Bridesmaids", "Knives Out", "Game Night"],
-                "romantic": ["Before Sunrise", "The Notebook", "Her", "Casablanca"],
-                "scary": ["Hereditary", "The Conjuring", "Get Out", "A Quiet Place"]
-            },
-            "books": {
-                "happy": ["The Alchemist", "Eat Pray Love", "The Happiness Project", "Big Magic"],
-                "sad": ["A Man Called Ove", "The Fault in Our Stars", "Me Before You", "The Light We Lost"],
-                "thriller": ["Gone Girl", "The Girl with the Dragon Tattoo", "The Silent Patient", "Big Little Lies"],
-                "romance": ["Pride and Prejudice", "The Notebook", "Me Before You", "It Ends with Us"],
-                "inspiring": ["Atomic Habits", "The 7 Habits of Highly Effective People", "Educated", "Becoming"]
-            },
-            "podcasts": {
-                "educational": ["Radiolab", "Stuff You Should Know", "TED Talks Daily", "The Daily"],
-                "comedy": ["Conan O'Brien Needs a Friend", "My Dad Wrote A Porno", "Comedy Bang! Bang!", "The Joe Rogan Experience"],
-                "true_crime": ["Serial", "My Favorite Murder", "Criminal", "Dateline NBC"],
-                "business": ["How I Built This", "The Tim Ferriss Show", "Masters of Scale", "Planet Money"],
-                "storytelling": ["This American Life", "The Moth", "Reply All", "Heavyweight"]
-            }
-        }
-        
-        # Default recommendations
-        default_items = fallback_data.get(media_type, {}).get("happy", [
-            "The Shawshank Redemption" if media_type == "movies" else 
-            "The Beatles - Here Comes the Sun" if media_type == "music" else
-            "The Alchemist" if media_type == "books" else
-            "This American Life"
-        ])
-        
-        # Find matching category
-        media_data = fallback_data.get(media_type, {})
-        selected_items = default_items
-        
-        for category, items in media_data.items():
-            if category in mood_lower:
-                selected_items = items
-                break
-        
-        # Additional keyword matching
-        if media_type == "movies":
-            if any(word in mood_lower for word in ["laugh", "funny", "humor"]):
-                selected_items = media_data.get("comedy", default_items)
-            elif any(word in mood_lower for word in ["fear", "horror", "scary"]):
-                selected_items = media_data.get("scary", default_items)
-            elif any(word in mood_lower for word in ["action", "adrenaline", "explosive"]):
-                selected_items = media_data.get("action", default_items)
-        elif media_type == "podcasts":
-            if any(word in mood_lower for word in ["learn", "educational", "knowledge"]):
-                selected_items = media_data.get("educational", default_items)
-            elif any(word in mood_lower for word in ["business", "entrepreneur", "startup"]):
-                selected_items = media_data.get("business", default_items)
-            elif any(word in mood_lower for word in ["crime", "mystery", "murder"]):
-                selected_items = media_data.get("true_crime", default_items)
-        
-        random.shuffle(selected_items)
-        return selected_items[:limit]
+        return mood_index.recommend(mood, media_type, limit)
+
+    def _use_local_index(self, mood: str, media_type: str) -> bool:
+        """Whether RECOMMENDATION_MODE lets the local index answer this mood"""
+        if RECOMMENDATION_MODE == "local":
+            return True
+        return RECOMMENDATION_MODE == "local_first" and bool(mood_index.match_categories(mood, media_type))
+
+    def _build_messages(self, mood: str, media_type: str, limit: int) -> List[dict]:
+        """Build the chat messages asking for recommendations"""
+        prompt_template = MEDIA_PROMPTS.get(media_type, MEDIA_PROMPTS["music"])
+        fields = MEDIA_FIELDS.get(media_type, MEDIA_FIELDS["music"])
+
+        prompt = f"""
+Based on the mood/feeling: "{mood}", recommend {limit} {prompt_template}.
 
+Return a JSON object in this format: {RESPONSE_FORMAT}
+In each recommendation {fields}. Use null for anything you are not sure of.
+Focus on popular, well-known {media_type} that would be found in major databases.
+"""
+
+        return [
+            {"role": "system", "content": f"You are a {media_type} recommendation expert. Return only valid JSON objects with no additional text."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @timed("recommendations")
     async def get_media_recommendations(self, mood: str, media_type: str, limit: int = 10) -> List[str]:
         """
         Get recommendations for any media type based on mood
         """
-        # Customize prompt based on media type
-        media_prompts = {
-            "music": "songs that would match this mood. Return in format ['Artist - Song Title', ...]",
-            "movies": "movies that would match this mood. Return just movie titles ['Movie Title', ...]",
-            "books": "books that would match this mood. Return in format ['Book Title by Author', ...]",
-            "podcasts": "podcasts that would match this mood. Return just podcast names ['Podcast Name', ...]"
-        }
-        
-        prompt_template = media_prompts.get(media_type, media_prompts["music"])
-        
+        if self.client is None:
+            FALLBACKS.inc(media_type=media_type, reason="no_client")
+            return self.get_fallback_recommendations(mood, media_type, limit)
+
+        if self._use_local_index(mood, media_type):
+            return self.get_fallback_recommendations(mood, media_type, limit)
+
+        # A refresh wants a new answer, not one given before
+        if not revalidating():
+            # Another worker may already have asked the LLM for this mood
+            shared = await self._get_shared(mood, media_type, limit)
+            if shared is not None:
+                return shared
+
+            # Reuse the answer for a semantically close mood when there is one
+            similar = semantic_index.lookup(mood, media_type, limit)
+            if similar is not None:
+                return similar
+
+        try:
+            with STAGE_SECONDS.time(stage="llm", media_type=media_type):
+                response = await with_llm_resilience(lambda: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=self._build_messages(mood, media_type, limit),
+                    temperature=0.7,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"}
+                ))
+
+            # JSON mode guarantees a parseable object; items are validated one by one
+            recommendations = parse_suggestions(response.choices[0].message.content, media_type, limit)
+            if not recommendations:
+                raise ValueError("Completion contained no valid recommendations")
+
+            semantic_index.add(mood, media_type, recommendations)
+            self._set_shared(mood, media_type, limit, recommendations)
+            return recommendations
+
+        except CircuitOpenError:
+            # The LLM has been failing; don't wait on it again until it recovers
+            FALLBACKS.inc(media_type=media_type, reason="circuit_open")
+            return self.get_fallback_recommendations(mood, media_type, limit)
+        except BudgetExceeded:
+            FALLBACKS.inc(media_type=media_type, reason="over_budget")
+            return self.get_fallback_recommendations(mood, media_type, limit)
+        except Exception as e:
+            print(f"OpenAI API error for {media_type}: {e}")
+            UPSTREAM_ERRORS.inc(upstream="openai")
+            FALLBACKS.inc(media_type=media_type, reason="llm_error")
+            return self.get_fallback_recommendations(mood, media_type, limit)
+
+    async def get_batch_recommendations(self, prompts: List[Tuple[str, str, int]]) -> List[List[str]]:
+        """
+        Get recommendations for several (mood, media_type, limit) prompts,
+        combining them into as few completions as possible
+        """
+        results: List[List[str]] = [[] for _ in prompts]
+        llm_indexes = []
+        for index, (mood, media_type, limit) in enumerate(prompts):
+            if self.client is None or self._use_local_index(mood, media_type):
+                results[index] = self.get_fallback_recommendations(mood, media_type, limit)
+            else:
+                llm_indexes.append(index)
+
+        chunks = [
+            llm_indexes[start:start + BATCH_MAX_PROMPTS]
+            for start in range(0, len(llm_indexes), BATCH_MAX_PROMPTS)
+        ]
+        chunk_results = await asyncio.gather(
+            *(self._get_batch_chunk([prompts[index] for index in chunk]) for chunk in chunks)
+        )
+        for chunk, chunk_result in zip(chunks, chunk_results):
+            for index, recommendations in zip(chunk, chunk_result):
+                results[index] = recommendations
+        return results
+
+    async def _get_batch_chunk(self, prompts: List[Tuple[str, str, int]]) -> List[List[str]]:
+        """Answer up to BATCH_MAX_PROMPTS prompts with a single completion"""
+        if len(prompts) == 1:
+            return [await self.get_media_recommendations(*prompts[0])]
+
+        answers = {}
+        requests = "\n".join(
+            f'"{index}": {limit} {MEDIA_PROMPTS.get(media_type, MEDIA_PROMPTS["music"])} '
+            f'({MEDIA_FIELDS.get(media_type, MEDIA_FIELDS["music"])}). Mood/feeling: "{mood}"'
+            for index, (mood, media_type, limit) in enumerate(prompts)
+        )
+        item_format = RESPONSE_FORMAT[len('{"recommendations": ['):-len(']}')]
         prompt = f"""
-Based on the mood/feeling: "{mood}", recommend {limit} {prompt_template}
+Answer each of the following recommendation requests:
+{requests}
 
-Please return ONLY a JSON array of strings in the exact format specified above.
-Focus on popular, well-known {media_type} that would be found in major databases.
-Make sure each entry follows the specified format exactly.
+Return a JSON object mapping each request id to an array of recommendations in this format: {item_format}
+Use null for anything you are not sure of.
+Focus on popular, well-known titles that would be found in major databases.
 """
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": f"You are a {media_type} recommendation expert. Return only valid JSON arrays with no additional text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1000
-            )
+            with STAGE_SECONDS.time(stage="llm", media_type="batch"):
+                response = await with_llm_resilience(lambda: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You are a media recommendation expert. Return only valid JSON objects with no additional text."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=min(400 * len(prompts), 4000),
+                    response_format={"type": "json_object"}
+                ))
 
-            content = response.choices[0].message.content.strip()
-            
-            # Extract JSON array from the response
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                recommendations = json.loads(json_str)
-                return recommendations[:limit]
-            else:
-                # Fallback parsing
-                lines = content.strip().split('\n')
-                recommendations = []
-                for line in lines:
-                    line = line.strip().strip('"').strip("'").strip(',')
-                    if line and len(recommendations) < limit:
-                        recommendations.append(line)
-                return recommendations
+            answers = json.loads(response.choices[0].message.content)
 
+        except (CircuitOpenError, BudgetExceeded):
+            pass
         except Exception as e:
-            print(f"OpenAI API error for {media_type}: {e}")
-            return self.get_fallback_recommendations(mood, media_type, limit)
\ No newline at end of file
+            print(f"OpenAI API error for batch: {e}")
+            UPSTREAM_ERRORS.inc(upstream="openai")
+
+        results = []
+        for index, (mood, media_type, limit) in enumerate(prompts):
+            items = answers.get(str(index)) if isinstance(answers, dict) else None
+            recommendations = suggestions_from_items(items, media_type, limit) if isinstance(items, list) else []
+            if recommendations:
+                semantic_index.add(mood, media_type, recommendations)
+                self._set_shared(mood, media_type, limit, recommendations)
+                results.append(recommendations)
+            else:
+                FALLBACKS.inc(media_type=media_type, reason="llm_error")
+                results.append(self.get_fallback_recommendations(mood, media_type, limit))
+        return results
+
+    async def stream_media_recommendations(self, mood: str, media_type: str, limit: int = 10) -> AsyncIterator[str]:
+        """
+        Yield recommendations one at a time as the LLM streams them, without
+        waiting for the JSON array to close
+        """
+        count = 0
+
+        if self.client is not None and not self._use_local_index(mood, media_type):
+            similar = semantic_index.lookup(mood, media_type, limit)
+            if similar is not None:
+                for item in similar:
+                    yield item
+                return
+
+            streamed = []
+            try:
+                stream = await with_llm_resilience(lambda: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=self._build_messages(mood, media_type, limit),
+                    temperature=0.7,
+                    max_tokens=1000,
+                    response_format={"type": "json_object"},
+                    stream=True
+                ))
+
+                parser = JSONArrayStreamParser()
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    for element in parser.feed(chunk.choices[0].delta.content or ""):
+                        item = suggestion_from_item(element, media_type)
+                        if item is not None and count < limit:
+                            count += 1
+                            streamed.append(item)
+                            yield item
+
+                if count:
+                    semantic_index.add(mood, media_type, streamed)
+                    return
+
+            except (CircuitOpenError, BudgetExceeded):
+                pass
+            except Exception as e:
+                print(f"OpenAI streaming error for {media_type}: {e}")
+                UPSTREAM_ERRORS.inc(upstream="openai")
+                breakers["openai"].record_failure()
+                # Titles already sent can't be recalled, so keep the partial list
+                if count:
+                    return
+
+        if not self._use_local_index(mood, media_type):
+            FALLBACKS.inc(media_type=media_type, reason="no_client" if self.client is None else "llm_error")
+        for item in self.get_fallback_recommendations(mood, media_type, limit):
+            yield item
+
+
+class JSONArrayStreamParser:
+    """
+    Incrementally extracts the elements of the first JSON array in a
+    streamed document (e.g. {"recommendations": [{...}, {...}]}), so each
+    one can be used as soon as it is complete
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._array_depth: Optional[int] = None
+        self._in_string = False
+        self._escaped = False
+        self._element: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[Any]:
+        elements = []
+        for char in chunk:
+            if self._element is not None:
+                self._element.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == self._array_depth:
+                        elements.append(self._finish())
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == self._array_depth and self._element is None:
+                    self._element = [char]
+            elif char in "[{":
+                if self._depth == self._array_depth and self._element is None:
+                    self._element = [char]
+                self._depth += 1
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = self._depth
+            elif char in "]}":
+                self._depth = max(self._depth - 1, 0)
+                if self._depth == self._array_depth and self._element is not None:
+                    elements.append(self._finish())
+
+        return [element for element in elements if element is not None]
+
+    def _finish(self) -> Any:
+        text = "".join(self._element)
+        self._element = None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
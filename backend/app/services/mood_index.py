@@ -0,0 +1,144 @@
+import random
+import re
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+
+from app.services.response_cache import normalize_mood
+
+# Candidate items per media type and mood category
+_CATALOG: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "music": {
+        "happy": ("Pharrell Williams - Happy", "The Beatles - Here Comes the Sun", "Queen - Don't Stop Me Now"),
+        "sad": ("Johnny Cash - Hurt", "Mad World - Gary Jules", "Tears in Heaven - Eric Clapton"),
+        "energetic": ("The Killers - Mr. Brightside", "Queen - We Will Rock You", "AC/DC - Thunderstruck"),
+        "chill": ("Norah Jones - Come Away With Me", "Jack Johnson - Better Together", "Zero 7 - In the Waiting Line"),
+        "romantic": ("Ed Sheeran - Perfect", "John Legend - All of Me", "Etta James - At Last"),
+    },
+    "movies": {
+        "happy": ("The Grand Budapest Hotel", "Paddington", "The Princess Bride", "About Time"),
+        "sad": ("Her", "Manchester by the Sea", "The Pursuit of Happyness", "Inside Out"),
+        "action": ("Mad Max: Fury Road", "John Wick", "The Dark Knight", "Mission: Impossible - Fallout"),
+        "thriller": ("Gone Girl", "Zodiac", "No Country for Old Men", "Prisoners"),
+        "comedy": ("Superbad", "Bridesmaids", "Knives Out", "Game Night"),
+        "romantic": ("Before Sunrise", "The Notebook", "Her", "Casablanca"),
+        "scary": ("Hereditary", "The Conjuring", "Get Out", "A Quiet Place"),
+    },
+    "books": {
+        "happy": ("The Alchemist", "Eat Pray Love", "The Happiness Project", "Big Magic"),
+        "sad": ("A Man Called Ove", "The Fault in Our Stars", "Me Before You", "The Light We Lost"),
+        "thriller": ("Gone Girl", "The Girl with the Dragon Tattoo", "The Silent Patient", "Big Little Lies"),
+        "romance": ("Pride and Prejudice", "The Notebook", "Me Before You", "It Ends with Us"),
+        "inspiring": ("Atomic Habits", "The 7 Habits of Highly Effective People", "Educated", "Becoming"),
+    },
+    "podcasts": {
+        "educational": ("Radiolab", "Stuff You Should Know", "TED Talks Daily", "The Daily"),
+        "comedy": ("Conan O'Brien Needs a Friend", "My Dad Wrote A Porno", "Comedy Bang! Bang!", "The Joe Rogan Experience"),
+        "true_crime": ("Serial", "My Favorite Murder", "Criminal", "Dateline NBC"),
+        "business": ("How I Built This", "The Tim Ferriss Show", "Masters of Scale", "Planet Money"),
+        "storytelling": ("This American Life", "The Moth", "Reply All", "Heavyweight"),
+    },
+}
+
+# Mood words that select a category, besides the category name itself
+_KEYWORDS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "music": {
+        "energetic": ("energy", "workout", "pumped", "party", "dance"),
+        "chill": ("calm", "relax", "mellow", "study", "peaceful"),
+        "romantic": ("love", "romance", "date"),
+    },
+    "movies": {
+        "comedy": ("laugh", "funny", "humor"),
+        "scary": ("fear", "horror", "scared"),
+        "action": ("adrenaline", "explosive"),
+        "thriller": ("suspense", "tense", "mystery"),
+        "romantic": ("love", "romance", "date"),
+    },
+    "books": {
+        "romance": ("love", "romantic"),
+        "inspiring": ("motivated", "motivation", "inspired", "growth"),
+        "thriller": ("suspense", "mystery"),
+    },
+    "podcasts": {
+        "educational": ("learn", "knowledge", "curious"),
+        "business": ("entrepreneur", "startup", "money"),
+        "true_crime": ("crime", "mystery", "murder"),
+        "comedy": ("laugh", "funny", "humor"),
+        "storytelling": ("story", "stories"),
+    },
+}
+
+# Category served when nothing in the mood matches
+_DEFAULT_CATEGORY = {"music": "happy", "movies": "happy", "books": "happy", "podcasts": "storytelling"}
+
+# Keywords shorter than this only match whole words, longer ones also match
+# as a word prefix ("laughing" -> "laugh")
+_MIN_PREFIX = 4
+
+
+def _build_index() -> Mapping[str, Mapping[str, Tuple[str, ...]]]:
+    """Invert the keyword lists into media_type -> keyword -> categories"""
+    index: Dict[str, Dict[str, List[str]]] = {}
+    for media_type, categories in _CATALOG.items():
+        keywords = index.setdefault(media_type, {})
+        for category in categories:
+            words = {category, *category.split("_")}
+            words.update(_KEYWORDS.get(media_type, {}).get(category, ()))
+            for word in words:
+                keywords.setdefault(word, []).append(category)
+
+    return MappingProxyType({
+        media_type: MappingProxyType({word: tuple(categories) for word, categories in keywords.items()})
+        for media_type, keywords in index.items()
+    })
+
+
+# Built once at import and never mutated, so it is safe to share across requests
+CATALOG: Mapping[str, Mapping[str, Tuple[str, ...]]] = MappingProxyType({
+    media_type: MappingProxyType(categories) for media_type, categories in _CATALOG.items()
+})
+INDEX = _build_index()
+
+
+def _mood_tokens(mood: str) -> List[str]:
+    # Raw words plus their canonical synonyms ("joyful" -> "happy")
+    words = re.findall(r"[a-z]+", mood.lower())
+    return list(dict.fromkeys(words + normalize_mood(mood).split()))
+
+
+def match_categories(mood: str, media_type: str) -> List[str]:
+    """
+    Categories matching the mood's words, best match first
+    """
+    keywords = INDEX.get(media_type)
+    if not keywords:
+        return []
+
+    scores: Dict[str, int] = {}
+    for token in _mood_tokens(mood):
+        matched = keywords.get(token, ())
+        if not matched:
+            for end in range(len(token) - 1, _MIN_PREFIX - 1, -1):
+                matched = keywords.get(token[:end], ())
+                if matched:
+                    break
+        for category in matched:
+            scores[category] = scores.get(category, 0) + 1
+
+    return sorted(scores, key=lambda category: -scores[category])
+
+
+def recommend(mood: str, media_type: str, limit: int = 10) -> List[str]:
+    """
+    Recommend items from the local index without calling the LLM
+    """
+    categories = CATALOG.get(media_type, CATALOG["music"])
+    matched = match_categories(mood, media_type) or [_DEFAULT_CATEGORY.get(media_type, "happy")]
+
+    # Best category first, shuffled within each category
+    candidates: List[str] = []
+    for category in matched:
+        items = categories.get(category, ())
+        for item in random.sample(items, len(items)):
+            if item not in candidates:
+                candidates.append(item)
+    return candidates[:limit]
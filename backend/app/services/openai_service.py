@@ -1,13 +1,12 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 from typing import List
-import json
-import re
+from app.services.suggestions import RESPONSE_FORMAT, parse_suggestions
 
 
 class OpenAIService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
     async def get_music_recommendations(self, mood: str, limit: int = 10) -> List[str]:
         """
@@ -16,41 +15,26 @@ class OpenAIService:
         prompt = f"""
 Based on the mood/feeling: "{mood}", recommend {limit} songs that would match this mood.
 
-Please return ONLY a JSON array of strings in this exact format:
-["Artist Name - Song Title", "Artist Name - Song Title", ...]
-
+Return a JSON object in this format: {RESPONSE_FORMAT}
+In each recommendation title is the song title, creator the main artist and id the Spotify track id.
+Use null for anything you are not sure of.
 Focus on popular, well-known songs that are likely to be found on Spotify.
-Make sure each entry follows the format "Artist Name - Song Title" exactly.
 """
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
-                    {"role": "system", "content": "You are a music recommendation expert. Return only valid JSON arrays with no additional text."},
+                    {"role": "system", "content": "You are a music recommendation expert. Return only valid JSON objects with no additional text."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.7,
-                max_tokens=1000
+                max_tokens=1000,
+                response_format={"type": "json_object"}
             )
 
-            content = response.choices[0].message.content.strip()
-            
-            # Extract JSON array from the response
-            json_match = re.search(r'\[.*\]', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                recommendations = json.loads(json_str)
-                return recommendations[:limit]
-            else:
-                # Fallback parsing
-                lines = content.strip().split('\n')
-                recommendations = []
-                for line in lines:
-                    line = line.strip().strip('"').strip("'").strip(',')
-                    if ' - ' in line and len(recommendations) < limit:
-                        recommendations.append(line)
-                return recommendations
+            # "Artist - Title" strings carrying the structured fields
+            return parse_suggestions(response.choices[0].message.content, "music", limit)
 
         except Exception as e:
             print(f"OpenAI API error: {e}")
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+from difflib import SequenceMatcher, get_close_matches
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from app.metrics import UPSTREAM_ERRORS
+from app.models import Podcast
+from app.services.http_client import get_http_client
+
+# Local catalog snapshot: {"updated_at": ..., "podcasts": [Podcast fields, ...]}
+CATALOG_PATH = Path(os.getenv(
+    "PODCAST_CATALOG_PATH",
+    Path(__file__).resolve().parent.parent / "data" / "podcasts.json"
+))
+
+# Optional URL serving a snapshot in the same format; it replaces the local
+# snapshot on every refresh
+CATALOG_URL = os.getenv("PODCAST_CATALOG_URL")
+
+# Where snapshots downloaded from CATALOG_URL are kept; the bundled
+# CATALOG_PATH is never overwritten
+DOWNLOAD_PATH = Path(os.getenv(
+    "PODCAST_CATALOG_DOWNLOAD_PATH",
+    Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "moodify" / "podcasts.json"
+))
+
+# Seconds between refreshes of the snapshot
+REFRESH_INTERVAL = float(os.getenv("PODCAST_CATALOG_REFRESH", 3600))
+
+# Minimum similarity (0-1) for a fuzzy name match
+MATCH_CUTOFF = float(os.getenv("PODCAST_MATCH_CUTOFF", 0.75))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Words too common in podcast names to narrow down candidates
+_STOPWORDS = frozenset({"the", "a", "an", "and", "of", "with", "podcast", "show"})
+
+
+def _normalize(name: str) -> str:
+    name = name.lower().replace("&", "and")
+    return " ".join(_TOKEN_RE.findall(name))
+
+
+def _tokens(text: str) -> Set[str]:
+    return {token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS}
+
+
+class PodcastCatalog:
+    """
+    Immutable snapshot of the catalog with its lookup structures: exact
+    names, and an inverted index from name, creator and category words to
+    podcasts for narrowing fuzzy matches
+    """
+
+    def __init__(self, podcasts: List[Podcast]):
+        self.podcasts: Tuple[Podcast, ...] = tuple(podcasts)
+        self.by_name: Dict[str, int] = {}
+        self.index: Dict[str, Set[int]] = {}
+
+        for position, podcast in enumerate(self.podcasts):
+            self.by_name.setdefault(_normalize(podcast.title), position)
+            words = _tokens(podcast.title) | _tokens(podcast.creator)
+            for category in podcast.categories:
+                words |= _tokens(category)
+            for word in words:
+                self.index.setdefault(word, set()).add(position)
+
+        self.names: List[str] = list(self.by_name)
+
+    def __len__(self) -> int:
+        return len(self.podcasts)
+
+    def match(self, query: str) -> Optional[Podcast]:
+        """Best podcast for an LLM-suggested name, tolerating small variations"""
+        # "Serial by Sarah Koenig" / "Serial - Sarah Koenig"
+        candidates = [query]
+        for separator in (" by ", " - "):
+            if separator in query:
+                candidates.append(query.split(separator)[0])
+
+        for candidate in candidates:
+            position = self.by_name.get(_normalize(candidate))
+            if position is not None:
+                return self.podcasts[position]
+
+        name = _normalize(candidates[-1])
+        # Only compare against podcasts sharing a word with the query
+        shortlist: Set[int] = set()
+        for word in _tokens(name):
+            shortlist |= self.index.get(word, set())
+
+        best, best_score = None, MATCH_CUTOFF
+        for position in shortlist:
+            title = _normalize(self.podcasts[position].title)
+            score = SequenceMatcher(None, name, title).ratio()
+            if score > best_score:
+                best, best_score = position, score
+        if best is not None:
+            return self.podcasts[best]
+
+        # Misspelled words miss the index, so fall back to the full name list
+        close = get_close_matches(name, self.names, n=1, cutoff=MATCH_CUTOFF)
+        return self.podcasts[self.by_name[close[0]]] if close else None
+
+
+def load_catalog(path: Path = CATALOG_PATH) -> PodcastCatalog:
+    with open(path) as f:
+        snapshot = json.load(f)
+    return PodcastCatalog([Podcast(**podcast) for podcast in snapshot.get("podcasts", [])])
+
+
+class PodcastService:
+    """
+    Resolves podcast names against the local catalog snapshot, so lookups
+    never leave the process. The snapshot is swapped atomically on refresh.
+    """
+
+    def __init__(self, path: Path = CATALOG_PATH, download_path: Path = DOWNLOAD_PATH):
+        self.path = path
+        self.download_path = download_path
+        self._loaded: Tuple[Optional[Path], float] = (None, 0.0)
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.catalog = PodcastCatalog([])
+        self._reload()
+
+    async def start(self):
+        """Start refreshing the snapshot in the background"""
+        if self._refresh_task is None and REFRESH_INTERVAL > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_periodically())
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    async def search_podcasts(self, podcast_queries: List[str]) -> List[Podcast]:
+        """
+        Search for podcasts in the local catalog based on podcast queries
+        """
+        catalog = self.catalog
+        results = [catalog.match(query) for query in podcast_queries]
+        return [podcast for podcast in results if podcast is not None]
+
+    async def search_podcast(self, query: str) -> Optional[Podcast]:
+        """Search for a single podcast"""
+        return self.catalog.match(query)
+
+    def _snapshot_path(self) -> Path:
+        """The downloaded snapshot when there is one, else the bundled file"""
+        if CATALOG_URL and self.download_path.exists():
+            return self.download_path
+        return self.path
+
+    def _reload(self) -> None:
+        """Load the snapshot file if it changed since the last load"""
+        path = self._snapshot_path()
+        try:
+            mtime = path.stat().st_mtime
+            if (path, mtime) == self._loaded:
+                return
+            self.catalog = load_catalog(path)
+            self._loaded = (path, mtime)
+        except Exception as e:
+            print(f"Error loading podcast catalog from {path}: {e}")
+
+    async def _download(self) -> None:
+        """Replace the local snapshot with the one served at CATALOG_URL"""
+        try:
+            response = await get_http_client().get(CATALOG_URL)
+            response.raise_for_status()
+            snapshot = response.json()
+            # Validate before replacing the file so a bad download is never loaded
+            PodcastCatalog([Podcast(**podcast) for podcast in snapshot["podcasts"]])
+
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+        except Exception as e:
+            print(f"Error downloading podcast catalog: {e}")
+            UPSTREAM_ERRORS.inc(upstream="podcast_catalog")
+
+    def _write_snapshot(self, snapshot: Dict) -> None:
+        """
+        Atomically replace the downloaded snapshot. Each writer gets its own
+        temporary file, so workers refreshing at once never interleave.
+        """
+        directory = self.download_path.parent
+        directory.mkdir(parents=True, exist_ok=True)
+        temporary = tempfile.NamedTemporaryFile(
+            "w", dir=directory, prefix=".podcasts-", suffix=".tmp", delete=False
+        )
+        try:
+            with temporary:
+                json.dump(snapshot, temporary)
+            os.replace(temporary.name, self.download_path)
+        except BaseException:
+            Path(temporary.name).unlink(missing_ok=True)
+            raise
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            if CATALOG_URL:
+                await self._download()
+            await asyncio.to_thread(self._reload)
+            await asyncio.sleep(REFRESH_INTERVAL)
@@ -0,0 +1,188 @@
+import asyncio
+import os
+import random
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.metrics import Counter
+from app.services import mood_index
+from app.services.recommendation_store import recommendation_store
+from app.services.resilience import breakers
+from app.services.response_cache import normalize_mood, response_cache
+from app.services.shared_cache import claim
+from app.services.upstream_budget import BACKGROUND, set_priority, upstream_budget
+
+# Seconds between pre-warm cycles (0 disables the scheduler)
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", 300))
+
+# Seconds before the first cycle, plus up to as much again of jitter, so
+# workers started together don't all pre-warm at once
+PREWARM_INITIAL_DELAY = float(os.getenv("PREWARM_INITIAL_DELAY", 60))
+
+# Most requested moods kept warm per media type
+PREWARM_TOP_MOODS = int(os.getenv("PREWARM_TOP_MOODS", 20))
+
+# Upstream budget: recomputations per cycle, and how many run at once
+PREWARM_MAX_PER_CYCLE = int(os.getenv("PREWARM_MAX_PER_CYCLE", 30))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", 2))
+
+# Distinct moods tracked before the least requested are dropped
+PREWARM_TRACKED = int(os.getenv("PREWARM_TRACKED", 5000))
+
+PREWARM_MEDIA_TYPES = ("music", "movies", "books", "podcasts")
+DEFAULT_LIMIT = 10
+
+PREWARMS = Counter(
+    "moodify_prewarm_refreshes_total",
+    "Background pre-warm recomputations by media type and result"
+)
+
+Key = Tuple[str, str, int]
+
+
+class MoodTraffic:
+    """
+    Request counts per (normalized mood, media type, limit). Counts are
+    halved every pre-warm cycle so the ranking follows recent traffic.
+    """
+
+    def __init__(self, max_tracked: int = PREWARM_TRACKED):
+        self.max_tracked = max_tracked
+        self._counts: Dict[Key, float] = {}
+        # A raw mood per key, used as the prompt when pre-warming
+        self._moods: Dict[Key, str] = {}
+
+    def record(self, mood: str, media_type: str, limit: int) -> None:
+        key = (normalize_mood(mood), media_type, limit)
+        recommendation_store.hit(key)
+        self._counts[key] = self._counts.get(key, 0.0) + 1
+        self._moods.setdefault(key, mood)
+        if len(self._counts) > self.max_tracked:
+            self._trim()
+
+    def top(self, media_type: str, n: int) -> List[Tuple[str, int]]:
+        """The n most requested (mood, limit) pairs for a media type"""
+        keys = [key for key in self._counts if key[1] == media_type]
+        keys.sort(key=lambda key: -self._counts[key])
+        return [(self._moods[key], key[2]) for key in keys[:n]]
+
+    def decay(self) -> None:
+        for key in list(self._counts):
+            self._counts[key] /= 2
+            if self._counts[key] < 0.1:
+                del self._counts[key]
+                del self._moods[key]
+
+    def _trim(self) -> None:
+        ranked = sorted(self._counts, key=lambda key: -self._counts[key])
+        for key in ranked[self.max_tracked // 2:]:
+            del self._counts[key]
+            del self._moods[key]
+
+
+mood_traffic = MoodTraffic()
+
+
+class PrewarmScheduler:
+    """
+    Periodically recomputes the response cache entries that head traffic
+    hits: the most requested moods plus the local index's mood categories.
+    Entries are recomputed before they go stale, within a per-cycle budget,
+    and cycles are skipped while the LLM's circuit breaker is open. Its
+    upstream calls run at background priority, behind user requests.
+
+    With a shared cache each entry is claimed first, so only one worker
+    recomputes it; the others serve it from the shared LLM and catalog
+    caches when it is requested.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[str, str, int], Awaitable[List[Any]]],
+        interval: float = PREWARM_INTERVAL,
+        initial_delay: float = PREWARM_INITIAL_DELAY,
+    ):
+        self.compute = compute
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def candidates(self) -> List[Tuple[str, str, int]]:
+        """(mood, media_type, limit) entries to keep warm, most requested first"""
+        candidates = []
+        seen = set()
+        for media_type in PREWARM_MEDIA_TYPES:
+            moods = mood_traffic.top(media_type, PREWARM_TOP_MOODS)
+            moods += [
+                (category.replace("_", " "), DEFAULT_LIMIT) for category in mood_index.CATALOG[media_type]
+            ]
+            for mood, limit in moods:
+                key = response_cache.make_key(mood, media_type, limit)
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append((mood, media_type, limit))
+        return candidates
+
+    @property
+    def refresh_after(self) -> float:
+        """Age at which an entry is recomputed, ahead of going stale"""
+        return max(response_cache.fresh_ttl - 2 * self.interval, response_cache.fresh_ttl / 2)
+
+    def due(self) -> List[Tuple[str, str, int]]:
+        """Candidates that are missing or would go stale before the next cycle"""
+        due = []
+        for mood, media_type, limit in self.candidates():
+            age = response_cache.age(mood, media_type, limit)
+            if age is None or age >= self.refresh_after:
+                due.append((mood, media_type, limit))
+        return due
+
+    async def run_once(self) -> int:
+        """Run one cycle and return how many entries were recomputed"""
+        if breakers["openai"].state != "closed":
+            return 0
+
+        due = self.due()[:PREWARM_MAX_PER_CYCLE]
+        semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+        async def warm(mood: str, media_type: str, limit: int) -> None:
+            async with semaphore:
+                # Recomputing without the LLM would cache the fallback list
+                if upstream_budget.headroom("openai") < 1:
+                    PREWARMS.inc(media_type=media_type, result="over_budget")
+                    return
+                # Another worker recomputed it recently
+                key = "|".join(map(str, response_cache.make_key(mood, media_type, limit)))
+                if not await claim("prewarm", key, self.refresh_after):
+                    PREWARMS.inc(media_type=media_type, result="claimed")
+                    return
+                try:
+                    results = await response_cache.refresh(
+                        mood, media_type, limit, lambda: self.compute(mood, media_type, limit)
+                    )
+                    PREWARMS.inc(media_type=media_type, result="ok" if results else "empty")
+                except Exception as e:
+                    print(f"Pre-warm failed for '{mood}' ({media_type}): {e}")
+                    PREWARMS.inc(media_type=media_type, result="error")
+
+        await asyncio.gather(*(warm(*entry) for entry in due))
+        return len(due)
+
+    async def _run(self) -> None:
+        set_priority(BACKGROUND)
+        await asyncio.sleep(self.initial_delay + random.uniform(0, self.initial_delay))
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Pre-warm cycle failed: {e}")
+            mood_traffic.decay()
+            await asyncio.sleep(self.interval)
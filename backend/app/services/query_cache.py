@@ -0,0 +1,76 @@
+import os
+import re
+from typing import Generic, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.services.cache import TTLCache
+from app.services.shared_cache import get_shared_cache, write_behind
+
+M = TypeVar("M", bound=BaseModel)
+
+# Stored in the in-process tier for queries that resolved to nothing
+_NO_MATCH = object()
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize an LLM query string so trivial variations share a cache entry
+    """
+    query = query.lower().strip().strip("\"'`.,;")
+    query = re.sub(r"[–—]", "-", query)  # en/em dashes
+    query = re.sub(r"\s*-\s*", " - ", query)
+    return re.sub(r"\s+", " ", query)
+
+
+class QueryCache(Generic[M]):
+    """
+    Maps normalized LLM query strings to resolved catalog items.
+
+    Lookups go to an in-process LRU tier first and then, when one is
+    configured, to the shared cache backend, which outlives restarts and is
+    shared by all worker processes. Queries that resolved to no match are
+    cached too, with a shorter TTL.
+    """
+
+    def __init__(self, name: str, model: Type[M]):
+        self.name = name
+        self.model = model
+        self.ttl = float(os.getenv("QUERY_CACHE_TTL", 7 * 86400))
+        self.negative_ttl = float(os.getenv("QUERY_CACHE_NEGATIVE_TTL", 3600))
+        self._memory = TTLCache(
+            name=f"{name}_queries",
+            maxsize=int(os.getenv("QUERY_CACHE_SIZE", 10000)),
+            ttl=self.ttl,
+        )
+
+    async def get(self, query: str) -> Tuple[bool, Optional[M]]:
+        """
+        Return (found, item). item is None for a cached "no match".
+        """
+        key = normalize_query(query)
+        value = self._memory.get(key)
+        if value is not None:
+            return True, None if value is _NO_MATCH else value
+
+        shared = get_shared_cache()
+        if shared is None:
+            return False, None
+
+        found, raw, remaining = await shared.get(self.name, key)
+        if not found:
+            return False, None
+
+        item = self.model.model_validate_json(raw) if raw is not None else None
+        self._memory.set(key, _NO_MATCH if item is None else item, ttl=remaining)
+        return True, item
+
+    def set(self, query: str, item: Optional[M]) -> None:
+        """Store in the in-process tier now and in the shared one behind the caller"""
+        key = normalize_query(query)
+        ttl = self.ttl if item is not None else self.negative_ttl
+        self._memory.set(key, _NO_MATCH if item is None else item, ttl=ttl)
+
+        if get_shared_cache() is not None:
+            raw = item.model_dump_json() if item is not None else None
+            write_behind(self.name, key, raw, ttl)
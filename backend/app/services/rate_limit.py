@@ -0,0 +1,106 @@
+import math
+import os
+import time
+from collections import OrderedDict
+
+# Requests are spread over the workers, so each one enforces its share
+WORKERS = max(int(os.getenv("WEB_CONCURRENCY", 1)), 1)
+
+# Sustained requests per second allowed per client, and the burst on top
+# (0 disables the limiter)
+CLIENT_RATE_LIMIT = float(os.getenv("CLIENT_RATE_LIMIT", 2.0))
+CLIENT_BURST = float(os.getenv("CLIENT_BURST", 20))
+
+# Comma-separated API keys issued to clients. A request sending one of
+# them in X-API-Key is limited per key; any other request is limited by
+# its address, so made-up keys can't buy a fresh burst.
+CLIENT_API_KEYS = frozenset(key.strip() for key in os.getenv("CLIENT_API_KEYS", "").split(",") if key.strip())
+
+# Clients tracked before the least recently seen are forgotten
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 10000))
+
+
+class TokenBucket:
+    """
+    Holds up to burst tokens, refilled at rate tokens per second. A call
+    spends tokens; an empty bucket means the caller is over its rate.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def try_take(self, tokens: float = 1.0, keep: float = 0.0) -> bool:
+        """Take tokens if at least keep tokens would be left afterwards"""
+        self._refill()
+        if self.tokens - tokens >= keep:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1.0, keep: float = 0.0) -> float:
+        """Seconds until try_take(tokens, keep) would succeed"""
+        self._refill()
+        missing = tokens + keep - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+
+class ClientRateLimiter:
+    """
+    One token bucket per client key, so a single client hammering the API
+    is turned away without slowing everyone else down
+    """
+
+    def __init__(
+        self,
+        rate: float = CLIENT_RATE_LIMIT / WORKERS,
+        burst: float = CLIENT_BURST / WORKERS,
+        max_clients: int = RATE_LIMIT_MAX_CLIENTS,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.rejected = 0
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def acquire(self, client: str, cost: float = 1.0) -> float:
+        """
+        Charge cost requests to the client. Returns 0 when allowed, otherwise
+        the seconds until the client may retry.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        # A batch larger than the burst can still go through on a full bucket
+        cost = min(cost, bucket.burst)
+        if bucket.try_take(cost):
+            return 0.0
+        self.rejected += 1
+        return bucket.wait_time(cost)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+client_limiter = ClientRateLimiter()
@@ -0,0 +1,332 @@
+"""
+Persistent store of resolved items and the ranked lists served per mood,
+so a restarted node answers its top moods straight away and keeps serving
+them while the upstream APIs are unreachable.
+
+Snapshots can be exported and imported to seed other nodes:
+
+    python -m app.services.recommendation_store export snapshot.json
+    python -m app.services.recommendation_store import snapshot.json
+    python -m app.services.recommendation_store stats
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from app.models import MediaItem
+
+# SQLite file holding the store ("" disables it). Kept in the user's cache
+# directory, since the package tree may be read-only
+STORE_PATH = os.getenv(
+    "RECOMMENDATION_STORE_PATH",
+    str(Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "moodify" / "recommendations.db")
+)
+
+# Seconds between writes of newly resolved lists; they are also written on shutdown
+FLUSH_INTERVAL = float(os.getenv("RECOMMENDATION_STORE_FLUSH_INTERVAL", 30))
+
+# Most requested lists loaded into the response cache at startup
+PRELOAD_LISTS = int(os.getenv("RECOMMENDATION_STORE_PRELOAD", 2000))
+
+# Bytes of the file SQLite memory-maps for reads
+MMAP_SIZE = int(os.getenv("RECOMMENDATION_STORE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# Item ids per SQLite IN (...) query, below its bound-parameter limit
+READ_CHUNK = 500
+
+# Catalog URL identifying each item type
+URL_FIELDS = {
+    "music": "spotify_url",
+    "movie": "tmdb_url",
+    "book": "google_books_url",
+    "podcast": "spotify_url",
+}
+
+# (normalized mood, media_type, limit), as keyed by the response cache
+Key = Tuple[str, str, int]
+
+_items_adapter = TypeAdapter(List[MediaItem])
+
+
+def item_id(item: Any) -> str:
+    """Stable id of a resolved item: its type and catalog URL"""
+    return f"{item.media_type}:{getattr(item, URL_FIELDS[item.media_type])}"
+
+
+def _parse_items(rows: List[str]) -> List[Any]:
+    # One validation call for the whole batch instead of one per item
+    return _items_adapter.validate_json("[" + ",".join(rows) + "]")
+
+
+class RecommendationStore:
+    """
+    Resolved Track/Movie/Book/Podcast records keyed by item id, and
+    (mood, media_type, limit) -> ranked item ids with request counts.
+
+    Writes are buffered and flushed in the background, off the event
+    loop; reads at startup are bulk reads of a memory-mapped file.
+    """
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._pending_lists: Dict[Key, List[Any]] = {}
+        self._pending_hits: Dict[Key, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "item_id TEXT PRIMARY KEY, media_type TEXT NOT NULL, "
+                "data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS mood_lists ("
+                "mood TEXT NOT NULL, media_type TEXT NOT NULL, lim INTEGER NOT NULL, "
+                "item_ids TEXT NOT NULL, hits INTEGER NOT NULL DEFAULT 0, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (mood, media_type, lim))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def start(self) -> List[Tuple[Key, List[Any], float]]:
+        """Load the most requested lists and start flushing new ones"""
+        if not self.enabled:
+            return []
+        try:
+            loaded = await asyncio.to_thread(self.load, PRELOAD_LISTS)
+        except Exception as e:
+            print(f"Error loading recommendation store {self.path}: {e}")
+            loaded = []
+        if self._flush_task is None and FLUSH_INTERVAL > 0:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+        return loaded
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self.enabled:
+            await asyncio.to_thread(self._write, *self._take_pending())
+
+    def record(self, key: Key, results: List[Any]) -> None:
+        """Queue a freshly resolved list for the next flush"""
+        if self.enabled and results:
+            self._pending_lists[key] = results
+
+    def hit(self, key: Key) -> None:
+        """Count a request for the key, used to rank lists at startup"""
+        if self.enabled:
+            self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+
+    def _take_pending(self) -> Tuple[Dict[Key, List[Any]], Dict[Key, int]]:
+        # Swapped on the event loop so the writer thread owns what it writes
+        lists, self._pending_lists = self._pending_lists, {}
+        hits, self._pending_hits = self._pending_hits, {}
+        return lists, hits
+
+    def _write(self, lists: Dict[Key, List[Any]], hits: Dict[Key, int]) -> None:
+        """Write queued lists, their items and request counts"""
+        if not lists and not hits:
+            return
+
+        now = time.time()
+        items = {}
+        for results in lists.values():
+            for item in results:
+                items[item_id(item)] = item
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)",
+                    [(key, item.media_type, item.model_dump_json(), now) for key, item in items.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO mood_lists (mood, media_type, lim, item_ids, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (mood, media_type, lim) "
+                    "DO UPDATE SET item_ids = excluded.item_ids, updated_at = excluded.updated_at",
+                    [
+                        (*key, json.dumps([item_id(item) for item in results]), now)
+                        for key, results in lists.items()
+                    ],
+                )
+                conn.executemany(
+                    "UPDATE mood_lists SET hits = hits + ? WHERE mood = ? AND media_type = ? AND lim = ?",
+                    [(count, *key) for key, count in hits.items()],
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"Error writing recommendation store {self.path}: {e}")
+
+    def _read_items(self, conn: sqlite3.Connection, item_ids: List[str]) -> Dict[str, str]:
+        """Stored JSON of the given items, by id"""
+        data: Dict[str, str] = {}
+        for start in range(0, len(item_ids), READ_CHUNK):
+            chunk = item_ids[start:start + READ_CHUNK]
+            data.update(conn.execute(
+                f"SELECT item_id, data FROM items WHERE item_id IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall())
+        return data
+
+    def load(self, limit: int) -> List[Tuple[Key, List[Any], float]]:
+        """(key, items, age in seconds) for the limit most requested lists"""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT mood, media_type, lim, item_ids, updated_at FROM mood_lists "
+                "ORDER BY hits DESC, updated_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+            lists = [json.loads(row[3]) for row in rows]
+            # Only the items these lists reference, not the whole table
+            data = self._read_items(conn, list({id_ for item_ids in lists for id_ in item_ids}))
+
+        items = dict(zip(data.keys(), _parse_items(list(data.values()))))
+        now = time.time()
+        loaded = []
+        for (mood, media_type, lim, _, updated_at), item_ids in zip(rows, lists):
+            results = [items[id_] for id_ in item_ids if id_ in items]
+            if results:
+                loaded.append(((mood, media_type, lim), results, max(now - updated_at, 0.0)))
+        return loaded
+
+    async def get(self, key: Key) -> Optional[List[Any]]:
+        """The stored list for a key, read from the file off the event loop"""
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            print(f"Error reading recommendation store {self.path}: {e}")
+            return None
+
+    def _get(self, key: Key) -> Optional[List[Any]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT item_ids FROM mood_lists WHERE mood = ? AND media_type = ? AND lim = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            item_ids = json.loads(row[0])
+            data = self._read_items(conn, item_ids)
+        return _parse_items([data[id_] for id_ in item_ids if id_ in data]) or None
+
+    def export_snapshot(self, path: Path) -> Dict[str, int]:
+        """Write every item and list to a JSON snapshot"""
+        with self._lock:
+            conn = self._connect()
+            items = conn.execute("SELECT item_id, data FROM items").fetchall()
+            lists = conn.execute(
+                "SELECT mood, media_type, lim, item_ids, hits, updated_at FROM mood_lists"
+            ).fetchall()
+
+        snapshot = {
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "items": {id_: json.loads(data) for id_, data in items},
+            "lists": [
+                {
+                    "mood": mood,
+                    "media_type": media_type,
+                    "limit": lim,
+                    "item_ids": json.loads(item_ids),
+                    "hits": hits,
+                    "updated_at": updated_at,
+                }
+                for mood, media_type, lim, item_ids, hits, updated_at in lists
+            ],
+        }
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(snapshot))
+        os.replace(temporary, path)
+        return {"items": len(items), "lists": len(lists)}
+
+    def import_snapshot(self, path: Path) -> Dict[str, int]:
+        """Merge a JSON snapshot in; its lists replace any stored for the same key"""
+        snapshot = json.loads(path.read_text())
+        item_ids = list(snapshot.get("items", {}))
+        # Validate before writing so a bad snapshot changes nothing
+        items = _items_adapter.validate_python(list(snapshot.get("items", {}).values()))
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)",
+                [(id_, item.media_type, item.model_dump_json(), now) for id_, item in zip(item_ids, items)],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO mood_lists VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        entry["mood"], entry["media_type"], int(entry["limit"]),
+                        json.dumps(entry["item_ids"]), int(entry.get("hits", 0)),
+                        float(entry.get("updated_at", now)),
+                    )
+                    for entry in snapshot.get("lists", [])
+                ],
+            )
+            conn.commit()
+        return {"items": len(items), "lists": len(snapshot.get("lists", []))}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connect()
+            return {
+                "items": conn.execute("SELECT COUNT(*) FROM items").fetchone()[0],
+                "lists": conn.execute("SELECT COUNT(*) FROM mood_lists").fetchone()[0],
+            }
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await asyncio.to_thread(self._write, *self._take_pending())
+
+
+recommendation_store = RecommendationStore()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import", "stats"])
+    parser.add_argument("snapshot", type=Path, nargs="?", help="snapshot file for export/import")
+    parser.add_argument("--store", default=STORE_PATH, help="store file (default: RECOMMENDATION_STORE_PATH)")
+    args = parser.parse_args()
+
+    store = RecommendationStore(args.store)
+    if args.command == "stats":
+        counts = store.stats()
+    elif args.snapshot is None:
+        parser.error(f"{args.command} needs a snapshot file")
+    elif args.command == "export":
+        counts = store.export_snapshot(args.snapshot)
+    else:
+        counts = store.import_snapshot(args.snapshot)
+    print(f"{args.command}: {counts['items']} items, {counts['lists']} lists ({store.path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import asyncio
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+import httpx
+
+from app.services.upstream_budget import BudgetExceeded, upstream_budget
+
+R = TypeVar("R")
+
+# Per-upstream timeout for a single call (seconds)
+UPSTREAM_TIMEOUTS = {
+    "openai": float(os.getenv("LLM_TIMEOUT", 15.0)),
+    "tmdb": float(os.getenv("TMDB_TIMEOUT", 3.0)),
+    "spotify": float(os.getenv("SPOTIFY_TIMEOUT", 3.0)),
+    "google_books": float(os.getenv("GOOGLE_BOOKS_TIMEOUT", 3.0)),
+}
+
+# Retries for idempotent GETs on timeouts, transport errors and 5xx
+GET_RETRIES = int(os.getenv("UPSTREAM_GET_RETRIES", 2))
+RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", 0.1))
+
+# Overall budget for one recommendation request (seconds)
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", 8.0))
+
+# Send a duplicate TMDb GET when the first hasn't answered after this many
+# milliseconds (0 disables hedging)
+TMDB_HEDGE_AFTER_MS = float(os.getenv("TMDB_HEDGE_AFTER_MS", 0))
+
+# Absolute monotonic deadline of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the call could be made"""
+
+
+class CircuitOpenError(Exception):
+    """The upstream's circuit breaker is open, so the call was not made"""
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """
+    Give the current request a time budget. Tasks started inside the block
+    inherit it, so every upstream call can be bounded by what is left.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def detach_deadline() -> None:
+    """
+    Drop the deadline inherited by a background task, so work that
+    outlives the request isn't cut short by it
+    """
+    _deadline.set(None)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left for the current request, or None without a deadline"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def call_timeout(upstream: str) -> float:
+    """Timeout for the next call: the upstream's limit, capped by the budget"""
+    timeout = UPSTREAM_TIMEOUTS.get(upstream, 10.0)
+    remaining = remaining_budget()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded(f"No time left for {upstream} call")
+    return min(timeout, remaining)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures so callers fail fast.
+    After reset_timeout one probe call is let through: success closes the
+    circuit, failure keeps it open for another reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """Give back the probe when it ended without a verdict, e.g. cancelled"""
+        self._probing = False
+
+
+def _breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", 30.0)),
+    )
+
+
+breakers: Dict[str, CircuitBreaker] = {
+    upstream: _breaker(upstream) for upstream in UPSTREAM_TIMEOUTS
+}
+
+
+def _admit(breaker: CircuitBreaker) -> bool:
+    """
+    Let a call through the breaker or raise CircuitOpenError. Returns True
+    when the call is the half-open probe, which the caller must settle
+    with record_success, record_failure or release.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit is open")
+    return breaker.state == "half_open"
+
+
+async def with_llm_resilience(func: Callable[[], Awaitable[R]]) -> R:
+    """
+    Run an LLM call under the openai call budget and breaker, and the
+    request's time budget. Raises BudgetExceeded or CircuitOpenError when
+    the call shouldn't be made, so the caller can go straight to its
+    fallback. Running out of time or budget says nothing about the
+    upstream, so it never counts as a breaker failure.
+    """
+    await upstream_budget.acquire("openai", max_wait=remaining_budget())
+    timeout = call_timeout("openai")
+    breaker = breakers["openai"]
+    probe = _admit(breaker)
+
+    try:
+        result = await asyncio.wait_for(func(), timeout=timeout)
+    except (DeadlineExceeded, BudgetExceeded):
+        if probe:
+            breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled before the upstream answered
+        if probe:
+            breaker.release()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def _hedged(func: Callable[[], Awaitable[R]], hedge_after: float, upstream: str) -> R:
+    """
+    Start func; if it hasn't finished after hedge_after seconds start a
+    duplicate and return whichever succeeds first. The duplicate is only
+    sent when the upstream's call budget has a token for it right away.
+    """
+    first = asyncio.ensure_future(func())
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    try:
+        await upstream_budget.acquire(upstream, max_wait=0)
+    except BudgetExceeded:
+        return await first
+
+    second = asyncio.ensure_future(func())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Both failed: surface the first call's error
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def resilient_get(
+    client: httpx.AsyncClient,
+    upstream: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    hedge_after_ms: float = 0,
+) -> httpx.Response:
+    """
+    Idempotent GET with a per-call timeout bounded by the request budget,
+    jittered exponential-backoff retries on timeouts, transport errors and
+    5xx, an optional hedged duplicate, and the upstream's circuit breaker.
+    Every attempt is metered against the upstream's call budget; a call
+    that fails after all its retries counts as one breaker failure.
+
+    Non-5xx responses (including 4xx) are returned for the caller to handle.
+    """
+    await upstream_budget.acquire(upstream, max_wait=remaining_budget())
+    breaker = breakers[upstream]
+    probe = _admit(breaker)
+
+    async def attempt() -> httpx.Response:
+        response = await client.get(url, params=params, headers=headers, timeout=call_timeout(upstream))
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    try:
+        for retry in range(GET_RETRIES + 1):
+            try:
+                if hedge_after_ms > 0:
+                    response = await _hedged(attempt, hedge_after_ms / 1000, upstream)
+                else:
+                    response = await attempt()
+                breaker.record_success()
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                remaining = remaining_budget()
+                delay = RETRY_BASE_DELAY * (2 ** retry) * random.uniform(0.5, 1.5)
+                out_of_time = remaining is not None and remaining <= delay
+                # Other calls opened the breaker meanwhile: stop retrying
+                tripped = not probe and breaker.state != "closed"
+                if retry == GET_RETRIES or out_of_time or tripped:
+                    breaker.record_failure()
+                    probe = False
+                    raise
+                await asyncio.sleep(delay)
+                await upstream_budget.acquire(upstream, max_wait=remaining_budget())
+    except BaseException:
+        # Cancelled, out of time or out of budget: no verdict on the upstream,
+        # but a probe must not stay taken or the breaker never closes again
+        if probe:
+            breaker.release()
+        raise
+
+    raise RuntimeError("unreachable")
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.services.cache import TTLCache
+from app.services.recommendation_store import recommendation_store
+from app.services.resilience import detach_deadline
+from app.services.single_flight import SingleFlight
+from app.services.upstream_budget import BACKGROUND, set_priority
+
+# Collapse common mood synonyms onto one canonical word
+MOOD_SYNONYMS = {
+    "happy": ["happiness", "joyful", "joy", "cheerful", "glad", "upbeat", "good", "great", "excited"],
+    "sad": ["sadness", "unhappy", "down", "blue", "depressed", "gloomy", "melancholy", "heartbroken", "crying"],
+    "chill": ["calm", "relaxed", "relaxing", "mellow", "peaceful", "chilled", "laid-back"],
+    "energetic": ["energy", "pumped", "hyped", "workout", "active"],
+    "romantic": ["romance", "love", "loving", "in-love"],
+    "angry": ["mad", "furious", "annoyed", "frustrated"],
+    "anxious": ["nervous", "stressed", "worried", "anxiety"],
+    "tired": ["sleepy", "exhausted", "drained"],
+    "scary": ["scared", "spooky", "creepy", "horror"],
+    "funny": ["laugh", "laughing", "humor", "hilarious"],
+    "rain": ["rainy", "raining", "rainfall"],
+}
+
+_SYNONYM_LOOKUP = {
+    synonym: canonical
+    for canonical, synonyms in MOOD_SYNONYMS.items()
+    for synonym in synonyms
+}
+
+# Filler words that don't change the mood
+MOOD_STOPWORDS = {"i", "im", "am", "a", "an", "the", "and", "but", "with", "of", "for", "like", "feel", "feeling", "so", "very", "really", "kinda", "bit", "today", "me", "my"}
+
+# Words that flip the meaning of the mood word after them (apostrophes
+# are dropped first, so "don't" is "dont")
+MOOD_NEGATIONS = {"not", "no", "never", "without", "dont", "isnt", "arent", "wasnt", "cant"}
+
+# Set while a cached entry is recomputed (stale refresh, pool fill or
+# pre-warm), so the computation asks for a new answer instead of reusing
+# an earlier one
+_revalidating: ContextVar[bool] = ContextVar("revalidating", default=False)
+
+
+def revalidating() -> bool:
+    """True while the current task recomputes an entry that is already cached"""
+    return _revalidating.get()
+
+
+def mood_words(mood: str) -> List[str]:
+    """Lowercase words of a mood, without punctuation and apostrophes"""
+    return re.sub(r"[^\w\s-]", " ", re.sub(r"['’]", "", mood.lower())).split()
+
+
+def normalize_mood(mood: str) -> str:
+    """
+    Normalize a free-text mood into a cache key: case, whitespace,
+    punctuation, filler words, synonyms and word order are ignored. A
+    negation stays attached to the word it negates, so "happy, not sad"
+    and "sad, not happy" get different keys.
+    """
+    canonical = set()
+    negated = False
+    for word in mood_words(mood):
+        if word in MOOD_STOPWORDS:
+            continue
+        if word in MOOD_NEGATIONS:
+            negated = True
+            continue
+        word = _SYNONYM_LOOKUP.get(word, word)
+        canonical.add(f"not-{word}" if negated else word)
+        negated = False
+    if negated:
+        canonical.add("not")
+    return " ".join(sorted(canonical)) or mood.lower().strip()
+
+
+class ResponseCache:
+    """
+    Caches resolved recommendation lists per (normalized mood, media type,
+    limit).
+
+    Each key holds a small pool of variants and serves a random one, so
+    repeat visitors don't always see the same list. Entries past FRESH_TTL
+    are still served while a background refresh replaces them.
+    """
+
+    def __init__(self):
+        self.fresh_ttl = float(os.getenv("RESPONSE_CACHE_FRESH_TTL", 3600))
+        self.stale_ttl = float(os.getenv("RESPONSE_CACHE_STALE_TTL", 86400))
+        self.pool_size = int(os.getenv("RESPONSE_CACHE_VARIANTS", 3))
+        self._entries = TTLCache(
+            name="mood_responses",
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 2000)),
+            ttl=self.stale_ttl,
+        )
+        # Identical concurrent misses and refreshes share one computation
+        self._flights = SingleFlight("mood_responses")
+        self._refreshing: Set[Tuple[str, str, int]] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def make_key(mood: str, media_type: str, limit: int) -> Tuple[str, str, int]:
+        return normalize_mood(mood), media_type, limit
+
+    def get(self, mood: str, media_type: str, limit: int) -> Optional[List[Any]]:
+        """Return a cached variant, if any, without scheduling a refresh"""
+        entry = self._entries.get(self.make_key(mood, media_type, limit))
+        return random.choice(entry["variants"]) if entry is not None else None
+
+    def peek(self, mood: str, media_type: str, limit: int) -> Optional[List[Any]]:
+        """The newest variant, if any, without counting a lookup or touching recency"""
+        entry = self._entries.peek(self.make_key(mood, media_type, limit))
+        return entry["variants"][-1] if entry is not None else None
+
+    def put(self, mood: str, media_type: str, limit: int, results: List[Any]) -> None:
+        """Add a freshly resolved list to the key's variant pool"""
+        self._store(self.make_key(mood, media_type, limit), results)
+
+    def preload(self, entries: List[Tuple[Tuple[str, str, int], List[Any], float]]) -> None:
+        """Seed the cache with (key, results, age) entries, most requested first"""
+        # Inserted in reverse so the most requested are the last to be evicted
+        for key, results, age in reversed(entries):
+            self._entries.set(key, {"variants": [results], "updated_at": time.monotonic() - age})
+
+    def age(self, mood: str, media_type: str, limit: int) -> Optional[float]:
+        """Seconds since the key's pool was last updated, or None if not cached"""
+        entry = self._entries.peek(self.make_key(mood, media_type, limit))
+        return time.monotonic() - entry["updated_at"] if entry is not None else None
+
+    async def refresh(
+        self,
+        mood: str,
+        media_type: str,
+        limit: int,
+        compute: Callable[[], Awaitable[List[Any]]],
+    ) -> List[Any]:
+        """Compute the key now and add the result to its pool"""
+        key = self.make_key(mood, media_type, limit)
+        token = _revalidating.set(self.age(mood, media_type, limit) is not None)
+        try:
+            return await self._flights.do(key, lambda: self._compute_and_store(key, compute))
+        finally:
+            _revalidating.reset(token)
+
+    async def get_or_compute(
+        self,
+        mood: str,
+        media_type: str,
+        limit: int,
+        compute: Callable[[], Awaitable[List[Any]]],
+    ) -> List[Any]:
+        """
+        Serve a cached variant if one exists, otherwise compute and store it.
+        Stale or not-yet-full entries are refilled in the background.
+        """
+        key = self.make_key(mood, media_type, limit)
+        entry: Optional[Dict[str, Any]] = self._entries.get(key)
+
+        if entry is None:
+            return await self._flights.do(key, lambda: self._compute_and_store(key, compute))
+
+        is_stale = time.monotonic() - entry["updated_at"] > self.fresh_ttl
+        if is_stale or len(entry["variants"]) < self.pool_size:
+            self._refresh_in_background(key, compute, replace=is_stale)
+
+        return random.choice(entry["variants"])
+
+    async def _compute_and_store(
+        self,
+        key: Tuple[str, str, int],
+        compute: Callable[[], Awaitable[List[Any]]],
+        replace: bool = False,
+    ) -> List[Any]:
+        results = await compute()
+        self._store(key, results, replace=replace)
+        return results
+
+    def _store(self, key: Tuple[str, str, int], results: List[Any], replace: bool = False) -> None:
+        if not results:
+            return
+
+        entry = self._entries.peek(key)
+        if entry is None or replace:
+            # A stale pool is restarted from the fresh result and refilled
+            variants = [results]
+        else:
+            variants = entry["variants"] + [results]
+
+        self._entries.set(key, {
+            "variants": variants[-self.pool_size:],
+            "updated_at": time.monotonic(),
+        })
+        recommendation_store.record(key, results)
+
+    def _refresh_in_background(
+        self,
+        key: Tuple[str, str, int],
+        compute: Callable[[], Awaitable[List[Any]]],
+        replace: bool,
+    ) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            detach_deadline()
+            set_priority(BACKGROUND)
+            _revalidating.set(True)
+            try:
+                await self._flights.do(key, lambda: self._compute_and_store(key, compute, replace=replace))
+            except Exception as e:
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,84 @@
+import math
+import os
+from typing import Any, Iterable, List, Optional, Set
+
+from app.services import mood_index
+from app.services.prewarm import DEFAULT_LIMIT
+from app.services.recommendation_store import item_id
+from app.services.response_cache import response_cache
+from app.services.semantic_index import semantic_index
+from app.services.suggestions import title_key
+
+# Extra LLM candidates asked for on top of limit, as a share of it, so
+# duplicates and failed lookups are replaced without another LLM round trip
+CANDIDATE_EXTRA = float(os.getenv("CANDIDATE_EXTRA", 0.5))
+
+# Neighbouring moods whose cached results can fill the remaining slots
+BACKFILL_NEIGHBOURS = int(os.getenv("BACKFILL_NEIGHBOURS", 3))
+BACKFILL_MIN_SIMILARITY = float(os.getenv("BACKFILL_MIN_SIMILARITY", 0.5))
+
+
+def candidate_count(limit: int) -> int:
+    """Titles to ask the LLM for to end up with limit distinct items"""
+    return limit + math.ceil(limit * CANDIDATE_EXTRA)
+
+
+def unique_queries(queries: Iterable[str]) -> List[str]:
+    """Suggestions in rank order, without near-duplicate titles"""
+    seen: Set[str] = set()
+    unique = []
+    for query in queries:
+        key = title_key(query)
+        if key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+
+def unique_items(items: Iterable[Optional[Any]], limit: int) -> List[Any]:
+    """Resolved items in rank order, one per catalog id, at most limit"""
+    seen: Set[str] = set()
+    unique = []
+    for item in items:
+        if item is None:
+            continue
+        key = item_id(item)
+        if key not in seen:
+            seen.add(key)
+            unique.append(item)
+            if len(unique) >= limit:
+                break
+    return unique
+
+
+def neighbour_moods(mood: str, media_type: str) -> List[str]:
+    """Answered moods close to mood, then the local index categories it matches"""
+    neighbours = [
+        neighbour
+        for neighbour, similarity, _ in semantic_index.top_k(mood, media_type, BACKFILL_NEIGHBOURS)
+        if similarity >= BACKFILL_MIN_SIMILARITY
+    ]
+    neighbours += [category.replace("_", " ") for category in mood_index.match_categories(mood, media_type)]
+    return neighbours
+
+
+def backfill(results: List[Any], mood: str, media_type: str, limit: int) -> List[Any]:
+    """
+    Fill the slots duplicates and failed lookups left empty with cached
+    results of neighbouring moods. Only in-memory entries are read, so
+    this adds no upstream calls or latency.
+    """
+    if len(results) >= limit:
+        return results
+
+    own_key = response_cache.make_key(mood, media_type, limit)
+    candidates = list(results)
+    for neighbour in neighbour_moods(mood, media_type):
+        for neighbour_limit in dict.fromkeys((limit, DEFAULT_LIMIT)):
+            if response_cache.make_key(neighbour, media_type, neighbour_limit) == own_key:
+                continue
+            candidates += response_cache.peek(neighbour, media_type, neighbour_limit) or []
+        filled = unique_items(candidates, limit)
+        if len(filled) >= limit:
+            return filled
+    return unique_items(candidates, limit)
@@ -0,0 +1,202 @@
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.response_cache import MOOD_NEGATIONS, MOOD_STOPWORDS, mood_words, normalize_mood
+
+# Emotional dimensions of the mood embedding
+CONCEPTS = (
+    "joy", "sadness", "energy", "calm", "romance", "fear", "anger", "humor",
+    "hope", "nostalgia", "focus", "loneliness", "suspense", "adventure",
+)
+
+# Precomputed vocabulary table: mood word -> weights on CONCEPTS
+_VOCABULARY: Dict[str, Dict[str, float]] = {
+    "happy": {"joy": 1.0}, "joyful": {"joy": 1.0}, "cheerful": {"joy": 0.9, "energy": 0.3},
+    "glad": {"joy": 0.8}, "upbeat": {"joy": 0.7, "energy": 0.6}, "good": {"joy": 0.6},
+    "great": {"joy": 0.7}, "excited": {"joy": 0.6, "energy": 0.8}, "content": {"joy": 0.5, "calm": 0.6},
+    "grateful": {"joy": 0.6, "hope": 0.4}, "sunny": {"joy": 0.8, "energy": 0.3},
+    "sad": {"sadness": 1.0}, "unhappy": {"sadness": 0.9}, "down": {"sadness": 0.8},
+    "blue": {"sadness": 0.8, "calm": 0.2}, "depressed": {"sadness": 1.0, "loneliness": 0.4},
+    "gloomy": {"sadness": 0.8, "calm": 0.2}, "melancholy": {"sadness": 0.7, "nostalgia": 0.5},
+    "melancholic": {"sadness": 0.7, "nostalgia": 0.5}, "heartbroken": {"sadness": 0.9, "romance": 0.4},
+    "crying": {"sadness": 1.0}, "grief": {"sadness": 1.0, "loneliness": 0.3}, "rainy": {"sadness": 0.4, "calm": 0.5},
+    "rain": {"sadness": 0.4, "calm": 0.5}, "bittersweet": {"sadness": 0.5, "joy": 0.3, "nostalgia": 0.6},
+    "energetic": {"energy": 1.0}, "pumped": {"energy": 1.0, "joy": 0.3}, "hyped": {"energy": 1.0, "joy": 0.3},
+    "workout": {"energy": 1.0, "focus": 0.3}, "party": {"energy": 0.9, "joy": 0.6}, "dance": {"energy": 0.9, "joy": 0.5},
+    "motivated": {"energy": 0.7, "hope": 0.5, "focus": 0.4}, "adrenaline": {"energy": 1.0, "adventure": 0.5},
+    "chill": {"calm": 1.0}, "calm": {"calm": 1.0}, "relaxed": {"calm": 1.0}, "relaxing": {"calm": 1.0},
+    "mellow": {"calm": 0.9}, "peaceful": {"calm": 1.0, "hope": 0.2}, "sleepy": {"calm": 0.8},
+    "tired": {"calm": 0.6, "sadness": 0.2}, "cozy": {"calm": 0.8, "joy": 0.3},
+    "romantic": {"romance": 1.0}, "love": {"romance": 1.0}, "loving": {"romance": 0.9, "joy": 0.3},
+    "date": {"romance": 0.8}, "crush": {"romance": 0.8, "energy": 0.2},
+    "scary": {"fear": 1.0}, "scared": {"fear": 1.0}, "spooky": {"fear": 0.8, "humor": 0.1},
+    "creepy": {"fear": 0.9}, "horror": {"fear": 1.0}, "anxious": {"fear": 0.6, "suspense": 0.4},
+    "nervous": {"fear": 0.5, "suspense": 0.4}, "stressed": {"fear": 0.4, "anger": 0.3},
+    "angry": {"anger": 1.0}, "mad": {"anger": 0.9}, "furious": {"anger": 1.0, "energy": 0.4},
+    "frustrated": {"anger": 0.8}, "annoyed": {"anger": 0.6},
+    "funny": {"humor": 1.0}, "laugh": {"humor": 1.0, "joy": 0.3}, "silly": {"humor": 0.9, "joy": 0.3},
+    "comedy": {"humor": 1.0}, "hilarious": {"humor": 1.0},
+    "hopeful": {"hope": 1.0, "joy": 0.3}, "hope": {"hope": 1.0}, "optimistic": {"hope": 0.9, "joy": 0.4},
+    "inspired": {"hope": 0.8, "energy": 0.4}, "inspiring": {"hope": 0.8, "energy": 0.4},
+    "nostalgic": {"nostalgia": 1.0}, "nostalgia": {"nostalgia": 1.0}, "wistful": {"nostalgia": 0.8, "sadness": 0.3},
+    "reflective": {"nostalgia": 0.5, "calm": 0.5}, "thoughtful": {"calm": 0.5, "focus": 0.4},
+    "focused": {"focus": 1.0}, "focus": {"focus": 1.0}, "study": {"focus": 1.0, "calm": 0.4},
+    "studying": {"focus": 1.0, "calm": 0.4}, "work": {"focus": 0.8},
+    "lonely": {"loneliness": 1.0, "sadness": 0.4}, "alone": {"loneliness": 0.8}, "isolated": {"loneliness": 0.9},
+    "thriller": {"suspense": 1.0}, "tense": {"suspense": 0.9, "fear": 0.3}, "suspense": {"suspense": 1.0},
+    "mystery": {"suspense": 0.8, "focus": 0.3}, "intense": {"suspense": 0.6, "energy": 0.6},
+    "adventurous": {"adventure": 1.0, "energy": 0.4}, "adventure": {"adventure": 1.0},
+    "action": {"adventure": 0.6, "energy": 0.8}, "epic": {"adventure": 0.8, "energy": 0.5},
+    "curious": {"adventure": 0.5, "focus": 0.5},
+}
+
+# Hashed character trigrams catch words missing from the vocabulary and
+# spelling variants of the ones in it
+NGRAM_DIMS = 64
+NGRAM_WEIGHT = 0.3
+DIMS = len(CONCEPTS) + NGRAM_DIMS
+
+_CONCEPT_POSITION = {concept: position for position, concept in enumerate(CONCEPTS)}
+_WORD_VECTORS: Dict[str, np.ndarray] = {}
+for _word, _weights in _VOCABULARY.items():
+    _vector = np.zeros(len(CONCEPTS), dtype=np.float32)
+    for _concept, _weight in _weights.items():
+        _vector[_CONCEPT_POSITION[_concept]] = _weight
+    _WORD_VECTORS[_word] = _vector
+
+
+def embed_mood(mood: str) -> np.ndarray:
+    """
+    Embed a free-text mood as a unit vector: summed vocabulary concept
+    weights plus a smaller hashed-trigram component. A negated word
+    ("not happy") counts against its concepts and hashes apart from the
+    plain word.
+    """
+    words = [
+        part
+        for word in mood_words(mood) if word not in MOOD_STOPWORDS
+        for part in re.findall(r"[a-z]+", word)
+    ]
+
+    concepts = np.zeros(len(CONCEPTS), dtype=np.float32)
+    ngrams = np.zeros(NGRAM_DIMS, dtype=np.float32)
+    negated = False
+    for word in words:
+        if word in MOOD_NEGATIONS:
+            negated = True
+            continue
+        vector = _WORD_VECTORS.get(word)
+        if vector is not None:
+            concepts += -vector if negated else vector
+        padded = f" !{word} " if negated else f" {word} "
+        negated = False
+        for start in range(len(padded) - 2):
+            ngrams[zlib.crc32(padded[start:start + 3].encode()) % NGRAM_DIMS] += 1.0
+
+    for part, weight in ((concepts, 1.0), (ngrams, NGRAM_WEIGHT)):
+        norm = np.linalg.norm(part)
+        if norm:
+            part *= weight / norm
+
+    embedding = np.concatenate([concepts, ngrams])
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm else embedding
+
+
+class SemanticMoodIndex:
+    """
+    Nearest-neighbour index over previously answered moods, one matrix per
+    media type. A new mood whose cosine similarity to an answered one is at
+    least SEMANTIC_MATCH_THRESHOLD reuses that mood's recommendations.
+
+    Each matrix is a fixed-size ring buffer, so the oldest moods are
+    replaced once SEMANTIC_INDEX_SIZE is reached. A mood answered again
+    replaces its earlier row.
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv("SEMANTIC_MATCH_THRESHOLD", 0.9))
+        self.capacity = int(os.getenv("SEMANTIC_INDEX_SIZE", 5000))
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._entries: Dict[str, List[Tuple[str, List[str]]]] = {}
+        self._rows: Dict[str, Dict[str, int]] = {}  # media_type -> normalized mood -> row
+        self._next: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def top_k(self, mood: str, media_type: str, k: int = 5) -> List[Tuple[str, float, List[str]]]:
+        """
+        The k answered moods closest to mood, as (mood, similarity,
+        recommendations), most similar first
+        """
+        entries = self._entries.get(media_type)
+        if not entries:
+            return []
+
+        matrix = self._matrices[media_type][:len(entries)]
+        similarities = matrix @ embed_mood(mood)
+        k = min(k, len(entries))
+        nearest = np.argpartition(-similarities, k - 1)[:k]
+        nearest = nearest[np.argsort(-similarities[nearest])]
+        return [(entries[i][0], float(similarities[i]), entries[i][1]) for i in nearest]
+
+    def lookup(self, mood: str, media_type: str, limit: int) -> Optional[List[str]]:
+        """
+        Recommendations of the closest other answered mood, if it is similar
+        enough and has at least limit items. The mood's own earlier answer is
+        never returned: repeats of it are the response cache's job.
+        """
+        own = normalize_mood(mood)
+        for neighbour, similarity, recommendations in self.top_k(mood, media_type, k=4):
+            if similarity < self.threshold:
+                break
+            if normalize_mood(neighbour) != own and len(recommendations) >= limit:
+                self.hits += 1
+                return recommendations[:limit]
+
+        self.misses += 1
+        return None
+
+    def add(self, mood: str, media_type: str, recommendations: List[str]) -> None:
+        if not recommendations:
+            return
+
+        if media_type not in self._matrices:
+            self._matrices[media_type] = np.zeros((self.capacity, DIMS), dtype=np.float32)
+            self._entries[media_type] = []
+            self._rows[media_type] = {}
+            self._next[media_type] = 0
+
+        entries = self._entries[media_type]
+        rows = self._rows[media_type]
+        key = normalize_mood(mood)
+        position = rows.get(key)
+        if position is None:
+            position = self._next[media_type]
+            self._next[media_type] = (position + 1) % self.capacity
+            if position < len(entries):
+                rows.pop(normalize_mood(entries[position][0]), None)
+        rows[key] = position
+
+        self._matrices[media_type][position] = embed_mood(mood)
+        if position < len(entries):
+            entries[position] = (mood, list(recommendations))
+        else:
+            entries.append((mood, list(recommendations)))
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": sum(len(entries) for entries in self._entries.values()),
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+semantic_index = SemanticMoodIndex()
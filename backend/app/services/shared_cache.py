@@ -0,0 +1,274 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Set, Tuple
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # Only needed for redis:// backends
+    redis = aioredis = None
+
+# Cache shared by every worker process:
+#   sqlite:///path/to/cache.db   a local file, for workers on one host
+#   redis://host:6379/0          any Redis-protocol server
+#   memory://                    in-process fake, for tests
+# QUERY_CACHE_DB=<path> is still accepted as a SQLite backend.
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "")
+
+# Socket timeout for Redis calls (seconds); a slow cache counts as a miss
+REDIS_TIMEOUT = float(os.getenv("SHARED_CACHE_REDIS_TIMEOUT", 0.05))
+
+# get() returns (found, value, remaining ttl). value None is a cached "no match".
+Lookup = Tuple[bool, Optional[str], float]
+
+_MISS: Lookup = (False, None, 0.0)
+
+
+class SharedCacheBackend(ABC):
+    """
+    String key/value store with per-entry TTLs, namespaced per cache.
+    Values may be None to record that a lookup found nothing.
+
+    Calls never block the event loop, and errors are treated as misses so
+    an unavailable cache never fails a request.
+    """
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Lookup:
+        ...
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, namespace: str, key: str, ttl: float) -> bool:
+        """
+        Atomically store a marker for ttl seconds unless a live one exists.
+        True when this call stored it; errors also return True, so work is
+        duplicated rather than skipped when the cache is down.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """
+    SQLite file in WAL mode, safe to share between processes on one host.
+    Queries run in a worker thread, off the event loop.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=1.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, "
+            "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._conn.commit()
+
+    async def get(self, namespace: str, key: str) -> Lookup:
+        try:
+            return await asyncio.to_thread(self._get, namespace, key)
+        except sqlite3.Error as e:
+            print(f"Shared cache get failed: {e}")
+            return _MISS
+
+    async def set(self, namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+        try:
+            await asyncio.to_thread(self._set, namespace, key, value, ttl)
+        except sqlite3.Error as e:
+            print(f"Shared cache set failed: {e}")
+
+    async def claim(self, namespace: str, key: str, ttl: float) -> bool:
+        try:
+            return await asyncio.to_thread(self._claim, namespace, key, ttl)
+        except sqlite3.Error as e:
+            print(f"Shared cache claim failed: {e}")
+            return True
+
+    def _get(self, namespace: str, key: str) -> Lookup:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM query_cache "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return _MISS
+        return True, row[0], row[1] - time.time()
+
+    def _set(self, namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?)",
+                (namespace, key, value, time.time() + ttl),
+            )
+            self._conn.commit()
+
+    def _claim(self, namespace: str, key: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO query_cache VALUES (?, ?, '', ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET value = '', expires_at = excluded.expires_at "
+                "WHERE query_cache.expires_at < ?",
+                (namespace, key, now + ttl, now),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisBackend(SharedCacheBackend):
+    """Any server speaking the Redis protocol, through the asyncio client"""
+
+    # Stored values are prefixed so a cached "no match" differs from a miss
+    _VALUE, _NO_MATCH = "v", "n"
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("redis:// shared caches need the redis package (poetry install -E redis)")
+        self._client = aioredis.Redis.from_url(
+            url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT, decode_responses=True
+        )
+
+    async def get(self, namespace: str, key: str) -> Lookup:
+        try:
+            async with self._client.pipeline(transaction=False) as pipeline:
+                pipeline.get(f"moodify:{namespace}:{key}")
+                pipeline.pttl(f"moodify:{namespace}:{key}")
+                raw, remaining_ms = await pipeline.execute()
+        except redis.RedisError as e:
+            print(f"Shared cache get failed: {e}")
+            return _MISS
+
+        if raw is None:
+            return _MISS
+        value = raw[1:] if raw[:1] == self._VALUE else None
+        return True, value, max(remaining_ms, 0) / 1000
+
+    async def set(self, namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+        raw = self._VALUE + value if value is not None else self._NO_MATCH
+        try:
+            await self._client.set(f"moodify:{namespace}:{key}", raw, px=max(int(ttl * 1000), 1))
+        except redis.RedisError as e:
+            print(f"Shared cache set failed: {e}")
+
+    async def claim(self, namespace: str, key: str, ttl: float) -> bool:
+        try:
+            return bool(await self._client.set(
+                f"moodify:{namespace}:{key}", self._NO_MATCH, px=max(int(ttl * 1000), 1), nx=True
+            ))
+        except redis.RedisError as e:
+            print(f"Shared cache claim failed: {e}")
+            return True
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class MemoryBackend(SharedCacheBackend):
+    """In-process stand-in with the same semantics, for tests"""
+
+    def __init__(self):
+        self._data: Dict[Tuple[str, str], Tuple[Optional[str], float]] = {}
+
+    async def get(self, namespace: str, key: str) -> Lookup:
+        entry = self._data.get((namespace, key))
+        if entry is None or entry[1] < time.time():
+            return _MISS
+        return True, entry[0], entry[1] - time.time()
+
+    async def set(self, namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+        self._data[(namespace, key)] = (value, time.time() + ttl)
+
+    async def claim(self, namespace: str, key: str, ttl: float) -> bool:
+        if (await self.get(namespace, key))[0]:
+            return False
+        await self.set(namespace, key, "", ttl)
+        return True
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def create_backend(url: str) -> SharedCacheBackend:
+    """Build a backend from a sqlite://, redis:// or memory:// URL"""
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    raise ValueError(f"Unsupported SHARED_CACHE_URL: {url}")
+
+
+_backend: Optional[SharedCacheBackend] = None
+_configured = False
+
+
+def get_shared_cache() -> Optional[SharedCacheBackend]:
+    """The configured shared backend, or None when caches are per-process"""
+    global _backend, _configured
+    if not _configured:
+        _configured = True
+        url = SHARED_CACHE_URL
+        if not url and os.getenv("QUERY_CACHE_DB"):
+            url = f"sqlite:///{os.getenv('QUERY_CACHE_DB')}"
+        if url:
+            _backend = create_backend(url)
+    return _backend
+
+
+def set_shared_cache(backend: Optional[SharedCacheBackend]) -> None:
+    """Replace the shared backend, e.g. with a MemoryBackend in tests"""
+    global _backend, _configured
+    _backend = backend
+    _configured = True
+
+
+# Writes in flight, referenced until they finish
+_writes: Set[asyncio.Task] = set()
+
+
+def write_behind(namespace: str, key: str, value: Optional[str], ttl: float) -> None:
+    """Store a value in the shared backend, if any, without waiting for the write"""
+    backend = get_shared_cache()
+    if backend is None:
+        return
+    task = asyncio.ensure_future(backend.set(namespace, key, value, ttl))
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+
+
+async def claim(namespace: str, key: str, ttl: float) -> bool:
+    """
+    Claim a piece of work for ttl seconds across all workers. Always True
+    when caches are per-process, since there is no one to share it with.
+    """
+    backend = get_shared_cache()
+    if backend is None:
+        return True
+    return await backend.claim(namespace, key, ttl)
+
+
+async def close_shared_cache() -> None:
+    """Finish pending writes and close the backend (called on app shutdown)"""
+    global _backend, _configured
+    if _writes:
+        await asyncio.gather(*_writes, return_exceptions=True)
+    if _backend is not None:
+        await _backend.close()
+    _backend = None
+    _configured = False
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+R = TypeVar("R")
+
+# Every named group, so coalescing counters can be reported in one place
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key: the first caller starts
+    the work and later callers await the same in-flight task.
+
+    Errors reach every caller. A caller being cancelled only cancels the
+    shared work once no other caller is waiting on it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, List[Any]] = {}  # key -> [task, waiters]
+        self.started = 0
+        self.joined = 0
+        _registry[name] = self
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[R]]) -> R:
+        flight = self._inflight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(func())
+            flight = self._inflight[key] = [task, 0]
+            task.add_done_callback(lambda _: self._forget(key, task))
+            self.started += 1
+        else:
+            self.joined += 1
+
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if flight[1] == 1 and not task.done():
+                # Last caller left: new callers must not join the dying task
+                self._forget(key, task)
+                task.cancel()
+            raise
+        finally:
+            flight[1] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0] is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every caller went away
+        if task.done() and not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "joined": self.joined,
+        }
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Coalescing counters for every named group"""
+    return {name: group.stats() for name, group in _registry.items()}
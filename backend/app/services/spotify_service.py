@@ -1,52 +1,324 @@
+import asyncio
 import os
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
-from typing import List, Optional
+import re
+import time
+from typing import Dict, List, Optional
+from app.metrics import STAGE_SECONDS, UPSTREAM_ERRORS
 from app.models import Track
+from app.services.cache import TTLCache
+from app.services.concurrency import gather_limited
+from app.services.http_client import get_http_client
+from app.services.query_cache import QueryCache, normalize_query
+from app.services.resilience import remaining_budget, resilient_get
+from app.services.shared_cache import get_shared_cache
+from app.services.single_flight import SingleFlight
+from app.services.suggestions import Suggestion, same_title
+
+# Resolved tracks keyed by normalized LLM query
+_track_query_cache = QueryCache("spotify_tracks", Track)
+
+# Spotify track ids keyed by normalized LLM query. They outlive the resolved
+# tracks, so expired entries are refreshed through the multi-track endpoint
+# instead of searching again.
+_track_id_cache = TTLCache(
+    name="spotify_track_ids",
+    maxsize=int(os.getenv("SPOTIFY_TRACK_ID_CACHE_SIZE", 50000)),
+    ttl=float(os.getenv("SPOTIFY_TRACK_ID_CACHE_TTL", 30 * 86400))
+)
+
+# In-flight upstream searches keyed by normalized query
+_track_lookups = SingleFlight("spotify_track_searches")
+
+# Max ids accepted by GET /v1/tracks
+MAX_TRACKS_PER_CALL = 50
+
+# Give up on a 429 when Spotify asks us to wait longer than this (seconds)
+MAX_RETRY_AFTER = float(os.getenv("SPOTIFY_MAX_RETRY_AFTER", 10))
+MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", 3))
+
+_TRACK_ID_RE = re.compile(r"^[0-9A-Za-z]{22}$")
+
+# Monotonic time until which Spotify told this process to back off. Every
+# caller waits it out, so one 429 doesn't turn into one per concurrent request.
+_blocked_until = 0.0
+
+
+class SpotifyRateLimited(Exception):
+    """Spotify asked us to back off for longer than the caller can wait"""
+
+
+def _back_off(retry_after: float) -> None:
+    global _blocked_until
+    _blocked_until = max(_blocked_until, time.monotonic() + retry_after)
+
+
+async def _wait_out_rate_limit() -> None:
+    """Sleep until Spotify's Retry-After has passed, or raise if that's too long"""
+    wait = _blocked_until - time.monotonic()
+    if wait <= 0:
+        return
+    remaining = remaining_budget()
+    if wait > MAX_RETRY_AFTER or (remaining is not None and wait >= remaining):
+        raise SpotifyRateLimited(f"Spotify rate limited for another {wait:.1f}s")
+    await asyncio.sleep(wait)
+
+
+def _suggested_track_id(query: str) -> Optional[str]:
+    """The Spotify track id the LLM attached to a suggestion, if well-formed"""
+    track_id = getattr(query, "external_id", None)
+    return track_id if track_id and _TRACK_ID_RE.match(track_id) else None
+
+
+def _search_query(query: str) -> str:
+    """Field-filtered search for structured suggestions, free text otherwise"""
+    if isinstance(query, Suggestion) and query.creator:
+        return f'track:"{query.title}" artist:"{query.creator}"'
+    return query
+
+
+class SpotifyTokenManager:
+    """
+    Process-wide client-credentials token, reused until shortly before it
+    expires. Concurrent requests share a single refresh, and with a shared
+    cache backend all workers share one token.
+    """
+
+    def __init__(self):
+        self.token_url = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        # Last token Spotify rejected, never taken from the shared cache again
+        self._rejected: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def get_token(self) -> str:
+        if self._token and time.monotonic() < self._expires_at:
+            return self._token
+
+        async with self._lock:
+            # Another request may have refreshed it while we waited
+            if self._token and time.monotonic() < self._expires_at:
+                return self._token
+
+            shared = get_shared_cache()
+            if shared is not None:
+                found, token, remaining = await shared.get("spotify_token", "client_credentials")
+                if found and token and token != self._rejected:
+                    self._token = token
+                    self._expires_at = time.monotonic() + remaining
+                    return self._token
+
+            client_id = os.getenv("SPOTIFY_CLIENT_ID")
+            client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+            if not client_id or not client_secret:
+                raise RuntimeError("SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET must be set")
+
+            with STAGE_SECONDS.time(stage="spotify_token"):
+                response = await get_http_client().post(
+                    self.token_url,
+                    data={'grant_type': 'client_credentials'},
+                    auth=(client_id, client_secret)
+                )
+            response.raise_for_status()
+            token_data = response.json()
+
+            self._token = token_data['access_token']
+            # Refresh a minute early so in-flight requests never use a stale token
+            lifetime = token_data.get('expires_in', 3600) - 60
+            self._expires_at = time.monotonic() + lifetime
+            if shared is not None:
+                await shared.set("spotify_token", "client_credentials", self._token, lifetime)
+            return self._token
+
+    async def invalidate(self, rejected: str) -> None:
+        """Drop a token Spotify rejected, here and in the shared cache"""
+        async with self._lock:
+            self._rejected = rejected
+            if self._token == rejected:
+                self._token = None
+
+            # A rejected token must not be handed to the other workers again.
+            # Cleared before the next get_token() so it can't be read back.
+            shared = get_shared_cache()
+            if shared is not None:
+                _, token, _ = await shared.get("spotify_token", "client_credentials")
+                if token == rejected:
+                    await shared.set("spotify_token", "client_credentials", None, 1)
+
+
+_token_manager = SpotifyTokenManager()
 
 
 class SpotifyService:
     def __init__(self):
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id=os.getenv("SPOTIFY_CLIENT_ID"),
-            client_secret=os.getenv("SPOTIFY_CLIENT_SECRET")
-        )
-        self.sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        self.base_url = os.getenv("SPOTIFY_API_BASE_URL", "https://api.spotify.com/v1")
+
+    @property
+    def client(self):
+        # Resolved per call so the service can outlive a client restart
+        return get_http_client()
 
     async def search_tracks(self, song_queries: List[str]) -> List[Track]:
         """
         Search for tracks on Spotify based on song queries
         """
-        tracks = []
-        
-        for query in song_queries:
-            try:
-                # Search for the track
-                results = self.sp.search(q=query, type='track', limit=1, market='US')
-                
-                if results['tracks']['items']:
-                    track_data = results['tracks']['items'][0]
-                    
-                    # Get the largest image
-                    image_url = None
-                    if track_data['album']['images']:
-                        image_url = track_data['album']['images'][0]['url']
-                    
-                    track = Track(
-                        name=track_data['name'],
-                        artist=track_data['artists'][0]['name'],
-                        album=track_data['album']['name'],
-                        spotify_url=track_data['external_urls']['spotify'],
-                        preview_url=track_data.get('preview_url'),
-                        image_url=image_url,
-                        popularity=track_data.get('popularity'),
-                        duration_ms=track_data.get('duration_ms')
-                    )
-                    
-                    tracks.append(track)
-                    
-            except Exception as e:
-                print(f"Error searching for '{query}': {e}")
+        resolved: Dict[str, Optional[Track]] = {}
+        to_fetch: Dict[str, str] = {}
+        to_search: List[str] = []
+
+        cached = await asyncio.gather(*(_track_query_cache.get(query) for query in song_queries))
+        for query, (found, track) in zip(song_queries, cached):
+            if found:
+                resolved[query] = track
                 continue
-        
-        return tracks
\ No newline at end of file
+
+            track_id = _track_id_cache.get(normalize_query(query)) or _suggested_track_id(query)
+            if track_id is not None:
+                to_fetch[query] = track_id
+            else:
+                to_search.append(query)
+
+        # Known and suggested ids are resolved in bulk, everything else is
+        # searched concurrently, keeping the LLM's ranking order
+        fetched, searched = await asyncio.gather(
+            self._get_tracks_by_id(to_fetch),
+            gather_limited(to_search, self._search_track_upstream)
+        )
+        resolved.update(fetched)
+        resolved.update(zip(to_search, searched))
+
+        # Suggested ids that turned out wrong fall back to a search
+        retry = [query for query in to_fetch if fetched.get(query) is None]
+        if retry:
+            resolved.update(zip(retry, await gather_limited(retry, self._search_track_upstream)))
+
+        return [resolved[query] for query in song_queries if resolved.get(query) is not None]
+
+    async def search_track(self, query: str) -> Optional[Track]:
+        """Search for a single track"""
+        found, track = await _track_query_cache.get(query)
+        if found:
+            return track
+
+        track_id = _track_id_cache.get(normalize_query(query)) or _suggested_track_id(query)
+        if track_id is not None:
+            fetched = await self._get_tracks_by_id({query: track_id})
+            if fetched.get(query) is not None:
+                return fetched[query]
+
+        return await self._search_track_upstream(query)
+
+    async def _search_track_upstream(self, query: str) -> Optional[Track]:
+        """Search Spotify for a single track"""
+        # Identical songs requested concurrently share one upstream search
+        return await _track_lookups.do(normalize_query(query), lambda: self._fetch_track(query))
+
+    async def _fetch_track(self, query: str) -> Optional[Track]:
+        try:
+            params = {'q': _search_query(query), 'type': 'track', 'limit': 1, 'market': 'US'}
+            results = await self._get("/search", params)
+
+            # Field filters can be too strict for slightly-off suggestions
+            if not results['tracks']['items'] and params['q'] != query:
+                results = await self._get("/search", {**params, 'q': str(query)})
+
+            if not results['tracks']['items']:
+                _track_query_cache.set(query, None)
+                return None
+
+            track_data = results['tracks']['items'][0]
+            track = self._build_track(track_data)
+            _track_query_cache.set(query, track)
+            _track_id_cache.set(normalize_query(query), track_data['id'])
+            return track
+
+        except Exception as e:
+            print(f"Error searching for '{query}': {e}")
+            UPSTREAM_ERRORS.inc(upstream="spotify")
+            return None
+
+    async def _get_tracks_by_id(self, track_ids: Dict[str, str]) -> Dict[str, Optional[Track]]:
+        """
+        Resolve query -> known track id pairs through the multi-track
+        endpoint, up to MAX_TRACKS_PER_CALL ids per request
+        """
+        if not track_ids:
+            return {}
+
+        unique_ids = list(dict.fromkeys(track_ids.values()))
+        batches = [
+            unique_ids[start:start + MAX_TRACKS_PER_CALL]
+            for start in range(0, len(unique_ids), MAX_TRACKS_PER_CALL)
+        ]
+
+        async def fetch(batch: List[str]) -> List[dict]:
+            results = await self._get("/tracks", {'ids': ",".join(batch), 'market': 'US'})
+            return [track for track in results.get('tracks', []) if track]
+
+        tracks_by_id = {}
+        for tracks in await gather_limited(batches, fetch):
+            for track_data in tracks or []:
+                tracks_by_id[track_data['id']] = self._build_track(track_data)
+
+        resolved = {}
+        for query, track_id in track_ids.items():
+            track = tracks_by_id.get(track_id)
+            # An id the LLM suggested only counts if it is the suggested song
+            suggested = track_id == _suggested_track_id(query)
+            if track is not None and suggested and not same_title(track.name, query.title):
+                track = None
+            if track is not None:
+                _track_query_cache.set(query, track)
+                _track_id_cache.set(normalize_query(query), track_id)
+            resolved[query] = track
+        return resolved
+
+    async def _get(self, path: str, params: dict) -> dict:
+        """
+        GET a Spotify Web API endpoint, honouring Retry-After on 429 across
+        all requests and refreshing the token once on 401. Timeouts,
+        transport errors and 5xx are retried by resilient_get.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            await _wait_out_rate_limit()
+            token = await _token_manager.get_token()
+            with STAGE_SECONDS.time(stage=f"spotify_{path.strip('/')}"):
+                response = await resilient_get(
+                    self.client,
+                    "spotify",
+                    f"{self.base_url}{path}",
+                    params=params,
+                    headers={'Authorization': f"Bearer {token}"}
+                )
+
+            if response.status_code == 401 and attempt == 0:
+                await _token_manager.invalidate(token)
+                continue
+
+            if response.status_code == 429:
+                _back_off(float(response.headers.get('Retry-After', 1)))
+                if attempt < MAX_RETRIES:
+                    continue
+
+            response.raise_for_status()
+            return response.json()
+
+        response.raise_for_status()
+        return response.json()
+
+    def _build_track(self, track_data: dict) -> Track:
+        # Get the largest image
+        image_url = None
+        if track_data['album']['images']:
+            image_url = track_data['album']['images'][0]['url']
+
+        return Track(
+            name=track_data['name'],
+            artist=track_data['artists'][0]['name'],
+            album=track_data['album']['name'],
+            spotify_url=track_data['external_urls']['spotify'],
+            preview_url=track_data.get('preview_url'),
+            image_url=image_url,
+            popularity=track_data.get('popularity'),
+            duration_ms=track_data.get('duration_ms')
+        )
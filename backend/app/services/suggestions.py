@@ -0,0 +1,191 @@
+import json
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Iterable, List, Optional, Union
+
+from pydantic import BaseModel, Field, ValidationError
+
+# Field meanings per media type, spelled out in the prompt
+MEDIA_FIELDS = {
+    "music": "title is the song title, creator the main artist, id the Spotify track id",
+    "movies": "title is the movie title, creator the director, year the release year, id the TMDb movie id",
+    "books": "title is the book title, creator the author, year the publication year, id the ISBN-13",
+    "podcasts": "title is the podcast name, creator the host or network",
+}
+
+RESPONSE_FORMAT = (
+    '{"recommendations": [{"title": string, "creator": string or null, '
+    '"year": integer or null, "id": string or null}]}'
+)
+
+
+class SuggestionItem(BaseModel):
+    """One structured recommendation as the LLM returns it"""
+    title: str = Field(min_length=1, max_length=200)
+    creator: Optional[str] = Field(default=None, max_length=200)
+    year: Optional[int] = Field(default=None, ge=1000, le=2100)
+    id: Optional[Union[str, int]] = None
+
+
+class Suggestion(str):
+    """
+    A recommended title. Its string value is the query format the catalogs
+    and caches already key on ("Artist - Title" for music, "Title by Author"
+    for books, the title otherwise); the structured fields let catalogs do
+    exact lookups instead of free-text searches.
+    """
+
+    title: str
+    creator: Optional[str]
+    year: Optional[int]
+    external_id: Optional[str]
+
+    def __new__(
+        cls,
+        title: str,
+        media_type: str,
+        creator: Optional[str] = None,
+        year: Optional[int] = None,
+        external_id: Optional[str] = None,
+    ):
+        if media_type == "music" and creator:
+            text = f"{creator} - {title}"
+        elif media_type == "books" and creator:
+            text = f"{title} by {creator}"
+        else:
+            text = title
+        suggestion = super().__new__(cls, text)
+        suggestion.title = title
+        suggestion.creator = creator
+        suggestion.year = year
+        suggestion.external_id = external_id
+        return suggestion
+
+
+def suggestion_from_item(item: Any, media_type: str) -> Optional[Suggestion]:
+    """Validate one structured item (or a bare title string) into a Suggestion"""
+    if isinstance(item, str):
+        item = {"title": item}
+    try:
+        parsed = SuggestionItem.model_validate(item)
+    except ValidationError:
+        return None
+
+    title = parsed.title.strip()
+    if not title or "\n" in title:
+        return None
+
+    external_id = str(parsed.id).strip() if parsed.id is not None else ""
+    return Suggestion(
+        title=title,
+        media_type=media_type,
+        creator=(parsed.creator or "").strip() or None,
+        year=parsed.year,
+        external_id=external_id or None,
+    )
+
+
+def suggestion_to_item(suggestion: str) -> dict:
+    """The structured item a suggestion was built from, for storing it"""
+    if not isinstance(suggestion, Suggestion):
+        return {"title": str(suggestion)}
+    return {
+        "title": suggestion.title,
+        "creator": suggestion.creator,
+        "year": suggestion.year,
+        "id": suggestion.external_id,
+    }
+
+
+def suggestions_from_items(items: Iterable[Any], media_type: str, limit: int) -> List[Suggestion]:
+    """Valid suggestions from a list of items, dropping junk and duplicates"""
+    suggestions: List[Suggestion] = []
+    seen = set()
+    for item in items:
+        suggestion = suggestion_from_item(item, media_type)
+        if suggestion is None or suggestion.lower() in seen:
+            continue
+        seen.add(suggestion.lower())
+        suggestions.append(suggestion)
+        if len(suggestions) >= limit:
+            break
+    return suggestions
+
+
+def parse_suggestions(content: str, media_type: str, limit: int) -> List[Suggestion]:
+    """
+    Parse a JSON-mode completion ({"recommendations": [...]}, or a bare
+    array) into validated suggestions
+    """
+    data = json.loads(content)
+    items = data.get("recommendations", []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return []
+    return suggestions_from_items(items, media_type, limit)
+
+
+# " - Remastered 2011", " - Live", " - Single Version", " - From "Frozen"
+# Soundtrack" and similar edition suffixes catalogs add to a title. Only a
+# whole " - " segment ending the title counts, so "Live Forever" is kept.
+_EDITION_RE = re.compile(
+    r"\s+-\s+(?:"
+    r"(?:\d{4}\s+)?(?:remaster(?:ed)?|live|mono|stereo|deluxe|single|radio edit|acoustic|bonus track)\b"
+    r"(?:\s+(?:version|edition|mix))?(?:\s+\d{4})?"
+    r"|live\s+(?:at|from|in)\b[^-]*"
+    r"|from\s+[\"“'].*"
+    r"|[^-]*\bversion"
+    r")\s*$"
+)
+
+
+def _fold_accents(text: str) -> str:
+    # Drop accents on Latin letters ("Amélie" -> "Amelie") but keep marks
+    # that distinguish words in other scripts, like Japanese dakuten
+    folded = []
+    base = ""
+    for char in unicodedata.normalize("NFKD", text):
+        if not unicodedata.combining(char):
+            base = char
+        elif base.isascii():
+            continue
+        folded.append(char)
+    return unicodedata.normalize("NFC", "".join(folded))
+
+
+def _normalize_text(text: str) -> str:
+    text = _fold_accents(text.casefold())
+    text = re.sub(r"\s*[(\[].*?[)\]]", "", text)  # "(Remastered 2011)"
+    text = _EDITION_RE.sub("", text)
+    return " ".join(re.findall(r"\w+", text.replace("&", "and")))
+
+
+def _text_key(text: str) -> str:
+    # Titles that are all punctuation still get a key of their own
+    return _normalize_text(text) or text.casefold().strip()
+
+
+def title_key(query: str) -> str:
+    """
+    Key near-duplicate suggestions share: alternate editions, remasters
+    and casing of the same title by the same creator
+    """
+    if isinstance(query, Suggestion):
+        return f"{_text_key(query.title)}|{_normalize_text(query.creator or '')}"
+    return _text_key(query)
+
+
+def same_title(found: str, suggested: str) -> bool:
+    """
+    Whether a catalog title is the suggested one, ignoring edition suffixes
+    and small spelling differences. Titles with different numbers ("Toy
+    Story 2" and "Toy Story 3") are different works.
+    """
+    found, suggested = _normalize_text(found), _normalize_text(suggested)
+    if not found or not suggested:
+        return False
+    if found == suggested:
+        return True
+    if re.findall(r"\d+", found) != re.findall(r"\d+", suggested):
+        return False
+    return SequenceMatcher(None, found, suggested).ratio() >= 0.85
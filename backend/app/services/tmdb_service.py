@@ -1,106 +1,214 @@
 import os
-import requests
 from typing import List, Optional
+from app.metrics import STAGE_SECONDS, UPSTREAM_ERRORS
 from app.models import Movie
+from app.services.cache import TTLCache
+from app.services.concurrency import gather_limited
+from app.services.http_client import get_http_client
+from app.services.query_cache import QueryCache, normalize_query
+from app.services.resilience import TMDB_HEDGE_AFTER_MS, resilient_get
+from app.services.single_flight import SingleFlight
+from app.services.suggestions import Suggestion, same_title
+
+# Movie metadata keyed by TMDb id, shared across requests
+_movie_metadata_cache = TTLCache(
+    name="tmdb_movie_metadata",
+    maxsize=int(os.getenv("TMDB_METADATA_CACHE_SIZE", 5000)),
+    ttl=float(os.getenv("TMDB_METADATA_CACHE_TTL", 86400))
+)
+
+# Resolved movies keyed by normalized LLM query and suggested year
+_movie_query_cache = QueryCache("tmdb_movies", Movie)
+
+# In-flight upstream lookups, keyed by normalized query and year, and by TMDb id
+_movie_lookups = SingleFlight("tmdb_movie_searches")
+_metadata_lookups = SingleFlight("tmdb_movie_metadata")
+
+
+def movie_query_key(query: str) -> str:
+    """
+    Cache key of a movie query: the query plus its suggested year, which
+    tells remakes apart ("Dune" 1984 and "Dune" 2021)
+    """
+    year = getattr(query, "year", None)
+    return f"{query} ({year})" if year else query
 
 
 class TMDbService:
     def __init__(self):
         self.api_key = os.getenv("TMDB_API_KEY")
-        self.base_url = "https://api.themoviedb.org/3"
+        self.base_url = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
         self.image_base_url = "https://image.tmdb.org/t/p/w500"
 
+    @property
+    def client(self):
+        # Resolved per call so the service can outlive a client restart
+        return get_http_client()
+
     async def search_movies(self, movie_queries: List[str]) -> List[Movie]:
         """
         Search for movies on TMDb based on movie queries
         """
-        movies = []
-        
-        for query in movie_queries:
-            try:
-                # Search for the movie
-                search_url = f"{self.base_url}/search/movie"
-                params = {
-                    'api_key': self.api_key,
-                    'query': query.split(' - ')[0] if ' - ' in query else query,  # Extract movie title
-                    'language': 'en-US',
-                    'page': 1,
-                    'include_adult': False
-                }
-                
-                response = requests.get(search_url, params=params)
-                response.raise_for_status()
-                
-                search_results = response.json()
-                
-                if search_results['results']:
-                    movie_data = search_results['results'][0]  # Take first result
-                    
-                    # Get additional details
-                    movie_details = await self._get_movie_details(movie_data['id'])
-                    
-                    # Get director from credits
-                    director = await self._get_movie_director(movie_data['id'])
-                    
-                    # Build poster URL
-                    poster_url = None
-                    if movie_data.get('poster_path'):
-                        poster_url = f"{self.image_base_url}{movie_data['poster_path']}"
-                    
-                    movie = Movie(
-                        title=movie_data['title'],
-                        director=director,
-                        year=int(movie_data['release_date'][:4]) if movie_data.get('release_date') else None,
-                        genres=[genre['name'] for genre in movie_details.get('genres', [])],
-                        tmdb_url=f"https://www.themoviedb.org/movie/{movie_data['id']}",
-                        poster_url=poster_url,
-                        rating=round(movie_data.get('vote_average', 0), 1) if movie_data.get('vote_average') else None,
-                        synopsis=movie_data.get('overview'),
-                        runtime=movie_details.get('runtime')
-                    )
-                    
-                    movies.append(movie)
-                    
-            except Exception as e:
-                print(f"Error searching for movie '{query}': {e}")
-                continue
-        
-        return movies
-
-    async def _get_movie_details(self, movie_id: int) -> dict:
-        """Get detailed movie information"""
+        # Look up all titles concurrently, keeping the LLM's ranking order
+        results = await gather_limited(movie_queries, self.search_movie)
+        return [movie for movie in results if movie is not None]
+
+    async def search_movie(self, query: str) -> Optional[Movie]:
+        """Search for a single movie and build it with details and director"""
+        key = movie_query_key(query)
+        found, movie = await _movie_query_cache.get(key)
+        if found:
+            return movie
+
+        # Identical titles requested concurrently share one upstream lookup
+        return await _movie_lookups.do(normalize_query(key), lambda: self._search_movie_upstream(query))
+
+    async def _search_movie_upstream(self, query: str) -> Optional[Movie]:
+        """Search TMDb for a single movie"""
+        key = movie_query_key(query)
         try:
-            details_url = f"{self.base_url}/movie/{movie_id}"
-            params = {
-                'api_key': self.api_key,
-                'language': 'en-US'
-            }
-            
-            response = requests.get(details_url, params=params)
-            response.raise_for_status()
-            return response.json()
+            if isinstance(query, Suggestion):
+                title, year = query.title, query.year
+            else:
+                title, year = (query.split(' - ')[0] if ' - ' in query else query), None  # Extract movie title
+
+            # A suggested TMDb id resolves in one details call, if it is the suggested movie
+            movie_id = getattr(query, "external_id", None)
+            if movie_id and movie_id.isdigit():
+                movie = await self._get_movie_by_id(int(movie_id), title)
+                if movie is not None:
+                    _movie_query_cache.set(key, movie)
+                    return movie
+
+            movie_data = await self._search(title, year)
+            # The suggested year may be off by one, so retry without it once
+            if movie_data is None and year is not None:
+                movie_data = await self._search(title, None)
+
+            if movie_data is None:
+                _movie_query_cache.set(key, None)
+                return None
+
+            # Get genres, runtime and director (cached by TMDb id)
+            metadata = await self._get_movie_metadata(movie_data['id'])
+            movie = self._build_movie(movie_data, metadata or {})
+            # Without its metadata the movie is still served, but not cached,
+            # so the next request retries the details call
+            if metadata is not None:
+                _movie_query_cache.set(key, movie)
+            return movie
+
         except Exception as e:
-            print(f"Error getting movie details: {e}")
-            return {}
+            print(f"Error searching for movie '{query}': {e}")
+            UPSTREAM_ERRORS.inc(upstream="tmdb")
+            return None
 
-    async def _get_movie_director(self, movie_id: int) -> Optional[str]:
-        """Get movie director from credits"""
-        try:
-            credits_url = f"{self.base_url}/movie/{movie_id}/credits"
-            params = {
-                'api_key': self.api_key
-            }
-            
-            response = requests.get(credits_url, params=params)
-            response.raise_for_status()
-            credits = response.json()
-            
-            # Find director in crew
-            for crew_member in credits.get('crew', []):
-                if crew_member.get('job') == 'Director':
-                    return crew_member.get('name')
-            
+    async def _search(self, title: str, year: Optional[int]) -> Optional[dict]:
+        """First TMDb search result for a title, narrowed by year when known"""
+        search_url = f"{self.base_url}/search/movie"
+        params = {
+            'api_key': self.api_key,
+            'query': title,
+            'language': 'en-US',
+            'page': 1,
+            'include_adult': False
+        }
+        if year is not None:
+            params['primary_release_year'] = year
+
+        with STAGE_SECONDS.time(stage="tmdb_search"):
+            response = await resilient_get(
+                self.client, "tmdb", search_url, params=params, hedge_after_ms=TMDB_HEDGE_AFTER_MS
+            )
+        response.raise_for_status()
+
+        search_results = response.json()
+        return search_results['results'][0] if search_results['results'] else None  # Take first result
+
+    async def _get_movie_by_id(self, movie_id: int, title: str) -> Optional[Movie]:
+        """Build a movie from one details call, or None if the id isn't that title"""
+        details = await self._fetch_details(movie_id)
+        if not details or not same_title(details.get('title', ''), title):
             return None
+
+        metadata = self._metadata_from_details(details)
+        _movie_metadata_cache.set(movie_id, metadata)
+        return self._build_movie(details, metadata)
+
+    def _build_movie(self, movie_data: dict, metadata: dict) -> Movie:
+        # Build poster URL
+        poster_url = None
+        if movie_data.get('poster_path'):
+            poster_url = f"{self.image_base_url}{movie_data['poster_path']}"
+
+        return Movie(
+            title=movie_data['title'],
+            director=metadata.get('director'),
+            year=int(movie_data['release_date'][:4]) if movie_data.get('release_date') else None,
+            genres=metadata.get('genres', []),
+            tmdb_url=f"https://www.themoviedb.org/movie/{movie_data['id']}",
+            poster_url=poster_url,
+            rating=round(movie_data.get('vote_average', 0), 1) if movie_data.get('vote_average') else None,
+            synopsis=movie_data.get('overview'),
+            runtime=metadata.get('runtime')
+        )
+
+    async def _get_movie_metadata(self, movie_id: int) -> Optional[dict]:
+        """
+        Get genres, runtime and director for a movie in one request, using
+        append_to_response to fold the credits into the details call.
+        Returns None when the details call failed.
+        """
+        cached = _movie_metadata_cache.get(movie_id)
+        if cached is not None:
+            return cached
+
+        return await _metadata_lookups.do(movie_id, lambda: self._fetch_movie_metadata(movie_id))
+
+    async def _fetch_movie_metadata(self, movie_id: int) -> Optional[dict]:
+        """Fetch details with credits appended from TMDb"""
+        try:
+            details = await self._fetch_details(movie_id)
+            if details is None:
+                return {}
+
+            metadata = self._metadata_from_details(details)
+            _movie_metadata_cache.set(movie_id, metadata)
+            return metadata
         except Exception as e:
-            print(f"Error getting movie director: {e}")
-            return None
\ No newline at end of file
+            print(f"Error getting movie metadata: {e}")
+            UPSTREAM_ERRORS.inc(upstream="tmdb")
+            return None
+
+    async def _fetch_details(self, movie_id: int) -> Optional[dict]:
+        """Movie details with credits appended, or None for an unknown id"""
+        details_url = f"{self.base_url}/movie/{movie_id}"
+        params = {
+            'api_key': self.api_key,
+            'language': 'en-US',
+            'append_to_response': 'credits'
+        }
+
+        with STAGE_SECONDS.time(stage="tmdb_details"):
+            response = await resilient_get(
+                self.client, "tmdb", details_url, params=params, hedge_after_ms=TMDB_HEDGE_AFTER_MS
+            )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def _metadata_from_details(self, details: dict) -> dict:
+        # Find director in crew
+        director = None
+        for crew_member in details.get('credits', {}).get('crew', []):
+            if crew_member.get('job') == 'Director':
+                director = crew_member.get('name')
+                break
+
+        # Only keep the fields Movie needs so cached entries stay small
+        return {
+            'genres': [genre['name'] for genre in details.get('genres', [])],
+            'runtime': details.get('runtime'),
+            'director': director
+        }
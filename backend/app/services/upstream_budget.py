@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.services.rate_limit import WORKERS, TokenBucket
+
+# Call priorities, highest first
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = ("interactive", "batch", "background")
+
+
+def _limit(upstream: str, rate: float, burst: float) -> Tuple[float, float]:
+    """(calls per second, burst) for an upstream, this worker's share"""
+    prefix = upstream.upper()
+    return (
+        float(os.getenv(f"{prefix}_RATE_LIMIT", rate)) / WORKERS,
+        float(os.getenv(f"{prefix}_RATE_BURST", burst)) / WORKERS,
+    )
+
+
+# Provider limits across all workers (0 disables metering for an upstream).
+# Defaults sit below the published limits so retries and hedges have room.
+UPSTREAM_LIMITS: Dict[str, Tuple[float, float]] = {
+    "openai": _limit("openai", 50, 50),  # 3,500 requests/min on the default tier
+    "tmdb": _limit("tmdb", 40, 40),  # ~50 requests/s per IP
+    "spotify": _limit("spotify", 20, 40),  # rolling 30s window, no fixed figure
+    "google_books": _limit("google_books", 10, 20),  # per-key daily quota
+}
+
+# Share of each bucket lower priorities must leave for higher ones
+RESERVES = (
+    0.0,
+    float(os.getenv("BUDGET_BATCH_RESERVE", 0.2)),
+    float(os.getenv("BUDGET_BACKGROUND_RESERVE", 0.5)),
+)
+
+# Longest a call queues for budget before it is rejected (seconds); an
+# interactive call never waits past its request deadline either
+MAX_WAIT = (
+    float(os.getenv("BUDGET_MAX_WAIT_INTERACTIVE", 1.0)),
+    float(os.getenv("BUDGET_MAX_WAIT_BATCH", 2.0)),
+    float(os.getenv("BUDGET_MAX_WAIT_BACKGROUND", 30.0)),
+)
+
+# Priority of upstream calls made by the current task
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+class BudgetExceeded(Exception):
+    """The upstream's call budget ran out, so the call was not made"""
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the block's upstream calls, and tasks it starts, at priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def set_priority(priority: int) -> None:
+    """Set the priority for the rest of the current task, e.g. background work"""
+    _priority.set(priority)
+
+
+class UpstreamBudget:
+    """
+    Meters calls to each upstream against its rate limit. Each call takes
+    a token from the upstream's bucket, queueing briefly when it is empty.
+    Lower priorities leave a reserve for higher ones and never take a
+    token while a higher priority call is waiting, so interactive requests
+    go first when quota is tight.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]] = UPSTREAM_LIMITS):
+        self.buckets = {
+            upstream: TokenBucket(rate, burst)
+            for upstream, (rate, burst) in limits.items() if rate > 0
+        }
+        self._waiting = {upstream: [0] * len(PRIORITY_NAMES) for upstream in self.buckets}
+        self.rejected: Dict[Tuple[str, str], int] = {}
+
+    def headroom(self, upstream: str, priority: Optional[int] = None) -> float:
+        """Calls the priority could make right now without waiting"""
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            return float("inf")
+        priority = _priority.get() if priority is None else priority
+        return max(bucket.available() - bucket.burst * RESERVES[priority], 0.0)
+
+    async def acquire(self, upstream: str, max_wait: Optional[float] = None) -> None:
+        """
+        Wait for the budget of one call at the current priority. Raises
+        BudgetExceeded when it can't be had within max_wait (or the
+        priority's MAX_WAIT).
+        """
+        bucket = self.buckets.get(upstream)
+        if bucket is None:
+            return
+
+        priority = _priority.get()
+        keep = min(bucket.burst * RESERVES[priority], bucket.burst - 1)
+        waiting = self._waiting[upstream]
+        if not any(waiting[:priority]) and bucket.try_take(keep=keep):
+            return
+
+        limit = MAX_WAIT[priority] if max_wait is None else min(max_wait, MAX_WAIT[priority])
+        give_up_at = time.monotonic() + limit
+        waiting[priority] += 1
+        try:
+            while True:
+                delay = max(bucket.wait_time(keep=keep), 1 / bucket.rate)
+                if time.monotonic() + delay > give_up_at:
+                    key = (upstream, PRIORITY_NAMES[priority])
+                    self.rejected[key] = self.rejected.get(key, 0) + 1
+                    raise BudgetExceeded(f"{upstream} call budget exhausted")
+                await asyncio.sleep(delay)
+                if not any(waiting[:priority]) and bucket.try_take(keep=keep):
+                    return
+        finally:
+            waiting[priority] -= 1
+
+    def stats(self) -> List[Tuple[str, float, int]]:
+        """(upstream, tokens left, calls waiting) per metered upstream"""
+        return [
+            (upstream, self.headroom(upstream, INTERACTIVE), sum(self._waiting[upstream]))
+            for upstream in self.buckets
+        ]
+
+
+upstream_budget = UpstreamBudget()
@@ -0,0 +1,319 @@
+"""
+Local stand-ins for the OpenAI chat-completions, TMDb, Spotify and Google
+Books APIs.
+
+Every upstream gets a configurable latency, jitter and error rate, and every
+call is counted so benchmark runs can report upstream traffic:
+
+    python -m benchmarks.mock_upstreams --port 9100 --openai-latency-ms 800
+
+GET /_stats returns the call counters and POST /_reset clears them.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MOVIE_TITLES = [
+    "The Grand Budapest Hotel", "Paddington", "The Princess Bride", "About Time", "Her",
+    "Manchester by the Sea", "The Pursuit of Happyness", "Inside Out", "Mad Max: Fury Road",
+    "John Wick", "The Dark Knight", "Gone Girl", "Zodiac", "No Country for Old Men",
+    "Prisoners", "Superbad", "Bridesmaids", "Knives Out", "Game Night", "Before Sunrise",
+    "The Notebook", "Casablanca", "Hereditary", "The Conjuring", "Get Out", "A Quiet Place",
+    "Amelie", "Up", "Whiplash", "La La Land", "Arrival", "Interstellar",
+]
+
+SONGS = [
+    "Pharrell Williams - Happy", "The Beatles - Here Comes the Sun", "Queen - Don't Stop Me Now",
+    "Johnny Cash - Hurt", "Gary Jules - Mad World", "Eric Clapton - Tears in Heaven",
+    "The Killers - Mr. Brightside", "Queen - We Will Rock You", "AC/DC - Thunderstruck",
+    "Norah Jones - Come Away With Me", "Jack Johnson - Better Together", "Ed Sheeran - Perfect",
+    "John Legend - All of Me", "Etta James - At Last", "Adele - Someone Like You",
+    "Radiohead - No Surprises", "Daft Punk - Get Lucky", "Fleetwood Mac - Dreams",
+    "Bill Withers - Lovely Day", "Coldplay - Yellow", "Oasis - Wonderwall", "Toto - Africa",
+]
+
+BOOKS = [
+    "The Hitchhiker's Guide to the Galaxy by Douglas Adams", "Pride and Prejudice by Jane Austen",
+    "The Road by Cormac McCarthy", "Norwegian Wood by Haruki Murakami", "Dune by Frank Herbert",
+    "The Secret History by Donna Tartt", "Gone Girl by Gillian Flynn", "Little Women by Louisa May Alcott",
+    "The Martian by Andy Weir", "A Man Called Ove by Fredrik Backman", "Rebecca by Daphne du Maurier",
+    "The Alchemist by Paulo Coelho", "Circe by Madeline Miller", "The Shining by Stephen King",
+    "Anne of Green Gables by L. M. Montgomery", "Atomic Habits by James Clear",
+]
+
+PODCASTS = [
+    "Radiolab", "Stuff You Should Know", "The Daily", "Serial", "My Favorite Murder", "Criminal",
+    "How I Built This", "Planet Money", "This American Life", "The Moth", "Hidden Brain",
+    "Freakonomics Radio", "99% Invisible", "Hardcore History", "Crime Junkie", "Song Exploder",
+]
+
+
+def _stable_id(text: str) -> int:
+    return zlib.crc32(text.lower().encode()) % 1_000_000 + 1
+
+
+def create_app(config: Dict[str, Dict[str, float]], seed: int = 0) -> FastAPI:
+    """
+    Build the mock app. config maps "openai", "tmdb", "spotify" and
+    "google_books" to
+    {"latency_ms", "jitter_ms", "error_rate"}.
+    """
+    app = FastAPI()
+    calls: Counter = Counter()
+    rng = random.Random(seed)
+
+    async def simulate(upstream: str, endpoint: str):
+        calls[f"{upstream}:{endpoint}"] += 1
+        settings = config[upstream]
+        delay = settings["latency_ms"] + rng.uniform(-1, 1) * settings["jitter_ms"]
+        await asyncio.sleep(max(delay, 0) / 1000)
+        if rng.random() < settings["error_rate"]:
+            calls[f"{upstream}:errors"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return None
+
+    @app.get("/_stats")
+    async def stats():
+        return dict(calls)
+
+    @app.post("/_reset")
+    async def reset():
+        calls.clear()
+        return {"reset": True}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await simulate("openai", "chat_completions")
+        if error:
+            return error
+
+        prompt = body["messages"][-1]["content"]
+        picker = random.Random(prompt)
+        structured = body.get("response_format", {}).get("type") == "json_object"
+        if re.search(r'^"\d+": ', prompt, re.MULTILINE):
+            # Batch prompt: one line per request id
+            answer = {}
+            for line in prompt.splitlines():
+                match = re.match(r'"(\d+)": ', line)
+                if match:
+                    names = picker.sample(_pool(line), 10)
+                    answer[match.group(1)] = [_item(name, line) for name in names] if structured else names
+            content = json.dumps(answer)
+        else:
+            names = picker.sample(_pool(prompt), 10)
+            if structured:
+                content = json.dumps({"recommendations": [_item(name, prompt) for name in names]})
+            else:
+                content = json.dumps(names)
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.get("/3/search/movie")
+    async def tmdb_search(query: str):
+        error = await simulate("tmdb", "search")
+        if error:
+            return error
+        MOVIES_BY_ID[_stable_id(query)] = query
+        return {"results": [{
+            "id": _stable_id(query),
+            "title": query,
+            "release_date": "2014-03-07",
+            "vote_average": 7.5,
+            "overview": f"A mock synopsis for {query}.",
+            "poster_path": f"/{_stable_id(query)}.jpg",
+        }]}
+
+    @app.get("/3/movie/{movie_id}")
+    async def tmdb_details(movie_id: int, append_to_response: str = ""):
+        error = await simulate("tmdb", "details")
+        if error:
+            return error
+        title = MOVIES_BY_ID.get(movie_id)
+        if title is None:
+            return JSONResponse({"status_message": "not found"}, status_code=404)
+        details = {
+            "id": movie_id,
+            "title": title,
+            "release_date": "2014-03-07",
+            "vote_average": 7.5,
+            "overview": f"A mock synopsis for {title}.",
+            "poster_path": f"/{movie_id}.jpg",
+            "runtime": 100 + movie_id % 40,
+            "genres": [{"name": "Drama"}],
+        }
+        if "credits" in append_to_response:
+            details["credits"] = {"crew": [{"job": "Director", "name": f"Director {movie_id}"}]}
+        return details
+
+    @app.get("/3/movie/{movie_id}/credits")
+    async def tmdb_credits(movie_id: int):
+        error = await simulate("tmdb", "credits")
+        if error:
+            return error
+        return {"crew": [{"job": "Director", "name": f"Director {movie_id}"}]}
+
+    @app.post("/api/token")
+    async def spotify_token():
+        error = await simulate("spotify", "token")
+        if error:
+            return error
+        return {"access_token": "mock-token", "token_type": "Bearer", "expires_in": 3600}
+
+    def track(track_id: str, name: str) -> dict:
+        artist, _, title = name.partition(" - ")
+        return {
+            "id": track_id,
+            "name": title or name,
+            "artists": [{"name": artist}],
+            "album": {"name": f"{artist} Album", "images": [{"url": f"https://mock/{track_id}.jpg"}]},
+            "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+            "preview_url": None,
+            "popularity": 50,
+            "duration_ms": 200000,
+        }
+
+    @app.get("/v1/search")
+    async def spotify_search(q: str):
+        error = await simulate("spotify", "search")
+        if error:
+            return error
+        fields = dict(re.findall(r'(\w+):"([^"]*)"', q))
+        name = f"{fields['artist']} - {fields['track']}" if {"artist", "track"} <= fields.keys() else q
+        return {"tracks": {"items": [track(str(_stable_id(name)), name)]}}
+
+    @app.get("/v1/tracks")
+    async def spotify_tracks(ids: str):
+        error = await simulate("spotify", "tracks")
+        if error:
+            return error
+        return {"tracks": [track(track_id, f"Artist {track_id} - Track {track_id}") for track_id in ids.split(",")]}
+
+    def volume(volume_id: str, title: str, author: str) -> dict:
+        isbn = _isbn(title)
+        return {
+            "id": volume_id,
+            "volumeInfo": {
+                "title": title,
+                "authors": [author],
+                "publishedDate": "2001-05-01",
+                "categories": ["Fiction"],
+                "industryIdentifiers": [{"type": "ISBN_13", "identifier": isbn}],
+                "imageLinks": {"thumbnail": f"http://books.mock/{volume_id}.jpg"},
+                "averageRating": 4.0,
+                "description": f"A mock description of {title}.",
+                "pageCount": 320,
+                "infoLink": f"https://books.google.com/books?id={volume_id}",
+            },
+        }
+
+    @app.get("/books/v1/volumes")
+    async def google_books_search(q: str):
+        error = await simulate("google_books", "search")
+        if error:
+            return error
+        if q.startswith("isbn:"):
+            book = BOOKS_BY_ISBN.get(q[len("isbn:"):])
+            if book is None:
+                return {}
+            title, author = book
+        else:
+            quoted = re.findall(r'"([^"]*)"', q)
+            title = quoted[0] if quoted else q
+            author = quoted[1] if len(quoted) > 1 else "Unknown Author"
+        return {"items": [volume(f"{_stable_id(title):x}", title, author)]}
+
+    @app.get("/books/v1/volumes/{volume_id}")
+    async def google_books_volume(volume_id: str):
+        error = await simulate("google_books", "volume")
+        if error:
+            return error
+        return volume(volume_id, f"Book {volume_id}", "Unknown Author")
+
+    return app
+
+
+def _isbn(title: str) -> str:
+    return f"978{_stable_id(title):010d}"
+
+
+# Catalog entries the mock LLM may suggest by id
+MOVIES_BY_ID: Dict[int, str] = {_stable_id(title): title for title in MOVIE_TITLES}
+BOOKS_BY_ISBN: Dict[str, tuple] = {
+    _isbn(title): (title, author) for title, _, author in (book.rpartition(" by ") for book in BOOKS)
+}
+
+
+def _item(name: str, prompt: str) -> dict:
+    """A structured recommendation as the real LLM would return it in JSON mode"""
+    if "songs" in prompt:
+        artist, _, title = name.partition(" - ")
+        return {"title": title, "creator": artist, "year": None, "id": None}
+    if "books" in prompt:
+        title, _, author = name.rpartition(" by ")
+        return {"title": title, "creator": author, "year": None, "id": _isbn(title)}
+    if "podcasts" in prompt:
+        return {"title": name, "creator": None, "year": None, "id": None}
+    return {"title": name, "creator": None, "year": 2014, "id": str(_stable_id(name))}
+
+
+def _pool(prompt: str) -> list:
+    if "songs" in prompt:
+        return SONGS
+    if "books" in prompt:
+        return BOOKS
+    if "podcasts" in prompt:
+        return PODCASTS
+    return MOVIE_TITLES
+
+
+UPSTREAMS = ("openai", "tmdb", "spotify", "google_books")
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = {"openai": 800, "tmdb": 80, "spotify": 60, "google_books": 70}
+    for upstream, latency in defaults.items():
+        option = upstream.replace("_", "-")
+        parser.add_argument(f"--{option}-latency-ms", type=float, default=latency)
+        parser.add_argument(f"--{option}-jitter-ms", type=float, default=latency / 4)
+        parser.add_argument(f"--{option}-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_arguments(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    return {
+        upstream: {
+            "latency_ms": getattr(args, f"{upstream}_latency_ms"),
+            "jitter_ms": getattr(args, f"{upstream}_jitter_ms"),
+            "error_rate": getattr(args, f"{upstream}_error_rate"),
+        }
+        for upstream in UPSTREAMS
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=9100)
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_arguments(args), args.seed), host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,247 @@
+"""
+Offline benchmark for the recommendation endpoints.
+
+Starts the local upstream stand-ins (benchmarks.mock_upstreams) and the API
+server pointed at them, then drives /api/media-recommendations and
+/api/recommendations at each concurrency level. Every scenario starts from a
+fresh API process so caches are cold and runs are comparable between
+commits. Results are printed and written to benchmarks/results/ as JSON:
+
+    python -m benchmarks.run_benchmark --concurrency 1 8 32 --requests 200
+    python -m benchmarks.run_benchmark --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.mock_upstreams import UPSTREAMS, add_upstream_arguments
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+BASE_MOODS = [
+    "happy", "sad", "chill", "energetic", "romantic", "scary", "nostalgic", "angry",
+    "anxious", "hopeful", "lonely", "focused", "adventurous", "melancholy", "silly", "tired",
+]
+MODIFIERS = ["", "rainy day", "late night", "with friends", "after work", "sunday morning"]
+
+SCENARIOS = {
+    "media-movies": ("/api/media-recommendations", {"media_type": "movies"}),
+    "media-music": ("/api/media-recommendations", {"media_type": "music"}),
+    "media-books": ("/api/media-recommendations", {"media_type": "books"}),
+    "legacy-music": ("/api/recommendations", {}),
+}
+
+
+def mood_pool(distinct: int, seed: int) -> List[str]:
+    moods = [f"{mood} {modifier}".strip() for modifier in MODIFIERS for mood in BASE_MOODS]
+    random.Random(seed).shuffle(moods)
+    return moods[:distinct]
+
+
+def percentile(latencies: List[float], pct: float) -> float:
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def drive(base_url: str, path: str, extra: dict, moods: List[str], requests: int,
+                concurrency: int, limit: int, seed: int) -> Dict[str, float]:
+    rng = random.Random(seed)
+    bodies = [{"mood": rng.choice(moods), "limit": limit, **extra} for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        async def one(body: dict):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, json=body)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(body) for body in bodies))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1),
+    }
+
+
+def run_scenario(args: argparse.Namespace, name: str, concurrency: int) -> Dict[str, object]:
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    env = {
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"{mock_url}/v1",
+        "TMDB_API_KEY": "benchmark",
+        "TMDB_BASE_URL": f"{mock_url}/3",
+        "SPOTIFY_CLIENT_ID": "benchmark",
+        "SPOTIFY_CLIENT_SECRET": "benchmark",
+        "SPOTIFY_TOKEN_URL": f"{mock_url}/api/token",
+        "SPOTIFY_API_BASE_URL": f"{mock_url}/v1",
+        "GOOGLE_BOOKS_BASE_URL": f"{mock_url}/books/v1",
+        "QUERY_CACHE_DB": "",
+        "SHARED_CACHE_URL": "",
+        "CLIENT_RATE_LIMIT": "0",
+        "RECOMMENDATION_STORE_PATH": "",
+        "PREWARM_INTERVAL": "0",
+    }
+    api = start_process(
+        ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.api_port), "--log-level", "warning"],
+        env,
+    )
+    try:
+        wait_until_up(f"{api_url}/api/health")
+        httpx.post(f"{mock_url}/_reset")
+
+        path, extra = SCENARIOS[name]
+        moods = mood_pool(args.distinct_moods, args.seed)
+        result = asyncio.run(drive(api_url, path, extra, moods, args.requests, concurrency, args.limit, args.seed))
+
+        upstream_calls = httpx.get(f"{mock_url}/_stats").json()
+        result["upstream_calls"] = upstream_calls
+        result["upstream_calls_per_request"] = round(
+            sum(count for key, count in upstream_calls.items() if not key.endswith(":errors")) / args.requests, 2
+        )
+        return result
+    finally:
+        stop_process(api)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: List[Dict[str, object]], baseline: Optional[Dict[str, Dict[str, object]]]) -> None:
+    header = f"{'scenario':<14}{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'calls/req':>11}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['scenario']:<14}{result['concurrency']:>6}{result['throughput_rps']:>10}"
+            f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}"
+            f"{result['errors']:>8}{result['upstream_calls_per_request']:>11}"
+        )
+        previous = (baseline or {}).get(f"{result['scenario']}@{result['concurrency']}")
+        if previous:
+            print(
+                f"{'  vs baseline':<20}{result['throughput_rps'] - previous['throughput_rps']:>+10.2f}"
+                f"{result['p50_ms'] - previous['p50_ms']:>+10.1f}{result['p95_ms'] - previous['p95_ms']:>+10.1f}"
+                f"{result['p99_ms'] - previous['p99_ms']:>+10.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and concurrency level")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--distinct-moods", type=int, default=24, help="size of the mood pool requests draw from")
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=9200)
+    parser.add_argument("--output", type=Path, help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to diff against")
+    add_upstream_arguments(parser)
+    args = parser.parse_args()
+
+    mock_args = ["-m", "benchmarks.mock_upstreams", "--port", str(args.mock_port), "--seed", str(args.seed)]
+    for upstream in UPSTREAMS:
+        for setting in ("latency_ms", "jitter_ms", "error_rate"):
+            option = f"{upstream}_{setting}"
+            mock_args += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    mock = start_process(mock_args, {})
+
+    results = []
+    try:
+        wait_until_up(f"http://127.0.0.1:{args.mock_port}/_stats")
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = run_scenario(args, name, concurrency)
+                results.append({"scenario": name, "concurrency": concurrency, **result})
+    finally:
+        stop_process(mock)
+
+    baseline = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        baseline = {f"{r['scenario']}@{r['concurrency']}": r for r in previous["results"]}
+    print_report(results, baseline)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "settings": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Micro-benchmark of the per-request cost of turning resolved items into
+response bytes, with no network or upstreams involved.
+
+Each path starts from a cached list of Track/Movie objects, as a response
+cache hit does, and ends with the encoded body:
+
+    python -m benchmarks.serialization_benchmark --iterations 5000
+
+"previous" paths reproduce how responses were built before results were
+typed: a List[Any] response model validated and encoded by FastAPI, and
+the legacy route building the unified response and then a second one.
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from app.models import MediaRecommendationResponse, Movie, RecommendationResponse, Track
+from app.responses import ModelResponse, parse_fields, results_include
+
+MOOD = "rainy sunday"
+LIMIT = 10
+
+SYNOPSIS = (
+    "A quiet drama about two strangers who meet on a delayed train and spend "
+    "the night walking through a city neither of them knows, talking about "
+    "everything they never said to the people they left behind. "
+) * 3
+
+
+class UntypedResponse(BaseModel):
+    """MediaRecommendationResponse as it was, with results: List[Any]"""
+    mood: str
+    media_type: str
+    results: List[Any]
+    total_found: int
+    degraded: bool = False
+    partial: bool = False
+    pending: List[str] = []
+
+
+def sample_items() -> Dict[str, List[Any]]:
+    tracks = [
+        Track(
+            name=f"Song {i}",
+            artist=f"Artist {i}",
+            album=f"Album {i}",
+            spotify_url=f"https://open.spotify.com/track/{i:022d}",
+            preview_url=f"https://p.scdn.co/mp3-preview/{i:040d}",
+            image_url=f"https://i.scdn.co/image/{i:040d}",
+            popularity=50 + i,
+            duration_ms=200000 + i
+        )
+        for i in range(LIMIT)
+    ]
+    movies = [
+        Movie(
+            title=f"Movie {i}",
+            director=f"Director {i}",
+            year=1990 + i,
+            genres=["Drama", "Romance"],
+            tmdb_url=f"https://www.themoviedb.org/movie/{1000 + i}",
+            poster_url=f"https://image.tmdb.org/t/p/w500/{i:027d}.jpg",
+            rating=7.5,
+            synopsis=SYNOPSIS,
+            runtime=110 + i
+        )
+        for i in range(LIMIT)
+    ]
+    return {"music": tracks, "movies": movies}
+
+
+Path = Callable[[], Awaitable[bytes]]
+
+
+def paths(items: Dict[str, List[Any]]) -> Dict[str, Path]:
+    tracks, movies = items["music"], items["movies"]
+    untyped = create_model_field(name="response", type_=UntypedResponse, mode="serialization")
+    legacy = create_model_field(name="response", type_=RecommendationResponse, mode="serialization")
+    list_fields = results_include(MediaRecommendationResponse, parse_fields("title,year,poster_url,rating"))
+
+    def previous(media_type: str, results: List[Any]) -> Path:
+        # FastAPI validates the returned model against response_model, then encodes
+        async def encode() -> bytes:
+            response = UntypedResponse(
+                mood=MOOD, media_type=media_type, results=results, total_found=len(results)
+            )
+            return JSONResponse(await serialize_response(field=untyped, response_content=response)).body
+        return encode
+
+    def current(media_type: str, results: List[Any], include=None) -> Path:
+        async def encode() -> bytes:
+            response = MediaRecommendationResponse(
+                mood=MOOD, media_type=media_type, results=results, total_found=len(results)
+            )
+            return ModelResponse(response, include=include).body
+        return encode
+
+    async def previous_legacy() -> bytes:
+        # The unified response was built, then rebuilt as RecommendationResponse
+        unified = UntypedResponse(mood=MOOD, media_type="music", results=tracks, total_found=len(tracks))
+        response = RecommendationResponse(
+            mood=unified.mood, tracks=unified.results, total_found=unified.total_found
+        )
+        return JSONResponse(await serialize_response(field=legacy, response_content=response)).body
+
+    async def current_legacy() -> bytes:
+        response = RecommendationResponse(mood=MOOD, tracks=tracks, total_found=len(tracks))
+        return ModelResponse(response).body
+
+    return {
+        "music previous": previous("music", tracks),
+        "music current": current("music", tracks),
+        "movies previous": previous("movies", movies),
+        "movies current": current("movies", movies),
+        "movies current fields": current("movies", movies, list_fields),
+        "legacy previous": previous_legacy,
+        "legacy current": current_legacy,
+    }
+
+
+async def measure(path: Path, iterations: int, repeats: int = 5) -> float:
+    """Best mean over several repeats, in microseconds"""
+    means = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await path()
+        means.append((time.perf_counter() - start) / iterations)
+    return min(means) * 1e6
+
+
+async def run(iterations: int) -> None:
+    print(f"{'path':<24}{'us/request':>12}{'bytes':>10}")
+    for name, path in paths(sample_items()).items():
+        timing = await measure(path, iterations)
+        print(f"{name:<24}{timing:>12.1f}{len(await path()):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
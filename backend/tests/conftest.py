@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.models import Movie, Track
+from app.routes import media
+from app.services import resilience, result_assembly
+from app.services import response_cache as response_cache_module
+from app.services.recommendation_store import RecommendationStore
+from app.services.response_cache import ResponseCache
+from app.services.resilience import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    """Circuit breakers start closed in every test"""
+    monkeypatch.setattr(resilience, "breakers", {name: CircuitBreaker(name) for name in resilience.breakers})
+
+
+class FakeLLM:
+    """Stands in for MediaAIService, suggesting fixed titles after a delay"""
+
+    def __init__(self, titles, delay=0.0):
+        self.titles = titles
+        self.delay = delay
+        self.limits = []  # limit of every call, in order
+
+    async def get_media_recommendations(self, mood, media_type, limit=10):
+        self.limits.append(limit)
+        await asyncio.sleep(self.delay)
+        return self.titles[:limit]
+
+    async def stream_media_recommendations(self, mood, media_type, limit=10):
+        self.limits.append(limit)
+        for title in self.titles[:limit]:
+            await asyncio.sleep(self.delay)
+            yield title
+
+    async def get_batch_recommendations(self, prompts):
+        self.limits.extend(limit for _, _, limit in prompts)
+        return [self.titles[:limit] for _, _, limit in prompts]
+
+
+class FakeCatalog:
+    """
+    Stands in for every catalog service, resolving each title to a movie.
+    Titles can be made slow, missing or failing.
+    """
+
+    def __init__(self):
+        self.delays = {}
+        self.missing = set()
+        self.failing = set()
+        self.looked_up = []
+
+    async def lookup(self, query, make=None):
+        self.looked_up.append(str(query))
+        await asyncio.sleep(self.delays.get(query, 0))
+        if query in self.failing:
+            raise RuntimeError(f"upstream failed for {query}")
+        if query in self.missing:
+            return None
+        return (make or movie)(query)
+
+    async def search(self, queries, make=None):
+        found = await asyncio.gather(*(self.lookup(query, make) for query in queries), return_exceptions=True)
+        return [None if isinstance(item, Exception) else item for item in found]
+
+    async def search_track(self, query):
+        return await self.lookup(query, track)
+
+    async def search_tracks(self, queries):
+        return await self.search(queries, track)
+
+    search_movie = search_book = search_podcast = lookup
+    search_movies = search_books = search_podcasts = search
+
+
+def track(title):
+    return Track(
+        name=str(title),
+        artist="Test Artist",
+        album="Test Album",
+        spotify_url=f"https://open.spotify.com/track/{abs(hash(str(title)))}",
+        preview_url=None,
+        image_url=None,
+        popularity=None,
+        duration_ms=None,
+    )
+
+
+def movie(title):
+    return Movie(
+        title=str(title),
+        director=None,
+        year=None,
+        genres=[],
+        tmdb_url=f"https://www.themoviedb.org/movie/{abs(hash(str(title)))}",
+        poster_url=None,
+        rating=None,
+        synopsis=None,
+        runtime=None,
+    )
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """
+    The media routes served with fake services through
+    app.dependency_overrides, with empty caches and no rate limits
+    """
+    cache = ResponseCache()
+    store = RecommendationStore("")
+    monkeypatch.setattr(media, "response_cache", cache)
+    monkeypatch.setattr(result_assembly, "response_cache", cache)
+    monkeypatch.setattr(media, "recommendation_store", store)
+    monkeypatch.setattr(response_cache_module, "recommendation_store", store)
+    monkeypatch.setattr(media, "enforce_rate_limit", lambda request, cost=1.0: None)
+
+    llm = FakeLLM([f"Movie {number}" for number in range(1, 21)])
+    catalog = FakeCatalog()
+    app = FastAPI()
+    app.include_router(media.router, prefix="/api")
+    app.dependency_overrides.update({
+        dependencies.get_media_ai_service: lambda: llm,
+        dependencies.get_spotify_service: lambda: catalog,
+        dependencies.get_tmdb_service: lambda: catalog,
+        dependencies.get_google_books_service: lambda: catalog,
+        dependencies.get_podcast_service: lambda: catalog,
+        dependencies.rate_limited: lambda: None,
+    })
+    with TestClient(app) as client:
+        yield SimpleNamespace(client=client, llm=llm, catalog=catalog, cache=cache)
@@ -0,0 +1,239 @@
+import json
+import time
+
+from app.routes import media
+from app.services.result_assembly import candidate_count
+
+
+def recommend(api, **body):
+    response = api.client.post("/api/media-recommendations", json={"mood": "happy", "media_type": "movies", **body})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def titles(response):
+    return [item["title"] for item in response["results"]]
+
+
+def wait_for(condition, timeout=2.0):
+    started = time.monotonic()
+    while not condition():
+        assert time.monotonic() - started < timeout
+        time.sleep(0.01)
+
+
+def test_deadline_returns_resolved_items_and_pending_titles(api):
+    api.catalog.delays["Movie 2"] = 0.3
+
+    response = recommend(api, limit=3, deadline_ms=100)
+
+    assert titles(response) == ["Movie 1", "Movie 3"]
+    assert response["partial"] and response["pending"] == ["Movie 2"]
+    assert response["pending_count"] == 1
+    assert api.llm.limits == [candidate_count(3)]
+
+    # The rest keeps resolving and the complete list is cached for the next caller
+    wait_for(lambda: api.cache.get("happy", "movies", 3) is not None)
+    response = recommend(api, limit=3, deadline_ms=100)
+    assert titles(response) == ["Movie 1", "Movie 2", "Movie 3"]
+    assert not response["partial"]
+
+
+def test_deadline_replaces_failed_titles_with_spares(api):
+    api.catalog.failing.add("Movie 2")
+    api.catalog.missing.add("Movie 3")
+
+    response = recommend(api, limit=3, deadline_ms=1000)
+
+    assert titles(response) == ["Movie 1", "Movie 4", "Movie 5"]
+    assert not response["degraded"] and not response["partial"]
+    assert titles(response) == [item.title for item in api.cache.get("happy", "movies", 3)]
+
+
+def test_deadline_matches_the_normal_response(api):
+    api.catalog.missing.add("Movie 1")
+
+    with_deadline = recommend(api, mood="calm", limit=4, deadline_ms=1000)
+    without = recommend(api, mood="cheerful", limit=4)
+
+    assert titles(with_deadline) == titles(without) == ["Movie 2", "Movie 3", "Movie 4", "Movie 5"]
+
+
+def test_deadline_before_the_llm_answers_reports_everything_pending(api):
+    api.llm.delay = 0.3
+
+    response = recommend(api, limit=3, deadline_ms=50)
+
+    assert response["results"] == []
+    assert response["partial"] and response["pending_count"] == 3
+    wait_for(lambda: api.cache.get("happy", "movies", 3) is not None)
+    assert [item.title for item in api.cache.get("happy", "movies", 3)] == ["Movie 1", "Movie 2", "Movie 3"]
+
+
+def stream(api, accept=None, **body):
+    headers = {"Accept": accept} if accept else {}
+    response = api.client.post(
+        "/api/media-recommendations/stream",
+        json={"mood": "happy", "media_type": "movies", **body},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_stream_is_cut_at_the_request_deadline(api, monkeypatch):
+    monkeypatch.setattr(media, "REQUEST_DEADLINE", 0.15)
+    api.llm.delay = 0.06
+
+    frames = [json.loads(line) for line in stream(api, limit=5).text.splitlines()]
+
+    assert [frame["type"] for frame in frames] == ["item", "item", "summary"]
+    assert frames[-1]["partial"] and frames[-1]["total_found"] == 2
+    assert api.cache.get("happy", "movies", 5) is None
+
+
+def test_stream_caches_only_complete_lists(api):
+    api.catalog.missing.add("Movie 2")
+
+    stream(api, limit=3)
+    assert api.cache.get("happy", "movies", 3) is None
+
+    api.catalog.missing.clear()
+    stream(api, limit=3)
+    assert [item.title for item in api.cache.get("happy", "movies", 3)] == ["Movie 1", "Movie 2", "Movie 3"]
+
+
+def test_invalid_media_type_is_rejected_before_it_is_counted(api):
+    response = api.client.post("/api/media-recommendations", json={"mood": "happy", "media_type": "games"})
+
+    assert response.status_code == 400
+    assert media.mood_traffic.top("games", 1) == []
+
+
+def test_routes_use_the_overridden_services(api):
+    # No lifespan ran, so app.state holds no services: everything comes
+    # from app.dependency_overrides
+    response = recommend(api, limit=2)
+
+    assert titles(response) == ["Movie 1", "Movie 2"]
+    assert api.llm.limits == [candidate_count(2)]
+    assert api.catalog.looked_up == ["Movie 1", "Movie 2"]
+
+    legacy = api.client.post("/api/recommendations", json={"mood": "happy", "limit": 2})
+    assert legacy.status_code == 200
+    assert legacy.json()["total_found"] == 2
+
+
+def test_stream_sends_ndjson_frames(api):
+    response = stream(api, limit=2)
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert [(frame["type"], frame.get("rank")) for frame in frames] == [("item", 0), ("item", 1), ("summary", None)]
+    assert frames[0]["item"]["title"] == "Movie 1"
+    assert frames[-1] == {
+        "type": "summary", "mood": "happy", "media_type": "movies", "total_found": 2, "partial": False
+    }
+
+
+def test_stream_sends_server_sent_events_when_accepted(api):
+    response = stream(api, accept="text/event-stream", limit=2)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.split("\n\n")
+    assert events[-1] == ""
+    assert all(event.startswith("data: ") for event in events[:-1])
+    frames = [json.loads(event[len("data: "):]) for event in events[:-1]]
+    assert [frame["type"] for frame in frames] == ["item", "item", "summary"]
+
+
+def test_stream_reports_errors_in_a_frame(api):
+    async def broken(mood, media_type, limit=10):
+        raise RuntimeError("LLM stream dropped")
+        yield
+
+    api.llm.stream_media_recommendations = broken
+
+    frames = [json.loads(line) for line in stream(api, limit=2).text.splitlines()]
+
+    assert frames == [{"type": "error", "detail": "Internal server error"}]
+
+
+def batch(api, *requests, fields=None):
+    response = api.client.post(
+        "/api/media-recommendations/batch",
+        json={"requests": list(requests)},
+        params={"fields": fields} if fields else {}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_batch_reports_errors_per_item(api):
+    api.catalog.failing.add("Movie 2")
+
+    results = batch(
+        api,
+        {"mood": "happy", "media_type": "movies", "limit": 2},
+        {"mood": "happy", "media_type": "games", "limit": 2},
+        {"mood": "sad", "media_type": "movies", "limit": 3},
+    )
+
+    assert [result["error"] for result in results] == [
+        None, "Invalid media type. Use: music, movies, books, podcasts", None
+    ]
+    assert titles(results[0]) == ["Movie 1", "Movie 3"]
+    assert results[1]["results"] == [] and results[1]["total_found"] == 0
+    assert titles(results[2]) == ["Movie 1", "Movie 3", "Movie 4"]
+
+
+def test_batch_looks_up_each_title_once(api):
+    batch(
+        api,
+        {"mood": "happy", "media_type": "movies", "limit": 2},
+        {"mood": "happy", "media_type": "movies", "limit": 2},
+        {"mood": "sad", "media_type": "movies", "limit": 2},
+    )
+
+    assert sorted(api.catalog.looked_up) == ["Movie 1", "Movie 2", "Movie 3"]
+    assert api.llm.limits == [candidate_count(2), candidate_count(2)]
+
+
+def test_fields_projects_each_result(api):
+    response = api.client.post(
+        "/api/media-recommendations",
+        json={"mood": "happy", "media_type": "movies", "limit": 2},
+        params={"fields": "title, year"}
+    )
+
+    body = response.json()
+    assert response.headers["content-type"] == "application/json"
+    assert body["results"] == [
+        {"title": "Movie 1", "year": None, "media_type": "movie"},
+        {"title": "Movie 2", "year": None, "media_type": "movie"},
+    ]
+    assert body["total_found"] == 2 and body["mood"] == "happy"
+
+
+def test_fields_projects_batch_and_stream_items(api):
+    results = batch(api, {"mood": "happy", "media_type": "movies", "limit": 1}, fields="title")
+    assert results[0]["results"] == [{"title": "Movie 1", "media_type": "movie"}]
+    assert results[0]["error"] is None
+
+    response = api.client.post(
+        "/api/media-recommendations/stream",
+        json={"mood": "calm", "media_type": "movies", "limit": 1},
+        params={"fields": "title"}
+    )
+    frames = [json.loads(line) for line in response.text.splitlines()]
+    assert frames[0] == {"type": "item", "rank": 0, "item": {"title": "Movie 1", "media_type": "movie"}}
+
+
+def test_responses_without_fields_keep_every_field(api):
+    body = recommend(api, limit=1)
+
+    assert set(body["results"][0]) == {
+        "title", "director", "year", "genres", "tmdb_url", "poster_url", "rating", "synopsis", "runtime",
+        "media_type"
+    }
+    assert {"degraded", "partial", "pending", "pending_count"} <= set(body)
@@ -0,0 +1,19 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models import BatchMediaRequest, MediaRequest, MoodRequest
+
+
+@pytest.mark.parametrize("limit", [None, 0, -3, 51])
+def test_out_of_range_limits_are_rejected(limit):
+    with pytest.raises(ValidationError):
+        MediaRequest(mood="happy", media_type="music", limit=limit)
+    with pytest.raises(ValidationError):
+        MoodRequest(mood="happy", limit=limit)
+    with pytest.raises(ValidationError):
+        BatchMediaRequest(requests=[{"mood": "happy", "media_type": "music", "limit": limit}])
+
+
+def test_limit_defaults_to_ten():
+    assert MediaRequest(mood="happy", media_type="music").limit == 10
+    assert MoodRequest(mood="happy").limit == 10
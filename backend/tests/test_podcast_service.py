@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import podcast_service
+from app.services.podcast_service import PodcastService
+
+
+def snapshot(*names):
+    return {"podcasts": [
+        {
+            "title": name, "creator": "Test", "categories": ["storytelling"],
+            "spotify_url": f"https://open.spotify.com/show/{name.lower()}",
+            "cover_url": None, "description": None, "total_episodes": None,
+        }
+        for name in names
+    ]}
+
+
+@pytest.fixture
+def bundled(tmp_path):
+    path = tmp_path / "bundled.json"
+    path.write_text(json.dumps(snapshot("Serial")))
+    return path
+
+
+def test_download_leaves_bundled_snapshot_alone(bundled, tmp_path, monkeypatch):
+    download_path = tmp_path / "runtime" / "podcasts.json"
+    client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=snapshot("Radiolab"))
+    ))
+    monkeypatch.setattr(podcast_service, "get_http_client", lambda: client)
+    monkeypatch.setattr(podcast_service, "CATALOG_URL", "https://catalog.test/podcasts.json")
+
+    service = PodcastService(bundled, download_path)
+    assert service.catalog.match("Serial") is not None
+
+    async def refresh():
+        # Two refreshes at once, as from two workers sharing the runtime directory
+        await asyncio.gather(service._download(), service._download())
+
+    asyncio.run(refresh())
+    service._reload()
+
+    assert json.loads(bundled.read_text()) == snapshot("Serial")
+    assert service.catalog.match("Radiolab") is not None
+    assert [path.name for path in download_path.parent.iterdir()] == ["podcasts.json"]
+
+
+def test_download_path_ignored_without_catalog_url(bundled, tmp_path, monkeypatch):
+    download_path = tmp_path / "podcasts.json"
+    download_path.write_text(json.dumps(snapshot("Radiolab")))
+    monkeypatch.setattr(podcast_service, "CATALOG_URL", None)
+
+    service = PodcastService(bundled, download_path)
+
+    assert service.catalog.match("Serial") is not None
+    assert service.catalog.match("Radiolab") is None
@@ -0,0 +1,51 @@
+import asyncio
+
+from app.services import prewarm
+from app.services.prewarm import PrewarmScheduler
+from app.services.response_cache import ResponseCache
+from app.services.shared_cache import MemoryBackend
+
+
+def test_workers_sharing_a_cache_prewarm_each_entry_once(monkeypatch):
+    shared = MemoryBackend()
+    monkeypatch.setattr("app.services.shared_cache._backend", shared)
+    monkeypatch.setattr("app.services.shared_cache._configured", True)
+    computed = []
+
+    async def compute(mood, media_type, limit):
+        computed.append((mood, media_type, limit))
+        return ["item"]
+
+    async def run_worker():
+        # Each worker process has its own response cache
+        monkeypatch.setattr(prewarm, "response_cache", ResponseCache())
+        return await PrewarmScheduler(compute, interval=60).run_once()
+
+    async def scenario():
+        due = await run_worker()
+        assert due > 0 and len(computed) == due
+        await run_worker()
+
+    asyncio.run(scenario())
+    assert len(computed) == len(set(computed))
+
+
+def test_first_cycle_waits_for_the_initial_delay(monkeypatch):
+    runs = []
+
+    async def run_once(self):
+        runs.append(1)
+        return 0
+
+    monkeypatch.setattr(PrewarmScheduler, "run_once", run_once)
+
+    async def scenario():
+        scheduler = PrewarmScheduler(lambda *args: None, interval=60, initial_delay=0.05)
+        await scheduler.start()
+        await asyncio.sleep(0.01)
+        assert runs == []
+        await asyncio.sleep(0.15)
+        assert runs == [1]
+        await scheduler.close()
+
+    asyncio.run(scenario())
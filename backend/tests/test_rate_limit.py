@@ -0,0 +1,73 @@
+import time
+
+from starlette.requests import Request
+
+from app import dependencies
+from app.services.rate_limit import ClientRateLimiter, TokenBucket
+
+
+def request(host: str, api_key: str = None) -> Request:
+    headers = [(b"x-api-key", api_key.encode())] if api_key else []
+    return Request({"type": "http", "headers": headers, "client": (host, 1234)})
+
+
+def test_bucket_allows_burst_then_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert all(bucket.try_take() for _ in range(3))
+    assert not bucket.try_take()
+    assert bucket.wait_time() == 0.5
+
+    now[0] += 0.5
+    assert bucket.try_take()
+    now[0] += 60
+    assert bucket.available() == 3
+
+
+def test_bucket_keeps_reserve(monkeypatch):
+    monkeypatch.setattr(time, "monotonic", lambda: 100.0)
+    bucket = TokenBucket(rate=1, burst=4)
+
+    assert bucket.try_take(keep=2)
+    assert bucket.try_take(keep=2)
+    assert not bucket.try_take(keep=2)
+    assert bucket.wait_time(keep=2) == 1.0
+    assert bucket.try_take()
+
+
+def test_limiter_is_per_client():
+    limiter = ClientRateLimiter(rate=1, burst=2, max_clients=10)
+
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0
+    assert limiter.acquire("b") == 0
+    assert limiter.rejected == 1
+
+
+def test_limiter_forgets_least_recent_clients():
+    limiter = ClientRateLimiter(rate=1, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        limiter.acquire(client)
+    assert len(limiter) == 2
+
+
+def test_large_batch_fits_a_full_bucket():
+    limiter = ClientRateLimiter(rate=1, burst=5, max_clients=10)
+    assert limiter.acquire("a", cost=50) == 0
+    assert limiter.acquire("a") > 0
+
+
+def test_disabled_limiter_allows_everything():
+    limiter = ClientRateLimiter(rate=0, burst=1, max_clients=10)
+    assert all(limiter.acquire("a") == 0 for _ in range(100))
+
+
+def test_unknown_api_keys_are_limited_by_address(monkeypatch):
+    monkeypatch.setattr(dependencies, "CLIENT_API_KEYS", frozenset({"issued"}))
+
+    assert dependencies.client_key(request("10.0.0.1", "issued")) == "key:issued"
+    assert dependencies.client_key(request("10.0.0.1", "made-up")) == "ip:10.0.0.1"
+    assert dependencies.client_key(request("10.0.0.1")) == "ip:10.0.0.1"
@@ -0,0 +1,64 @@
+import asyncio
+
+from app.models import Movie
+from app.services.recommendation_store import RecommendationStore, item_id
+
+
+def movie(number: int) -> Movie:
+    return Movie(
+        title=f"Movie {number}",
+        director=None,
+        year=None,
+        genres=[],
+        tmdb_url=f"https://www.themoviedb.org/movie/{number}",
+        poster_url=None,
+        rating=None,
+        synopsis=None,
+        runtime=None,
+    )
+
+
+def test_lists_round_trip_most_requested_first(tmp_path):
+    store = RecommendationStore(str(tmp_path / "store.db"))
+    store.record(("sad", "movies", 2), [movie(1), movie(2)])
+    store.record(("happy", "movies", 2), [movie(3), movie(1)])
+    store.hit(("happy", "movies", 2))
+    store._write(*store._take_pending())
+
+    loaded = store.load(10)
+    assert [key for key, _, _ in loaded] == [("happy", "movies", 2), ("sad", "movies", 2)]
+    assert [item.title for item in loaded[0][1]] == ["Movie 3", "Movie 1"]
+
+    assert [item.title for item in asyncio.run(store.get(("sad", "movies", 2)))] == ["Movie 1", "Movie 2"]
+    assert asyncio.run(store.get(("calm", "movies", 2))) is None
+
+
+def test_load_reads_only_referenced_items(tmp_path):
+    store = RecommendationStore(str(tmp_path / "store.db"))
+    store.record(("sad", "movies", 1), [movie(1)])
+    store.record(("happy", "movies", 1), [movie(2)])
+    store.hit(("sad", "movies", 1))
+    store._write(*store._take_pending())
+
+    loaded = store.load(1)
+    assert [(key, [item_id(item) for item in items]) for key, items, _ in loaded] == [
+        (("sad", "movies", 1), ["movie:https://www.themoviedb.org/movie/1"])
+    ]
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = RecommendationStore(str(tmp_path / "store.db"))
+    store.record(("sad", "movies", 2), [movie(1), movie(2)])
+    store._write(*store._take_pending())
+    store.export_snapshot(tmp_path / "snapshot.json")
+
+    other = RecommendationStore(str(tmp_path / "other.db"))
+    assert other.import_snapshot(tmp_path / "snapshot.json") == {"items": 2, "lists": 1}
+    assert other.stats() == {"items": 2, "lists": 1}
+
+
+def test_disabled_store_is_a_no_op():
+    store = RecommendationStore("")
+    store.record(("sad", "movies", 1), [movie(1)])
+    assert asyncio.run(store.get(("sad", "movies", 1))) is None
+    assert asyncio.run(store.start()) == []
@@ -0,0 +1,172 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+from app.services.upstream_budget import UpstreamBudget
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """A fresh breaker for every upstream, opening after one failure"""
+    fresh = {name: CircuitBreaker(name, failure_threshold=1, reset_timeout=0.01) for name in resilience.breakers}
+    monkeypatch.setattr(resilience, "breakers", fresh)
+    return fresh
+
+
+async def _wait_reset(breaker: CircuitBreaker) -> None:
+    await asyncio.sleep(breaker.reset_timeout * 2)
+    assert breaker.state == "half_open"
+
+
+def test_breaker_opens_and_probe_closes_it():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    breaker.reset_timeout = 0
+    assert breaker.allow()
+    breaker.record_failure()
+    breaker.reset_timeout = 60
+    assert breaker.state == "open"
+
+
+def test_cancelled_llm_probe_frees_breaker(breaker):
+    openai = breaker["openai"]
+
+    async def scenario():
+        openai.record_failure()
+        await _wait_reset(openai)
+
+        probe = asyncio.create_task(resilience.with_llm_resilience(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.001)
+        assert not openai.allow()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert openai.allow()
+
+    asyncio.run(scenario())
+
+
+def test_failed_llm_call_opens_breaker(breaker):
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await resilience.with_llm_resilience(fail)
+        with pytest.raises(CircuitOpenError):
+            await resilience.with_llm_resilience(fail)
+
+    asyncio.run(scenario())
+
+
+def test_get_probe_out_of_time_frees_breaker(breaker):
+    tmdb = breaker["tmdb"]
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    async def scenario():
+        tmdb.record_failure()
+        await _wait_reset(tmdb)
+
+        with resilience.request_deadline(-1):
+            with pytest.raises(DeadlineExceeded):
+                await resilience.resilient_get(client, "tmdb", "https://api.test/movie")
+
+        assert tmdb.state == "half_open"
+        response = await resilience.resilient_get(client, "tmdb", "https://api.test/movie")
+        assert response.status_code == 200
+        assert tmdb.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_get_retries_server_errors(breaker, monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_BASE_DELAY", 0)
+    breaker["tmdb"].failure_threshold = 10
+    statuses = iter([503, 502, 200])
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(next(statuses))))
+
+    async def scenario():
+        response = await resilience.resilient_get(client, "tmdb", "https://api.test/movie")
+        assert response.status_code == 200
+        assert breaker["tmdb"].state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_hedge_is_skipped_without_budget(breaker, monkeypatch):
+    monkeypatch.setattr(resilience, "upstream_budget", UpstreamBudget({"tmdb": (0.001, 1)}))
+    calls = []
+
+    async def slow(request):
+        calls.append(request)
+        await asyncio.sleep(0.02)
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+
+    async def scenario():
+        response = await resilience.resilient_get(client, "tmdb", "https://api.test/movie", hedge_after_ms=1)
+        assert response.status_code == 200
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_llm_call_out_of_time_is_not_a_failure(breaker):
+    calls = []
+
+    def call():
+        calls.append(1)
+        return asyncio.sleep(0)
+
+    async def scenario():
+        with resilience.request_deadline(-1):
+            with pytest.raises(DeadlineExceeded):
+                await resilience.with_llm_resilience(call)
+
+    asyncio.run(scenario())
+    assert calls == []
+    assert breaker["openai"].failures == 0
+
+
+def test_failed_get_counts_one_failure_per_call(breaker, monkeypatch):
+    monkeypatch.setattr(resilience, "RETRY_BASE_DELAY", 0)
+    tmdb = breaker["tmdb"]
+    tmdb.failure_threshold = 5
+    requests = []
+
+    def fail(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fail))
+
+    async def scenario():
+        with pytest.raises(httpx.HTTPStatusError):
+            await resilience.resilient_get(client, "tmdb", "https://api.test/movie")
+
+    asyncio.run(scenario())
+    assert len(requests) == resilience.GET_RETRIES + 1
+    assert tmdb.failures == 1
+    assert tmdb.state == "closed"
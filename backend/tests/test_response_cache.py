@@ -0,0 +1,60 @@
+import asyncio
+
+from app.services.response_cache import ResponseCache, normalize_mood, revalidating
+
+
+def test_normalize_mood_ignores_noise():
+    assert normalize_mood("I'm feeling really HAPPY!") == normalize_mood("joyful")
+    assert normalize_mood("chill, rainy") == normalize_mood("rain and relaxed")
+    assert normalize_mood("!!!") == "!!!"
+
+
+def test_negation_stays_with_its_word():
+    assert normalize_mood("happy, not sad") != normalize_mood("sad, not happy")
+    assert normalize_mood("not happy") != normalize_mood("happy")
+    assert normalize_mood("I don't feel happy") == normalize_mood("not joyful")
+    assert normalize_mood("not very happy") == normalize_mood("not happy")
+
+
+def test_pool_collects_variants_up_to_its_size():
+    cache = ResponseCache()
+    cache.pool_size = 2
+    for variant in (["a"], ["b"], ["c"]):
+        cache.put("happy", "music", 1, variant)
+
+    assert cache.peek("joyful", "music", 1) == ["c"]
+    assert cache.get("happy", "music", 1) in (["b"], ["c"])
+    assert cache.get("happy", "music", 2) is None
+
+
+def test_refresh_of_cached_entry_is_marked_revalidating():
+    cache = ResponseCache()
+    seen = []
+
+    async def compute():
+        seen.append(revalidating())
+        return ["fresh"]
+
+    async def scenario():
+        await cache.refresh("happy", "music", 1, compute)
+        await cache.refresh("happy", "music", 1, compute)
+        assert not revalidating()
+
+    asyncio.run(scenario())
+    assert seen == [False, True]
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["result"]
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("happy", "music", 1, compute) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [["result"]] * 5
+    assert len(calls) == 1
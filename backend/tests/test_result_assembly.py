@@ -0,0 +1,86 @@
+from app.models import Movie
+from app.services.response_cache import ResponseCache
+from app.services import result_assembly
+from app.services.result_assembly import backfill, candidate_count, unique_items, unique_queries
+from app.services.suggestions import Suggestion, title_key
+
+
+def movie(number: int) -> Movie:
+    return Movie(
+        title=f"Movie {number}",
+        director=None,
+        year=None,
+        genres=[],
+        tmdb_url=f"https://www.themoviedb.org/movie/{number}",
+        poster_url=None,
+        rating=None,
+        synopsis=None,
+        runtime=None,
+    )
+
+
+def test_candidate_count_adds_spares():
+    assert candidate_count(10) == 15
+    assert candidate_count(1) == 2
+
+
+def test_title_key_ignores_editions_and_case():
+    assert title_key("Clair de Lune - Remastered 2011") == title_key("clair de lune")
+    assert title_key("Her (2013)") == title_key("HER")
+    assert title_key("Song - Live") == title_key("Song")
+
+
+def test_title_key_keeps_subtitles():
+    assert title_key("Mission: Impossible - Fallout") != title_key("Mission: Impossible - Ghost Protocol")
+    first = Suggestion("Mission: Impossible - Fallout", "movies", creator="Christopher McQuarrie")
+    second = Suggestion("Mission: Impossible - Ghost Protocol", "movies", creator="Brad Bird")
+    assert title_key(first) != title_key(second)
+
+
+def test_title_key_of_suggestions_includes_creator():
+    cover = Suggestion("Hallelujah", "music", creator="Jeff Buckley")
+    original = Suggestion("Hallelujah", "music", creator="Leonard Cohen")
+    remaster = Suggestion("Hallelujah - Remastered", "music", creator="Jeff Buckley")
+    assert title_key(cover) != title_key(original)
+    assert title_key(cover) == title_key(remaster)
+
+
+def test_title_key_keeps_titles_that_only_start_with_edition_words():
+    assert title_key("Oasis - Live Forever") == "oasis live forever"
+    assert title_key("Beyoncé - Single Ladies (Put a Ring on It)") == "beyonce single ladies"
+    assert title_key("Hozier - From Eden") == "hozier from eden"
+
+
+def test_title_key_handles_non_latin_and_accented_titles():
+    assert title_key("Amélie") == title_key("Amelie")
+    spring_day = Suggestion("봄날", "music", creator="BTS")
+    blood_sweat_tears = Suggestion("피 땀 눈물", "music", creator="BTS")
+    assert title_key(spring_day) != title_key(blood_sweat_tears)
+    queries = ["千と千尋の神隠し", "기생충", "Amélie", "Parasite", "Amelie"]
+    assert unique_queries(queries) == ["千と千尋の神隠し", "기생충", "Amélie", "Parasite"]
+
+
+def test_unique_queries_keeps_rank_order():
+    queries = ["Her", "Mission: Impossible - Fallout", "her", "Mission: Impossible - Ghost Protocol"]
+    assert unique_queries(queries) == ["Her", "Mission: Impossible - Fallout", "Mission: Impossible - Ghost Protocol"]
+
+
+def test_unique_items_dedupes_by_catalog_id_and_caps():
+    items = [movie(1), None, movie(1), movie(2), movie(3)]
+    assert [item.title for item in unique_items(items, 2)] == ["Movie 1", "Movie 2"]
+
+
+def test_backfill_uses_neighbouring_moods(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(result_assembly, "response_cache", cache)
+    monkeypatch.setattr(result_assembly, "neighbour_moods", lambda mood, media_type: ["sad"])
+    cache.put("sad", "movies", 3, [movie(7), movie(1), movie(8)])
+
+    filled = backfill([movie(1)], "gloomy evening", "movies", 3)
+    assert [item.title for item in filled] == ["Movie 1", "Movie 7", "Movie 8"]
+
+
+def test_backfill_leaves_full_results_alone(monkeypatch):
+    monkeypatch.setattr(result_assembly, "neighbour_moods", lambda mood, media_type: ["sad"])
+    results = [movie(1), movie(2)]
+    assert backfill(results, "gloomy", "movies", 2) is results
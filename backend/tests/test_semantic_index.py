@@ -0,0 +1,46 @@
+from app.services.semantic_index import SemanticMoodIndex, embed_mood
+
+
+def test_close_moods_are_similar():
+    assert embed_mood("happy") @ embed_mood("so happy today") > 0.9
+    assert embed_mood("happy") @ embed_mood("sad") < 0.5
+
+
+def test_negation_is_not_a_match():
+    assert embed_mood("not happy") @ embed_mood("happy") < 0
+    assert embed_mood("happy, not sad") @ embed_mood("sad, not happy") < 0.5
+
+
+def test_lookup_skips_the_same_mood():
+    index = SemanticMoodIndex()
+    index.add("nostalgic", "movies", ["Cinema Paradiso", "Big Fish"])
+
+    assert index.lookup("Nostalgic!", "movies", 2) is None
+    assert index.lookup("nostalgia", "movies", 2) == ["Cinema Paradiso", "Big Fish"]
+    assert index.lookup("nostalgia", "music", 2) is None
+
+
+def test_lookup_needs_enough_items():
+    index = SemanticMoodIndex()
+    index.add("nostalgic", "movies", ["Cinema Paradiso"])
+    assert index.lookup("nostalgia", "movies", 2) is None
+
+
+def test_answering_a_mood_again_replaces_its_row():
+    index = SemanticMoodIndex()
+    index.add("nostalgic", "movies", ["Cinema Paradiso"])
+    index.add("NOSTALGIC", "movies", ["Big Fish"])
+
+    assert index.stats()["size"] == 1
+    assert index.lookup("nostalgia", "movies", 1) == ["Big Fish"]
+
+
+def test_ring_buffer_forgets_oldest():
+    index = SemanticMoodIndex()
+    index.capacity = 2
+    for mood in ("happy", "sad", "angry"):
+        index.add(mood, "movies", [mood])
+
+    assert sorted(mood for mood, _, _ in index.top_k("happy", "movies", k=5)) == ["angry", "sad"]
+    index.add("happy", "movies", ["again"])
+    assert sorted(mood for mood, _, _ in index.top_k("happy", "movies", k=5)) == ["angry", "happy"]
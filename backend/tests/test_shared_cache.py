@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.models import Movie
+from app.services import shared_cache
+from app.services.query_cache import QueryCache
+from app.services.shared_cache import MemoryBackend, SharedCacheBackend, SQLiteBackend, create_backend
+
+DUNE = Movie(
+    title="Dune",
+    director="Denis Villeneuve",
+    year=2021,
+    genres=["Science Fiction"],
+    tmdb_url="https://www.themoviedb.org/movie/438631",
+    poster_url=None,
+    rating=7.8,
+    synopsis=None,
+    runtime=155,
+)
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    backend = MemoryBackend()
+    monkeypatch.setattr(shared_cache, "_backend", backend)
+    monkeypatch.setattr(shared_cache, "_configured", True)
+    return backend
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SharedCacheBackend()
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    backend = create_backend(f"sqlite:///{tmp_path / 'cache.db'}")
+    assert isinstance(backend, SQLiteBackend)
+
+    async def scenario():
+        await backend.set("movies", "dune", "{}", 60)
+        await backend.set("movies", "missing", None, 60)
+        await backend.set("movies", "expired", "{}", -1)
+        assert await backend.get("movies", "dune") == (True, "{}", pytest.approx(60, abs=1))
+        assert (await backend.get("movies", "missing"))[:2] == (True, None)
+        assert (await backend.get("movies", "expired"))[0] is False
+        assert (await backend.get("books", "dune"))[0] is False
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_query_cache_shares_items_between_processes(shared):
+    async def scenario():
+        QueryCache("movies", Movie).set("Dune", DUNE)
+        QueryCache("movies", Movie).set("Nothing Here", None)
+        # Shared writes happen behind the caller
+        await asyncio.sleep(0)
+
+        other_worker = QueryCache("movies", Movie)
+        assert await other_worker.get("  dune ") == (True, DUNE)
+        assert await other_worker.get("nothing here") == (True, None)
+        assert await other_worker.get("Arrival") == (False, None)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("make_backend", [MemoryBackend, lambda: create_backend("sqlite:///:memory:")])
+def test_claim_is_taken_once_until_it_expires(make_backend):
+    backend = make_backend()
+
+    async def scenario():
+        assert await backend.claim("prewarm", "happy", 60)
+        assert not await backend.claim("prewarm", "happy", 60)
+        assert await backend.claim("prewarm", "sad", 60)
+        assert await backend.claim("prewarm", "expired", -1)
+        assert await backend.claim("prewarm", "expired", 60)
+
+    asyncio.run(scenario())
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+class Work:
+    """A call that blocks until released, counting how often it started"""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.calls
+
+
+def test_joiners_share_one_result():
+    flights = SingleFlight("test_share")
+
+    async def scenario():
+        work = Work()
+        callers = [asyncio.create_task(flights.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        work.release.set()
+        return work, await asyncio.gather(*callers)
+
+    work, results = asyncio.run(scenario())
+    assert results == [1, 1, 1]
+    assert work.calls == 1
+    assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 2}
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert results[0] is results[1]
+
+
+def test_cancelled_caller_leaves_shared_work_running():
+    flights = SingleFlight("test_cancel_one")
+
+    async def scenario():
+        work = Work()
+        leaving = asyncio.create_task(flights.do("key", work))
+        staying = asyncio.create_task(flights.do("key", work))
+        await asyncio.sleep(0)
+
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        work.release.set()
+        return work, await staying
+
+    work, result = asyncio.run(scenario())
+    assert result == 1
+    assert (work.calls, work.cancelled) == (1, 0)
+
+
+def test_last_caller_leaving_cancels_work_and_new_callers_start_fresh():
+    flights = SingleFlight("test_cancel_all")
+
+    async def scenario():
+        work = Work()
+        callers = [asyncio.create_task(flights.do("key", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert work.cancelled == 1
+        assert flights.stats()["in_flight"] == 0
+
+        work.release.set()
+        return work, await flights.do("key", work)
+
+    work, result = asyncio.run(scenario())
+    assert result == 2
+    assert work.calls == 2
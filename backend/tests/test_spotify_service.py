@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import spotify_service
+from app.services.shared_cache import MemoryBackend
+from app.services.spotify_service import SpotifyRateLimited, SpotifyService, SpotifyTokenManager
+
+
+@pytest.fixture
+def spotify(monkeypatch):
+    """A SpotifyService against a mock API, returning the requests it got"""
+    requests = []
+    state = {"limited": 1}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if state["limited"]:
+            state["limited"] -= 1
+            return httpx.Response(429, headers={"Retry-After": "0.05"})
+        return httpx.Response(200, json={"tracks": {"items": []}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(spotify_service, "get_http_client", lambda: client)
+    monkeypatch.setattr(spotify_service, "_blocked_until", 0.0)
+
+    async def token():
+        return "token"
+
+    monkeypatch.setattr(spotify_service._token_manager, "get_token", token)
+    return SpotifyService(), requests
+
+
+def test_retry_after_holds_back_every_caller(spotify):
+    service, requests = spotify
+
+    async def scenario():
+        first = asyncio.create_task(service._get("/search", {"q": "a"}))
+        await asyncio.sleep(0.01)
+        # Starts while the first request is backing off: it must not call Spotify yet
+        second = asyncio.create_task(service._get("/search", {"q": "b"}))
+        await asyncio.sleep(0.01)
+        assert len(requests) == 1
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(scenario()) == [{"tracks": {"items": []}}] * 2
+    assert len(requests) == 3
+
+
+def test_long_retry_after_fails_fast(spotify, monkeypatch):
+    service, requests = spotify
+    monkeypatch.setattr(spotify_service, "MAX_RETRY_AFTER", 0.01)
+
+    with pytest.raises(SpotifyRateLimited):
+        asyncio.run(service._get("/search", {"q": "a"}))
+    with pytest.raises(SpotifyRateLimited):
+        asyncio.run(service._get("/search", {"q": "b"}))
+    assert len(requests) == 1
+
+
+def test_rejected_shared_token_is_not_read_back(monkeypatch):
+    issued = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/token":
+            issued.append(f"fresh-{len(issued)}")
+            return httpx.Response(200, json={"access_token": issued[-1], "expires_in": 3600})
+        if request.headers["Authorization"] == "Bearer rejected":
+            return httpx.Response(401)
+        return httpx.Response(200, json={"ok": True})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(spotify_service, "get_http_client", lambda: client)
+    monkeypatch.setenv("SPOTIFY_CLIENT_ID", "id")
+    monkeypatch.setenv("SPOTIFY_CLIENT_SECRET", "secret")
+    monkeypatch.setattr(spotify_service, "_token_manager", SpotifyTokenManager())
+    shared = MemoryBackend()
+    monkeypatch.setattr(spotify_service, "get_shared_cache", lambda: shared)
+
+    async def scenario():
+        # Another worker stored a token Spotify has since revoked
+        await shared.set("spotify_token", "client_credentials", "rejected", 600)
+        result = await SpotifyService()._get("/search", {"q": "a"})
+        return result, await shared.get("spotify_token", "client_credentials")
+
+    result, (_, stored, _) = asyncio.run(scenario())
+    assert result == {"ok": True}
+    assert issued == ["fresh-0"]
+    assert stored == "fresh-0"
@@ -0,0 +1,78 @@
+import json
+
+from app.services.media_ai_service import JSONArrayStreamParser
+from app.services.suggestions import (
+    Suggestion, parse_suggestions, same_title, suggestion_from_item, suggestion_to_item
+)
+
+
+def test_same_title_ignores_editions_and_spelling():
+    assert same_title("Clair de Lune - Remastered 2011", "Clair de Lune")
+    assert same_title("Shake It Off (Taylor's Version)", "Shake It Off")
+    assert same_title('Let It Go - From "Frozen"/Soundtrack Version', "Let It Go")
+    assert same_title("The Shawshank Redemption", "Shawshank Redemption")
+
+
+def test_same_title_handles_non_latin_and_accented_titles():
+    assert same_title("Amélie", "Amelie")
+    assert same_title("Le Fabuleux Destin d'Amélie Poulain", "Le fabuleux destin d'Amelie Poulain")
+    assert same_title("기생충", "기생충")
+    assert same_title("千と千尋の神隠し", "千と千尋の神隠し")
+    assert not same_title("봄날", "피 땀 눈물")
+
+
+def test_same_title_compares_whole_titles():
+    assert not same_title("Star Wars: Episode V - The Empire Strikes Back", "Star Wars: Episode IV - A New Hope")
+    assert not same_title("Mission: Impossible - Fallout", "Mission: Impossible - Ghost Protocol")
+    assert not same_title("Toy Story 2", "Toy Story 3")
+    assert not same_title("", "Her")
+
+
+def test_suggestion_query_format():
+    assert Suggestion("Hallelujah", "music", creator="Jeff Buckley") == "Jeff Buckley - Hallelujah"
+    assert Suggestion("Dune", "books", creator="Frank Herbert") == "Dune by Frank Herbert"
+    assert Suggestion("Dune", "movies", creator="Denis Villeneuve", year=2021) == "Dune"
+
+
+def test_suggestion_from_item_validates_fields():
+    suggestion = suggestion_from_item({"title": " Dune ", "creator": "", "year": 2021, "id": 438631}, "movies")
+    assert suggestion == "Dune"
+    assert suggestion.creator is None
+    assert suggestion.external_id == "438631"
+
+    assert suggestion_from_item({"title": ""}, "movies") is None
+    assert suggestion_from_item({"title": "Dune", "year": 20210}, "movies") is None
+    assert suggestion_from_item({"creator": "Denis Villeneuve"}, "movies") is None
+    assert suggestion_from_item("Arrival", "movies") == "Arrival"
+
+
+def test_suggestion_round_trips_through_item():
+    suggestion = Suggestion("Dune", "movies", creator="Denis Villeneuve", year=2021, external_id="438631")
+    restored = suggestion_from_item(suggestion_to_item(suggestion), "movies")
+    assert (restored.title, restored.creator, restored.year, restored.external_id) == (
+        "Dune", "Denis Villeneuve", 2021, "438631"
+    )
+
+
+def test_parse_suggestions_drops_junk_and_duplicates():
+    content = json.dumps({"recommendations": [
+        {"title": "Her"}, {"title": "her"}, {"title": 42}, "Arrival", {"title": "Dune"}
+    ]})
+    assert parse_suggestions(content, "movies", 10) == ["Her", "Arrival", "Dune"]
+    assert parse_suggestions(content, "movies", 2) == ["Her", "Arrival"]
+    assert parse_suggestions('["Her", "Arrival"]', "movies", 10) == ["Her", "Arrival"]
+    assert parse_suggestions('{"recommendations": "Her"}', "movies", 10) == []
+
+
+def test_stream_parser_yields_elements_as_they_complete():
+    document = json.dumps({"recommendations": [
+        {"title": "Her", "creator": "Spike Jonze"}, {"title": 'Say "Anything" [1989]'}, "Arrival"
+    ]})
+    parser = JSONArrayStreamParser()
+    elements = []
+    for start in range(0, len(document), 7):
+        elements += parser.feed(document[start:start + 7])
+
+    assert elements == [
+        {"title": "Her", "creator": "Spike Jonze"}, {"title": 'Say "Anything" [1989]'}, "Arrival"
+    ]
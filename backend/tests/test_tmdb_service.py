@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.models import Movie
+from app.services import resilience, tmdb_service
+from app.services.cache import TTLCache
+from app.services.query_cache import QueryCache
+from app.services.suggestions import Suggestion
+from app.services.tmdb_service import TMDbService
+
+MOVIES = {
+    "1984": {"id": 841, "title": "Dune", "release_date": "1984-12-14"},
+    "2021": {"id": 438631, "title": "Dune", "release_date": "2021-09-15"},
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(tmdb_service, "_movie_query_cache", QueryCache("test_tmdb_movies", Movie))
+    monkeypatch.setattr(tmdb_service, "_movie_metadata_cache", TTLCache(name="test_tmdb_metadata", maxsize=100, ttl=60))
+
+
+def handler(requests):
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/search/movie"):
+            year = request.url.params.get("primary_release_year", "2021")
+            return httpx.Response(200, json={"results": [MOVIES[year]]})
+        movie_id = int(request.url.path.rsplit("/", 1)[1])
+        movie = next(movie for movie in MOVIES.values() if movie["id"] == movie_id)
+        return httpx.Response(200, json={**movie, "genres": [{"name": "Science Fiction"}], "runtime": 137})
+    return handle
+
+
+def test_year_tells_remakes_apart(monkeypatch):
+    requests = []
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler(requests)))
+    monkeypatch.setattr(tmdb_service, "get_http_client", lambda: client)
+    service = TMDbService()
+
+    async def scenario():
+        lynch = Suggestion("Dune", "movies", creator="David Lynch", year=1984)
+        villeneuve = Suggestion("Dune", "movies", creator="Denis Villeneuve", year=2021)
+        return await asyncio.gather(
+            service.search_movie(lynch),
+            service.search_movie(villeneuve),
+            service.search_movie(Suggestion("Dune", "movies", year=1984)),
+        )
+
+    first, second, repeat = asyncio.run(scenario())
+    assert (first.year, second.year, repeat.year) == (1984, 2021, 1984)
+    searches = [request for request in requests if request.url.path.endswith("/search/movie")]
+    assert len(searches) == 2
+
+
+def test_movie_without_metadata_is_not_cached(monkeypatch):
+    requests = []
+    details_up = False
+    search = handler(requests)
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/search/movie") and not details_up:
+            return httpx.Response(503)
+        return search(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+    monkeypatch.setattr(tmdb_service, "get_http_client", lambda: client)
+    monkeypatch.setattr(resilience, "GET_RETRIES", 0)
+    service = TMDbService()
+    query = Suggestion("Dune", "movies", creator="Denis Villeneuve", year=2021)
+
+    degraded = asyncio.run(service.search_movie(query))
+    assert degraded.title == "Dune"
+    assert degraded.runtime is None
+
+    details_up = True
+    movie = asyncio.run(service.search_movie(query))
+    assert movie.runtime == 137
+    assert movie.genres == ["Science Fiction"]